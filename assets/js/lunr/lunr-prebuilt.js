@@ -0,0 +1,93 @@
+---
+layout: none
+---
+
+// scripts/common/search_index.py 가 발행 단계에서 만든 샤드(점수까지 계산한 역색인)로 검색합니다.
+// 샤드는 처음 검색어를 입력할 때 내려받습니다. 토큰화 문자 범위는 manifest.json 의 tokenizer 를 그대로 씁니다.
+var prebuilt = { shards: [], loading: null, split: null, hangul: null, hasHangul: null };
+
+function prebuiltLoad() {
+  if (!prebuilt.loading) {
+    prebuilt.loading = $.getJSON('{{ "/assets/js/lunr/prebuilt/manifest.json" | relative_url }}').then(function (manifest) {
+      prebuilt.split = new RegExp('[^' + manifest.tokenizer.word + ']+');
+      prebuilt.hangul = new RegExp('[' + manifest.tokenizer.hangul + ']+', 'g');
+      prebuilt.hasHangul = new RegExp('[' + manifest.tokenizer.hangul + ']');
+      return $.when.apply($, manifest.shards.map(function (shard) {
+        return $.getJSON('{{ "/assets/js/lunr/prebuilt/" | relative_url }}' + shard.category + '.json').then(function (data) {
+          data.keys = Object.keys(data.terms);
+          prebuilt.shards.push(data);
+        });
+      }));
+    });
+  }
+  return prebuilt.loading;
+}
+
+function prebuiltTokenize(text) {
+  var tokens = [];
+  text.toLowerCase().split(prebuilt.split).forEach(function (word) {
+    word = word.replace(/^_+|_+$/g, '');
+    if (!word) return;
+    word.replace(prebuilt.hangul, ' ').split(' ').forEach(function (part) {
+      part = part.replace(/^_+|_+$/g, '');
+      if (part) tokens.push(part);
+    });
+    (word.match(prebuilt.hangul) || []).forEach(function (run) {
+      if (run.length == 1) tokens.push(run);
+      for (var i = 0; i < run.length - 1; i++) tokens.push(run.substr(i, 2));
+    });
+  });
+  return tokens;
+}
+
+function prebuiltSearch(query) {
+  var terms = prebuiltTokenize(query);
+  var prefix = query.lastIndexOf(' ') != query.length - 1;
+  var result = [];
+  prebuilt.shards.forEach(function (shard) {
+    var scores = {};
+    function add(postings, weight) {
+      for (var i = 0; i < postings.length; i += 2) {
+        scores[postings[i]] = (scores[postings[i]] || 0) + postings[i + 1] * weight;
+      }
+    }
+    terms.forEach(function (term) {
+      if (Object.prototype.hasOwnProperty.call(shard.terms, term)) add(shard.terms[term], 10);
+      // 입력 중인 영문/숫자 단어는 앞부분이 같은 단어도 낮은 점수로 찾습니다.
+      if (prefix && !prebuilt.hasHangul.test(term)) {
+        shard.keys.forEach(function (key) {
+          if (key.length > term.length && key.lastIndexOf(term, 0) === 0) add(shard.terms[key], 1);
+        });
+      }
+    });
+    Object.keys(scores).forEach(function (number) {
+      result.push({ score: scores[number], doc: shard.docs[number] });
+    });
+  });
+  result.sort(function (a, b) { return b.score - a.score; });
+  return result;
+}
+
+$(document).ready(function() {
+  $('input#search').on('keyup', function () {
+    var input = $(this);
+    prebuiltLoad().then(function () {
+      var resultdiv = $('#results');
+      var result = prebuiltSearch(input.val());
+      resultdiv.empty();
+      resultdiv.prepend('<p class="results__found">'+result.length+' {{ site.data.ui-text[site.locale].results_found | default: "Result(s) found" }}</p>');
+      result.forEach(function (item) {
+        var searchitem =
+          '<div class="list__item">'+
+            '<article class="archive__item" itemscope itemtype="https://schema.org/CreativeWork">'+
+              '<h2 class="archive__item-title" itemprop="headline">'+
+                '<a href="{{ site.baseurl }}'+item.doc[1]+'" rel="permalink">'+item.doc[0]+'</a>'+
+              '</h2>'+
+              '<p class="archive__item-excerpt" itemprop="description">'+item.doc[2]+'</p>'+
+            '</article>'+
+          '</div>';
+        resultdiv.append(searchitem);
+      });
+    });
+  });
+});
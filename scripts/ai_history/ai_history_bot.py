@@ -1,24 +1,58 @@
-from google import genai
-from google.genai import types
 import os
+import re
 import json
 from datetime import datetime, timedelta
-from json_repair import repair_json
-import urllib.request
 import traceback
 import sys
 import time
 
-try:
-    from ai_history_models import HistoryBotResponse, HistoryBotMetadata
-except ImportError:
-    print("⚠️ 'ai_history_models.py' 파일을 찾을 수 없습니다. Pydantic 모델 정의가 필요합니다.")
-    sys.exit(1)
+# google.genai / pydantic / json_repair 는 실제 생성이 필요할 때만 import 합니다.
+# 종료된 연재의 cron 실행은 상태 로드와 종료 조건 검사만 하고 곧바로 끝납니다.
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from common.artifacts import ArtifactStore, new_artifact
+from common.posts import CITATION_HEADERS, DISCLAIMER, read_post
+from common.post_template import REQUIRED_SECTIONS, extract_section, fix_title, markdown_only, section_template, splice_section, validate_content
+from common.publish import run_publish_stages
+from common.state_store import StateStore
+from common.run_guard import RunLock, find_duplicate_run, run_key, run_slot
+from common.hedging import Hedger
+from common.context_cache import ContextCache
+from common.model_router import ModelRouter, route
+from common.thinking_budget import ThinkingController, budget_ladder, level_ladder
+from common.speculative import SPECULATIVE_ENABLED, DraftStore, fingerprint
+from common.tracing import tracer
+from common.tokens import trim_to_budget
+from common.grounding import cited_web_chunks, resolve_citations
+from common.sectioned_writer import WRITER_MODE, assemble, record_benchmark, write_parts
 
 # --- [Configuration] ---
-RESEARCH_MODEL_NAME = "gemini-2.5-flash"
-WRITER_MODEL_NAME = "gemini-3-flash-preview"
+# 작업별 (모델 등급, thinking 설정, 지연 SLO 초) 목록. 오류나 SLO 초과 시 다음 단계로 넘어갑니다. (common/model_router.py)
+MODEL_ROUTES = {
+    "research": [route("standard", slo=180, thinking_budget=24576), route("fast", thinking_budget=8192)],
+    "plan": [route("standard", slo=120, thinking_budget=24576), route("fast", thinking_budget=8192)],
+    "write": [route("deep", slo=300, thinking_level="high"), route("standard", thinking_budget=16384)],
+    # 템플릿 검사에서 깨진 섹션 하나만 다시 작성
+    "section": [route("standard", slo=120, thinking_budget=4096), route("fast", thinking_budget=2048)],
+    # BOT_WRITER_MODE=sections 일 때 도입부/섹션 하나씩 동시에 작성 (common/sectioned_writer.py)
+    "write_part": [route("deep", slo=180, thinking_level="low"), route("standard", thinking_budget=4096)],
+}
+# BOT_HEDGE=1 이면 이 작업들의 느린 요청에 두 번째 요청을 보냅니다 (common/hedging.py)
+HEDGED_TASKS = ["research", "write"]
+# 작업별 첫 단계 thinking 설정의 범위. 품질 신호가 유지되면 낮추고 실패하면 올립니다. (common/thinking_budget.py)
+THINKING_POLICY = {
+    "research": budget_ladder(2048, 24576),
+    "plan": budget_ladder(1024, 24576),
+    "write": level_ladder("low", "high"),
+}
+# 작성자 프롬프트에 넣는 조사 노트의 최대 토큰 수 (로컬 추정, common/tokens.py)
+RESEARCH_NOTES_TOKEN_BUDGET = 12000
 STATE_FILE = "bot_state.json"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_DATA_DIR = os.path.join(SCRIPT_DIR, "run_data")
+POSTS_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, "..", "..", "_posts", "ai_history"))
+# 워크플로 cron 이 하루 두 번이므로, 그 이상의 (수동) 실행은 중복으로 봅니다. --force 로 무시할 수 있습니다.
+MAX_RUNS_PER_DAY = 2
+HEAVY_IMPORTS = ["google.genai", "pydantic", "json_repair", "ai_history_models"]
 
 DEFAULT_STATE = {
     "day_count": 0,
@@ -120,21 +154,71 @@ Day {day_count}: {Title}
 """
 
 # --- [Helper Functions] ---
+# 상태는 스냅샷(bot_state.json) + 추가 전용 저널(bot_state.journal)로 저장됩니다.
+state_store = StateStore(SCRIPT_DIR, DEFAULT_STATE, snapshot_name=STATE_FILE)
+
 def load_state():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    state_path = os.path.join(script_dir, STATE_FILE)
-    if not os.path.exists(state_path):
-        return DEFAULT_STATE
-    with open(state_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return state_store.load()
 
 def save_state(state):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    state_path = os.path.join(script_dir, STATE_FILE)
-    with open(state_path, 'w', encoding='utf-8') as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+    state_store.save(state)
+
+# 모델 응답과 인용은 artifacts/ 에 저장되고, 마크다운은 render_post 로 만듭니다. (common/render.py 로 일괄 재렌더링)
+artifact_store = ArtifactStore(SCRIPT_DIR)
+# 작업별 thinking 예산 상태 (run_data/thinking_budget.json). 추측 생성도 같은 상태를 씁니다.
+thinking = ThinkingController(RUN_DATA_DIR, THINKING_POLICY)
+# 추가 요청 상한이 실행(미리 생성 포함) 전체에 걸리도록 프로세스당 하나만 만듭니다.
+hedger = Hedger(os.path.join(RUN_DATA_DIR, "hedge_stats.json"), HEDGED_TASKS)
+CITATION_HEADER = CITATION_HEADERS[0]
+NO_CITATIONS = "* (No web citations found during research phase)\n"
+_CITATION_LINE = re.compile(r"^\* \[(.*)\]\((.*)\)$")
+
+def render_post(artifact):
+    lines = artifact['response']['content'].strip().splitlines()
+    title = lines[0].replace("#", "").strip()
+    body = "\n".join(lines[1:]).strip()
+    citation_list_str = "".join(f"* [{c['title']}]({c['url']})\n" for c in artifact['citations'].get('web', []))
+
+    # categories를 ai_history로 지정
+    header = f"""
+---
+title:  "{title}"
+categories:
+  - ai_history
+toc: true
+toc_sticky: true
+comments: true
+---
+"""
+    body += f"\n\n{CITATION_HEADER}\n{citation_list_str or NO_CITATIONS}\n\n{DISCLAIMER}"
+    return header.strip() + "\n\n" + body
+
+def artifact_from_post(path):
+    """아티팩트가 없던 시절의 포스트를 아티팩트로 변환합니다 (모델 메타데이터는 알 수 없음)."""
+    post = read_post(path)
+    body, _, footer = post['body'].partition(CITATION_HEADER)
+    citations = []
+    for line in footer.splitlines():
+        match = _CITATION_LINE.match(line.strip())
+        if match:
+            citations.append({"title": match.group(1), "url": match.group(2)})
+    day = int(re.search(r"day(\d+)\.md$", path).group(1))
+    artifact = new_artifact(path, day, {"web": citations}, [],
+                            response={"content": f"{post['title']}\n\n{body.strip()}", "metadata": None})
+    artifact['source'] = "backfill"
+    artifact['created'] = post['date']
+    return artifact
+
+def load_models():
+    try:
+        from ai_history_models import HistoryBotResponse
+    except ImportError:
+        print("⚠️ 'ai_history_models.py' 파일을 찾을 수 없습니다. Pydantic 모델 정의가 필요합니다.")
+        sys.exit(1)
+    return HistoryBotResponse
 
 def get_final_url_urllib(initial_url):
+    import urllib.request
     try:
         req = urllib.request.Request(initial_url, headers={'User-Agent': 'Mozilla/5.0'})
         with urllib.request.urlopen(req) as response:
@@ -142,9 +226,92 @@ def get_final_url_urllib(initial_url):
     except Exception:
         return initial_url
 
+# --- [Template Check] ---
+# 작성자 출력은 템플릿(common/post_template.py)을 따라야 합니다. 제목 줄과 주제 metadata 는 로컬에서 고치고 (전체를 다시 쓴 뒤에도),
+# 깨진 섹션이 MAX_SECTION_REPAIRS 개 이하면 그 섹션만 다시 요청해 끼워 넣고, 그보다 많으면 전체를 한 번 다시 작성합니다.
+MAX_SECTION_REPAIRS = 2
+
+def print_template_issues(issues):
+    for issue in issues:
+        print(f"      (Template: [{issue['section']}] {issue['problem']})")
+
+def regenerate_section(client, router, content, prefix, problems, day_count, research_notes):
+    from google.genai import types
+    section_prompt = f"""
+    **Task:** The blog post for Day {day_count} below has a missing or malformed section.
+    Write ONLY the section that starts with the header line `{section_template(prefix)}` (fill in the placeholders).
+    Problems found: {"; ".join(problems)}
+    Output just that section as Markdown (header line + body) in Korean. Do NOT output JSON or any other section.
+
+    **Research Data:**
+    {research_notes}
+
+    **Current Post:**
+    {content}
+    """
+    section_config = types.GenerateContentConfig(
+        system_instruction=get_writer_prompt(),
+        temperature=0.4,
+    )
+    response = router.generate(client, "section", section_prompt, section_config)
+    return extract_section(response.text or "", prefix)
+
+def fix_locally(response_json, issues, day_count, expected):
+    """모델 호출 없이 고칠 수 있는 문제: 제목 줄, 오늘 주제와 플래너가 정한 metadata"""
+    if any(issue['section'] == "title" for issue in issues):
+        response_json.content = fix_title(response_json.content, day_count)
+    if any(issue['section'] == "metadata" for issue in issues):
+        for key, value in expected.items():
+            setattr(response_json.metadata, key, value)
+
+def enforce_template(client, router, response_json, day_count, topic, next_plan, research_notes, rewrite):
+    expected = {"current_topic": topic, "next_topic": next_plan['next_topic'], "next_year": next_plan['next_year']}
+    issues = validate_content(response_json.content, day_count, response_json.metadata.model_dump(), expected)
+    if not issues:
+        return response_json
+    print_template_issues(issues)
+    fix_locally(response_json, issues, day_count, expected)
+
+    prefixes = [prefix for prefix, _, _ in REQUIRED_SECTIONS]
+    broken = {}
+    for issue in issues:
+        if issue['section'] in prefixes:
+            broken.setdefault(issue['section'], []).append(issue['problem'])
+
+    thinking.observe("write", repaired=len(broken))
+    if len(broken) > MAX_SECTION_REPAIRS:
+        print(f"      (Template: {len(broken)} sections broken, rewriting the whole post)")
+        response_json = rewrite()
+        fix_locally(response_json, validate_content(response_json.content, day_count, response_json.metadata.model_dump(), expected),
+                    day_count, expected)
+    else:
+        for prefix, problems in broken.items():
+            print(f"      (Template: regenerating '{prefix}' only)")
+            try:
+                section = regenerate_section(client, router, response_json.content, prefix, problems, day_count, research_notes)
+            except Exception as e:
+                print(f"      (Template: section regeneration failed: {e})")
+                continue
+            if section:
+                response_json.content = splice_section(response_json.content, prefix, section)
+
+    remaining = validate_content(response_json.content, day_count, response_json.metadata.model_dump(), expected)
+    if remaining:
+        print("⚠️ 템플릿 문제가 남아 있습니다. 그대로 발행합니다:")
+        print_template_issues(remaining)
+    return response_json
+
 # --- [Core Logic: Hybrid Pipeline] ---
 def generate_daily_content(state):
+    from google import genai
+    from google.genai import types
+    from json_repair import repair_json
+    HistoryBotResponse = load_models()
+
     client = genai.Client()
+    # 지시문은 캐시 최소 크기보다 작아 그대로 보냅니다. 섹션 분할 모드의 조사 노트만 캐시로 참조합니다. (common/context_cache.py)
+    context_cache = ContextCache()
+    router = ModelRouter(MODEL_ROUTES, RUN_DATA_DIR, hedger=hedger, context_cache=context_cache, thinking=thinking)
     
     last_year = state['current_year']
     last_topic = state['last_topic']
@@ -152,7 +319,7 @@ def generate_daily_content(state):
     next_year = state['next_year']
     day_count = state['day_count']
 
-    print(f"   ...Phase 1: Researching '{next_topic}' with {RESEARCH_MODEL_NAME}")
+    print(f"   ...Phase 1: Researching '{next_topic}' with {router.preferred_model('research')}")
 
     research_prompt = f"""
     Current Progress: Day {day_count-1}.
@@ -170,43 +337,41 @@ def generate_daily_content(state):
         system_instruction=get_researcher_prompt(),
         tools=[grounding_tool],
         temperature=0.0,
-        thinking_config=types.ThinkingConfig(thinking_budget=24576, include_thoughts=False)
     )
 
     research_response = None
     chunks = None
     
-    for attempt in range(3):
-        try:
-            research_response = client.models.generate_content(
-                model=RESEARCH_MODEL_NAME,
-                contents=research_prompt,
-                config=research_config,
-            )
-            if research_response.candidates[0].grounding_metadata.grounding_chunks:
-                chunks = research_response.candidates[0].grounding_metadata.grounding_chunks
-                break
-            else:
-                print(f"      (Attempt {attempt+1}: No grounding chunks found. Retrying...)")
-                time.sleep(2)
-        except Exception as e:
-            print(f"      (Attempt {attempt+1} Failed: {e})")
-            time.sleep(2 * (attempt + 1))
-            if attempt == 2: raise
-
-    citation_list_str = ""
-    if chunks:
-        for x in chunks:
+    with tracer.span("research"):
+        for attempt in range(3):
             try:
-                final_url = get_final_url_urllib(x.web.uri)
-                title = x.web.title if x.web.title else "Reference"
-                citation_list_str += f"* [{title}]({final_url})\n"
-            except:
-                continue
-    else:
-        citation_list_str = "* (No web citations found during research phase)\n"
-
-    research_notes = research_response.text
+                research_response = router.generate(client, "research", research_prompt, research_config)
+                if research_response.candidates[0].grounding_metadata.grounding_chunks:
+                    chunks = research_response.candidates[0].grounding_metadata.grounding_chunks
+                    break
+                else:
+                    print(f"      (Attempt {attempt+1}: No grounding chunks found. Retrying...)")
+                    tracer.event("retry", attempt=attempt + 1, reason="no grounding chunks")
+                    time.sleep(2)
+            except Exception as e:
+                print(f"      (Attempt {attempt+1} Failed: {e})")
+                tracer.event("retry", attempt=attempt + 1, reason=str(e)[:200])
+                time.sleep(2 * (attempt + 1))
+                if attempt == 2: raise
+        thinking.observe("research", retries=attempt, grounding_chunks=len(chunks or []))
+
+    # grounding_supports 가 가리키는 청크만 (뒷받침이 많은 순으로) 리다이렉트를 풀어 참고 문헌에 싣습니다.
+    # 본문이 기대지 않은 청크는 풀지도 싣지도 않습니다. (common/grounding.py)
+    with tracer.span("citations", chunks=len(chunks or [])):
+        citations = []
+        if chunks:
+            cited, uncited = cited_web_chunks(research_response.candidates[0].grounding_metadata)
+            citations = resolve_citations(cited, get_final_url_urllib)
+            tracer.set(cited=len(cited), skipped=len(uncited))
+            if uncited:
+                print(f"      Skipped {len(uncited)} uncited chunks")
+
+    research_notes = trim_to_budget(research_response.text, RESEARCH_NOTES_TOKEN_BUDGET, keep="head")
     print(f"      Collected {len(chunks) if chunks else 0} chunks")
 
     print(f"   ...Phase 1.5: Selecting NEXT topic...")
@@ -216,7 +381,6 @@ def generate_daily_content(state):
         system_instruction=get_planner_prompt(),
         tools=[grounding_tool],
         temperature=0.0,
-        thinking_config=types.ThinkingConfig(thinking_budget=24576, include_thoughts=False)
     )
 
     planner_prompt = f"""
@@ -225,20 +389,17 @@ def generate_daily_content(state):
 * Recent Topics History: {recent_history_str}
 """
 
-    planner_response = client.models.generate_content(
-        model=RESEARCH_MODEL_NAME,
-        contents=planner_prompt,
-        config=planner_config
-    )
+    with tracer.span("plan"):
+        planner_response = router.generate(client, "plan", planner_prompt, planner_config)
 
-    next_plan = json.loads(repair_json(planner_response.text))
+        next_plan = json.loads(repair_json(planner_response.text))
+        thinking.observe("plan", valid=True)
     print(f"      -> Next Plan: {next_plan['next_topic']} ({next_plan['next_year']})")
 
-    print(f"   ...Phase 2: Writing content with {WRITER_MODEL_NAME}")
+    print(f"   ...Phase 2: Writing content with {router.preferred_model('write')}")
 
-    writer_user_prompt = f"""
-    **Task:** Write the blog post for Day {day_count}.
-    
+    # 조사 노트와 맥락은 단일 작성과 섹션 분할 작성이 같이 씁니다.
+    writer_context = f"""
     **Research Data:**
     {research_notes}
 
@@ -250,59 +411,154 @@ def generate_daily_content(state):
     Last Topic: {last_topic} ({last_year})
     Today's Topic: {next_topic} ({next_year})
     """
+    writer_user_prompt = f"""
+    **Task:** Write the blog post for Day {day_count}.
+    {writer_context}"""
 
     writer_config = types.GenerateContentConfig(
         system_instruction=get_writer_prompt(),
         temperature=0.4,
-        thinking_config=types.ThinkingConfig(thinking_level="high", include_thoughts=False)
     )
-
-    writer_response = client.models.generate_content(
-        model=WRITER_MODEL_NAME,
-        contents=writer_user_prompt,
-        config=writer_config
+    estimate = router.estimate("write", writer_user_prompt, writer_config)
+    print(f"      (Writer prompt ~{estimate['prompt_tokens']} tokens, input ~${estimate['cost'] or 0:.4f} on {estimate['model']})")
+
+    # 응답이 도착한 뒤 JSON 파싱까지 통과해야 유효한 결과로 인정합니다.
+    def parse_post(response):
+        with tracer.span("parse"):
+            return HistoryBotResponse.model_validate_json(repair_json(response.text))
+
+    def write_post():
+        return router.generate(
+            client, "write", writer_user_prompt, writer_config,
+            validate=parse_post
+        )
+
+    # 섹션 분할 모드: metadata 는 오늘 주제와 플래너 결정으로 채우고, 이어 붙인 content 는 아래 템플릿 검사를 거칩니다.
+    def write_sections():
+        # 부분 요청은 JSON 형식 지시가 빠진 마크다운 전용 지시문을 씁니다.
+        part_config = types.GenerateContentConfig(
+            system_instruction=markdown_only(get_writer_prompt()),
+            temperature=0.4,
+        )
+        parts = write_parts(client, router, writer_context, day_count, f"{next_topic} ({next_year})", part_config)
+        return HistoryBotResponse.model_validate({
+            "content": assemble(parts, day_count),
+            "metadata": {"current_year": next_year, "current_topic": next_topic,
+                         "next_topic": next_plan['next_topic'], "next_year": next_plan['next_year']},
+        })
+
+    started, first_decision = time.perf_counter(), len(router.decisions)
+    with tracer.span("write", mode=WRITER_MODE):
+        draft = write_sections() if WRITER_MODE == "sections" else write_post()
+    with tracer.span("template_check"):
+        response_json = enforce_template(client, router, draft, day_count, next_topic, next_plan, research_notes, rewrite=write_post)
+    record_benchmark(RUN_DATA_DIR, WRITER_MODE, day_count, time.perf_counter() - started, router.decisions[first_decision:])
+    router.report()
+    hedger.report()
+    context_cache.report(router.decisions)
+    thinking.commit()
+
+    return response_json, citations, router.decisions
+
+# --- [Speculative Pre-generation] ---
+# 내일 생성에 쓰이는 입력이 모두 오늘 정해지므로, BOT_SPECULATIVE=1 이면 발행 직후 다음 Day 를 drafts/ 에 미리 만듭니다.
+# 다음 실행은 입력 지문이 같을 때 모델 호출 없이 초안을 발행합니다. (common/speculative.py)
+SPECULATION_STATE_KEYS = ["day_count", "current_year", "last_topic", "next_topic", "next_year"]
+draft_store = DraftStore(SCRIPT_DIR)
+
+def input_fingerprint(state):
+    return fingerprint(
+        {key: state.get(key) for key in SPECULATION_STATE_KEYS},
+        [get_researcher_prompt(), get_planner_prompt(), get_writer_prompt()],
+        MODEL_ROUTES,
     )
 
-    response_json = HistoryBotResponse.model_validate_json(repair_json(writer_response.text))
+def generate_or_take_draft(state):
+    """(응답, 인용, 라우팅 기록, 초안 사용 여부)"""
+    draft = draft_store.take(state['day_count'], input_fingerprint(state))
+    if draft is None:
+        return (*generate_daily_content(state), False)
+    HistoryBotResponse = load_models()
+    return HistoryBotResponse.model_validate(draft['response']), draft['citations'], draft['routing'], True
 
-    response_json.content += f"\n\n## 📚 참고 문헌\n{citation_list_str}"
-    response_json.content += f"\n\n*이 콘텐츠는 AI에 의해 생성되었으며, 오류나 부정확한 정보를 포함할 수 있습니다.*"
-    
-    return response_json
+def speculate_next_day(state):
+    if not SPECULATIVE_ENABLED or is_finished(state):
+        return
+    print(f"🔮 Day {state['day_count']} 초안 미리 생성... ({state['next_year']}년 {state['next_topic']})")
+    with tracer.span("speculate", day=state['day_count']):
+        try:
+            content_response, citations, routing = generate_daily_content(state)
+            draft_store.discard_except(state['day_count'])
+            draft_store.save(state['day_count'], input_fingerprint(state), {
+                "response": content_response.model_dump(), "citations": citations, "routing": routing,
+            })
+            print("📝 초안 저장 완료.")
+        except Exception as e:
+            # 오늘 포스트는 이미 발행되었으므로 실패해도 다음 실행이 평소처럼 생성합니다.
+            print(f"⚠️ 초안 미리 생성 실패: {e}")
+            thinking.commit(crashed=True)
 
 # --- [Main Execution] ---
-def extract_metadata(content, current_state):    
+def extract_metadata(content, current_state, slot=None):    
     new_state = current_state.copy()
     new_state['day_count'] += 1
     new_state['last_run_date'] = datetime.now().strftime("%Y-%m-%d")
+    # 같은 실행 칸에서 다시 실행되면 만들게 될 대상(다음 Day)의 키를 남겨, 그 실행이 중복으로 건너뛰게 합니다.
+    new_state['last_run_key'] = run_key(slot or run_slot(MAX_RUNS_PER_DAY), new_state['day_count'])
     new_state['current_year'] = content.metadata.current_year
     new_state['last_topic'] = content.metadata.current_topic
     new_state['next_topic'] = content.metadata.next_topic
     new_state['next_year'] = content.metadata.next_year
     return new_state
 
-def main():
-    state = load_state()
-    
-    current_actual_year = datetime.now().year
-    termination_threshold = current_actual_year - 3
+def get_termination_threshold():
+    return datetime.now().year - 3
 
+def is_finished(state):
     next_year_candidate = state.get('next_year')
-    if not isinstance(next_year_candidate, int) or next_year_candidate >= termination_threshold:
+    return not isinstance(next_year_candidate, int) or next_year_candidate >= get_termination_threshold()
+
+def main(force=False):
+    state = load_state()
+    termination_threshold = get_termination_threshold()
+
+    if is_finished(state):
         if state['day_count'] > 0:
             print("🛑 [알림] AI 역사 봇의 여정이 완료되었습니다.")
         else:
              print("⚠️ [경고] 초기 상태 오류. bot_state.json을 확인하세요.")
         return
 
+    lock = RunLock(SCRIPT_DIR)
+    if not lock.acquire():
+        return
+    # lock 을 잡기 전에 다른 실행이 상태를 바꿨을 수 있으므로 다시 읽고, 종료/중복 검사도 그 상태로 다시 합니다.
+    state = load_state()
+    if is_finished(state):
+        print("🛑 [알림] 다른 실행이 연재를 마쳤습니다.")
+        lock.release()
+        return
+    today, slot = datetime.now().strftime('%Y-%m-%d'), run_slot(MAX_RUNS_PER_DAY)
+    duplicate = None if force else find_duplicate_run(
+        POSTS_DIR, state['day_count'], today,
+        [state_store.snapshot_path, state_store.journal_path], MAX_RUNS_PER_DAY,
+        last_run_key=state.get('last_run_key'), slot=slot
+    )
+    if duplicate:
+        print(f"⏭️ [건너뜀] {duplicate}")
+        lock.release()
+        return
+
     print(f"🤖 Day {state['day_count']} 콘텐츠 생성 시작... ({state['next_year']}년 {state['next_topic']})")
+    tracer.start("ai_history", day=state['day_count'])
     
     try:
-        content_response = generate_daily_content(state)
+        with tracer.span("generate") as span:
+            content_response, citations, routing, from_draft = generate_or_take_draft(state)
+            span["attrs"]["from_draft"] = from_draft
         
         if content_response.metadata.next_year >= termination_threshold:
             target_header = "## 📅 내일의 키워드 예고"
-            citation_header = "## 📚 참고 문헌"
             
             replacement_section = f"""
 ## 🛑 긴 여정의 마침표
@@ -315,48 +571,43 @@ def main():
 """
             if target_header in content_response.content:
                 base_content = content_response.content.split(target_header)[0].strip()
-                citation_start_index = content_response.content.find(citation_header)
-                if citation_start_index != -1:
-                    footer_content = content_response.content[citation_start_index:]
-                else:
-                    footer_content = ""
-                content_response.content = f"{base_content}\n\n{replacement_section}\n\n{footer_content}"
-
-        content = content_response.content.strip()
-        title = content.splitlines()[0].replace("#", "").strip()
-        body = "\n".join(content.splitlines()[1:]).strip()
-        filename = f"{datetime.now().strftime('%Y-%m-%d')}-day{state['day_count']}.md"
-        
-        # categories를 ai_history로 지정
-        header = f"""
----
-title:  "{title}"
-categories:
-  - ai_history
-toc: true
-toc_sticky: true
-comments: true
----
-"""
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        # 생성된 md 파일을 _posts/ai_history 에 저장
-        target_dir = os.path.normpath(os.path.join(script_dir, "..", "..", "_posts", "ai_history"))
-        os.makedirs(target_dir, exist_ok=True)
+                content_response.content = f"{base_content}\n\n{replacement_section}"
+
+        with tracer.span("save"):
+            filename = f"{today}-day{state['day_count']}.md"
+            post_path = os.path.join(POSTS_DIR, filename)
+            artifact = new_artifact(post_path, state['day_count'], {"web": citations}, routing,
+                                    response=content_response.model_dump(), speculative=from_draft)
+            artifact_store.save(post_path, artifact)
+
+            # 생성된 md 파일을 _posts/ai_history 에 저장
+            target_dir = POSTS_DIR
+            os.makedirs(target_dir, exist_ok=True)
         
-        with open(os.path.join(target_dir, filename), 'w', encoding='utf-8') as f:
-            f.write(header.strip() + "\n\n" + body)
+            with open(post_path, 'w', encoding='utf-8') as f:
+                f.write(render_post(artifact))
 
-        new_state = extract_metadata(content_response, state)
+        new_state = extract_metadata(content_response, state, slot)
         save_state(new_state)
+        run_publish_stages(post_path)
         print("💾 상태 저장 및 파일 생성 완료.")
+        speculate_next_day(new_state)
 
     except Exception as e:
+        thinking.commit(crashed=True)
         print(f"❌ 오류 발생: {e}")
         traceback.print_exc()
         raise
+    finally:
+        tracer.finish(RUN_DATA_DIR)
+        lock.release()
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv[1:]:
+        from common.startup import profile_startup
+        ok = profile_startup("ai_history_bot", HEAVY_IMPORTS, SCRIPT_DIR)
+        sys.exit(0 if ok else 1)
     try:
-        main()
+        main(force="--force" in sys.argv[1:])
     except Exception as e:
         sys.exit(1)
\ No newline at end of file
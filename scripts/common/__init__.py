@@ -0,0 +1,2 @@
+# 세 봇(ai_history, cs_history, ghost_in_the_legacy)이 공유하는 유틸리티 모음.
+# 봇 진입점이 가볍게 시작할 수 있도록 이 패키지의 모듈은 최상단에서 표준 라이브러리만 import 합니다.
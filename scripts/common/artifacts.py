@@ -0,0 +1,66 @@
+"""
+포스트 아티팩트 저장소.
+
+봇은 실행마다 모델 응답(JSON), 메타데이터, 확인된 인용(버킷별), 모델/토큰 사용량을
+scripts/<bot>/artifacts/<포스트 파일명>.json 에 남깁니다. 마크다운은 이 아티팩트로부터 렌더링되므로
+인용 블록, 면책 문구, front matter 형식을 바꿔도 모델을 다시 호출하지 않고 common/render.py 로 전체를 다시 만들 수 있습니다.
+
+아티팩트 공통 필드:
+    version, post(저장소 기준 포스트 경로), created, day, source("generated" | "backfill"),
+    citations: {버킷: [{"title", "url"}]}, models: 라우팅 기록(모델, 지연시간, 토큰 사용량)
+나머지 필드(response, text ...)는 봇의 render_post 가 정의합니다.
+"""
+import glob
+import json
+import os
+from datetime import datetime
+
+from common.posts import relative_path
+from common.state_store import atomic_write_text
+
+ARTIFACT_VERSION = 1
+ARTIFACT_DIR = "artifacts"
+
+
+def citation_entries(chunks):
+    """{url: title} → [{"title", "url"}]"""
+    return [{"title": title, "url": url} for url, title in chunks.items()]
+
+
+def new_artifact(post_path, day, citations, models, **fields):
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "post": relative_path(post_path),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "day": day,
+        "source": "generated",
+        "citations": citations,
+        "models": models,
+    }
+    artifact.update(fields)
+    return artifact
+
+
+class ArtifactStore:
+    def __init__(self, bot_dir):
+        self.directory = os.path.join(bot_dir, ARTIFACT_DIR)
+
+    def path_for(self, post_path):
+        name = os.path.splitext(os.path.basename(post_path))[0]
+        return os.path.join(self.directory, f"{name}.json")
+
+    def save(self, post_path, artifact):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(post_path)
+        atomic_write_text(path, json.dumps(artifact, ensure_ascii=False, separators=(",", ":")))
+        return path
+
+    def load(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def exists(self, post_path):
+        return os.path.exists(self.path_for(post_path))
+
+    def list(self):
+        return sorted(glob.glob(os.path.join(self.directory, "*.json")))
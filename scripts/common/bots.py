@@ -0,0 +1,33 @@
+"""봇 목록과 봇 모듈 로더 (render, scheduler 처럼 여러 봇을 다루는 명령이 함께 씁니다)"""
+import importlib.util
+import os
+import sys
+
+from common.posts import REPO_ROOT
+
+SCRIPTS_DIR = os.path.join(REPO_ROOT, "scripts")
+# 봇 폴더 → 진입점 모듈 (main, load_state, render_post ... 를 정의)
+BOTS = {
+    "ai_history": "ai_history_bot",
+    "cs_history": "cs_history_bot",
+    "ghost_in_the_legacy": "main",
+}
+
+_modules = {}
+
+
+def load_bot(bot):
+    """
+    봇 모듈을 한 번만 읽습니다. 진입점 이름이 겹치지 않도록(main.py) 폴더 이름으로 등록합니다.
+    봇을 스크립트로 실행할 때처럼 봇 폴더를 sys.path 에 넣어, load_models() 의 *_models import 가 찾아지게 합니다.
+    """
+    if bot not in _modules:
+        directory = os.path.join(SCRIPTS_DIR, bot)
+        if directory not in sys.path:
+            sys.path.append(directory)
+        path = os.path.join(directory, f"{BOTS[bot]}.py")
+        spec = importlib.util.spec_from_file_location(f"_bot_{bot}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[bot] = module
+    return _modules[bot]
@@ -0,0 +1,331 @@
+"""
+발행된 포스트 목록 (SQLite 캐시).
+
+_posts/<series>/*.md 의 front matter, 제목, 템플릿 섹션, 참고 문헌 URL 을 run_data/posts_catalog.sqlite 에 정리해 두고
+연재/Day/연도/주제/URL 로 조회합니다. 포스트를 다시 읽어야 하는지는 경로별 (mtime, 크기) 로 먼저 보고,
+바뀌었으면 내용 해시를 비교해 실제로 달라진 파일만 다시 파싱합니다. (체크아웃으로 mtime 만 바뀐 경우는 기록만 고칩니다)
+
+* 연도/주제: 역사 봇은 '오늘의 키워드' 헤더와 '시기:' 줄(없으면 제목의 괄호 연도), '원어:' 줄에서 읽습니다.
+* 검사: 각 봇의 상태(bot_state.json + 저널)와 목록을 비교합니다.
+  - Day 번호가 비거나 겹치지 않는지, 제목의 Day 와 파일 이름의 Day 가 맞는지
+  - 마지막 포스트의 Day / 연도 / 주제가 상태의 day_count / current_year / last_topic 과 맞는지
+
+usage: python -m common.catalog [bot ...] [--rebuild] | --self-test
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+
+from common.post_template import parse_sections
+from common.posts import CITATION_HEADERS, SERIES, SHARED_RUN_DATA_DIR, citation_links, list_posts, read_post, strip_citations
+
+CATALOG_PATH = os.path.join(SHARED_RUN_DATA_DIR, "posts_catalog.sqlite")
+# 스키마를 바꾸면 올립니다. 버전이 다르면 처음부터 다시 만듭니다.
+SCHEMA_VERSION = 1
+# 상태의 day_count 와 마지막 포스트 파일 Day 의 차이 (역사 봇은 저장 뒤에, ghost 봇은 저장 전에 day_count 를 올립니다)
+STATE_DAY_OFFSET = {"ai_history": 1, "cs_history": 1, "ghost_in_the_legacy": 0}
+# 제목의 Day 와 파일 이름의 Day 의 차이 (ghost 봇의 제목은 올리기 전 day_count 를 씁니다)
+TITLE_DAY_OFFSET = {"ghost_in_the_legacy": -1}
+KEYWORD_SECTION = "## 🕰️ 오늘의 키워드"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    path TEXT PRIMARY KEY, series TEXT NOT NULL, day INTEGER, date TEXT, title TEXT, title_day INTEGER,
+    topic TEXT, original TEXT, year INTEGER, url TEXT, chars INTEGER,
+    mtime_ns INTEGER, size INTEGER, digest TEXT
+);
+CREATE INDEX IF NOT EXISTS posts_series_day ON posts (series, day);
+CREATE INDEX IF NOT EXISTS posts_year ON posts (year);
+CREATE TABLE IF NOT EXISTS sections (
+    path TEXT NOT NULL, position INTEGER NOT NULL, header TEXT, chars INTEGER, PRIMARY KEY (path, position)
+);
+CREATE TABLE IF NOT EXISTS citations (
+    path TEXT NOT NULL, position INTEGER NOT NULL, title TEXT, url TEXT, PRIMARY KEY (path, position)
+);
+CREATE INDEX IF NOT EXISTS citations_url ON citations (url);
+"""
+
+_DAY_FILE = re.compile(r"-day(\d+)\.md$")
+_DAY_TITLE = re.compile(r"Day\s+(\d+)")
+_PERIOD = re.compile(r"^\s*\*\s*시기\s*:\s*.*?(\d{4})", re.MULTILINE)
+_ORIGINAL = re.compile(r"^\s*\*\s*원어\s*:\s*(.+)$", re.MULTILINE)
+_TITLE_YEAR = re.compile(r"\((\d{4})\)\s*$")
+
+
+def normalize_topic(text):
+    """비교용: 영숫자/한글만 남긴 소문자"""
+    return re.sub(r"[^0-9a-z가-힣]+", "", (text or "").lower())
+
+
+def parse_post(path):
+    """포스트 하나 → (posts 행, [(헤더, 글자 수)], [(제목, URL)])"""
+    post = read_post(path)
+    _, _, sections = parse_sections(f"{post['title']}\n{strip_citations(post['body'])}")
+    cut = min([i for i in (post["body"].find(h) for h in CITATION_HEADERS) if i != -1], default=len(post["body"]))
+    day = _DAY_FILE.search(path)
+    title_day = _DAY_TITLE.search(post["title"])
+    topic = original = year = None
+    for header, text in sections:
+        if header.startswith(KEYWORD_SECTION):
+            topic = header[len(KEYWORD_SECTION):].lstrip(":： ").strip() or None
+            period, source = _PERIOD.search(text), _ORIGINAL.search(text)
+            year = int(period.group(1)) if period else None
+            original = source.group(1).strip() if source else None
+            break
+    if year is None and _TITLE_YEAR.search(post["title"]):
+        year = int(_TITLE_YEAR.search(post["title"]).group(1))
+    row = {
+        "path": post["path"], "series": post["category"], "day": int(day.group(1)) if day else None,
+        "date": post["date"], "title": post["title"], "title_day": int(title_day.group(1)) if title_day else None,
+        "topic": topic, "original": original, "year": year, "url": post["url"], "chars": len(post["body"][:cut]),
+    }
+    return row, [(header, len(text)) for header, text in sections], citation_links(post["body"][cut:])
+
+
+class PostsCatalog:
+    def __init__(self, path=CATALOG_PATH, posts=None):
+        """posts: 포스트 경로 목록을 돌려주는 함수 (기본은 _posts 아래 모든 연재)"""
+        self.path = path
+        self.posts = posts or list_posts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.executescript("DROP TABLE IF EXISTS posts; DROP TABLE IF EXISTS sections; DROP TABLE IF EXISTS citations;")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def refresh(self, rebuild=False):
+        """바뀐 포스트만 다시 파싱합니다. {"parsed", "touched", "unchanged", "removed"} 개수를 반환합니다."""
+        from common.posts import relative_path
+        counts = {"parsed": 0, "touched": 0, "unchanged": 0, "removed": 0}
+        known = {row["path"]: row for row in self.db.execute("SELECT path, mtime_ns, size, digest FROM posts")}
+        seen = set()
+        with self.db:
+            if rebuild:
+                known = {}
+                self.db.executescript("DELETE FROM posts; DELETE FROM sections; DELETE FROM citations;")
+            for path in self.posts():
+                ref = relative_path(path)
+                seen.add(ref)
+                stat = os.stat(path)
+                entry = known.get(ref)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    counts["unchanged"] += 1
+                    continue
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()[:12]
+                if entry and entry["digest"] == digest:
+                    self.db.execute("UPDATE posts SET mtime_ns = ?, size = ? WHERE path = ?", (stat.st_mtime_ns, stat.st_size, ref))
+                    counts["touched"] += 1
+                    continue
+                self._store(path, ref, stat, digest)
+                counts["parsed"] += 1
+            for ref in set(known) - seen:
+                self._delete(ref)
+                counts["removed"] += 1
+        return counts
+
+    def _delete(self, ref):
+        for table in ("posts", "sections", "citations"):
+            self.db.execute(f"DELETE FROM {table} WHERE path = ?", (ref,))
+
+    def _store(self, path, ref, stat, digest):
+        row, sections, citations = parse_post(path)
+        row.update(path=ref, mtime_ns=stat.st_mtime_ns, size=stat.st_size, digest=digest)
+        self._delete(ref)
+        self.db.execute(f"INSERT INTO posts ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})", list(row.values()))
+        self.db.executemany("INSERT INTO sections VALUES (?, ?, ?, ?)",
+                            [(ref, i, header, chars) for i, (header, chars) in enumerate(sections)])
+        self.db.executemany("INSERT INTO citations VALUES (?, ?, ?, ?)",
+                            [(ref, i, title, url) for i, (title, url) in enumerate(citations)])
+
+    # --- [Queries] ---
+    def _posts(self, where="1", params=()):
+        return [dict(row) for row in self.db.execute(f"SELECT * FROM posts WHERE {where} ORDER BY series, day, path", params)]
+
+    def series(self, series):
+        return self._posts("series = ?", (series,))
+
+    def day(self, series, day):
+        posts = self._posts("series = ? AND day = ?", (series, day))
+        return posts[0] if posts else None
+
+    def latest(self, series):
+        row = self.db.execute("SELECT * FROM posts WHERE series = ? ORDER BY day DESC, path DESC LIMIT 1", (series,)).fetchone()
+        return dict(row) if row else None
+
+    def year(self, start, end=None, series=None):
+        """start ~ end 년 (end 가 없으면 그 해만)"""
+        where, params = "year BETWEEN ? AND ?", [start, start if end is None else end]
+        if series:
+            where, params = where + " AND series = ?", params + [series]
+        return self._posts(where, params)
+
+    def topic(self, text):
+        """주제/원어/제목에 text 가 들어간 포스트 (대소문자 무시)"""
+        like = f"%{text}%"
+        return self._posts("topic LIKE ? OR original LIKE ? OR title LIKE ?", (like, like, like))
+
+    def citing(self, url):
+        """url 을 참고 문헌에 실은 포스트"""
+        return self._posts("path IN (SELECT path FROM citations WHERE url = ?)", (url,))
+
+    def sections(self, path):
+        return [dict(row) for row in self.db.execute(
+            "SELECT header, chars FROM sections WHERE path = ? ORDER BY position", (path,))]
+
+    def citations(self, path):
+        return [dict(row) for row in self.db.execute(
+            "SELECT title, url FROM citations WHERE path = ? ORDER BY position", (path,))]
+
+
+def open_catalog(path=CATALOG_PATH, rebuild=False):
+    """최신 상태로 갱신한 목록"""
+    catalog = PostsCatalog(path)
+    catalog.refresh(rebuild=rebuild)
+    return catalog
+
+
+# --- [Cross-check] ---
+def check_series(catalog, series, state):
+    """목록과 봇 상태가 어긋난 곳의 설명 목록"""
+    problems = []
+    posts = catalog.series(series)
+    if not posts:
+        return [f"포스트가 없습니다 (day_count={state.get('day_count')})"] if state.get("day_count") else []
+    days = [p["day"] for p in posts if p["day"] is not None]
+    for day in sorted({d for d in days if days.count(d) > 1}):
+        problems.append(f"Day {day} 포스트가 여러 개입니다: {', '.join(p['path'] for p in posts if p['day'] == day)}")
+    missing = sorted(set(range(min(days), max(days) + 1)) - set(days)) if days else []
+    if missing:
+        problems.append(f"빠진 Day: {', '.join(map(str, missing))}")
+    offset = TITLE_DAY_OFFSET.get(series, 0)
+    for post in posts:
+        if post["day"] is None:
+            problems.append(f"파일 이름에 Day 가 없습니다: {post['path']}")
+        elif post["title_day"] is not None and post["title_day"] != post["day"] + offset:
+            problems.append(f"제목 Day {post['title_day']} ≠ 파일 Day {post['day']}: {post['path']}")
+
+    last = catalog.latest(series)
+    expected_day = last["day"] + STATE_DAY_OFFSET.get(series, 1)
+    if state.get("day_count") != expected_day:
+        problems.append(f"상태 day_count={state.get('day_count')} 이지만 마지막 포스트는 Day {last['day']} 입니다 ({last['path']})")
+    if "current_year" in state and last["year"] is not None and state["current_year"] != last["year"]:
+        problems.append(f"상태 current_year={state['current_year']} 이지만 마지막 포스트는 {last['year']}년입니다")
+    if state.get("last_topic") and last["topic"]:
+        wanted = normalize_topic(state["last_topic"])
+        if wanted not in {normalize_topic(last["topic"]), normalize_topic(last["original"])}:
+            problems.append(f"상태 last_topic={state['last_topic']!r} 이지만 마지막 포스트 주제는 {last['topic']!r} ({last['original']}) 입니다")
+    return problems
+
+
+def check(bots, catalog):
+    """{bot: 문제 목록}"""
+    from common.bots import SCRIPTS_DIR
+    from common.state_store import StateStore
+    results = {}
+    for bot in bots:
+        state = StateStore(os.path.join(SCRIPTS_DIR, bot), {}).load()
+        results[bot] = check_series(catalog, bot, state)
+    return results
+
+
+def self_test():
+    import tempfile
+    import time
+
+    def write(directory, name, title, body):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f'---\ntitle:  "{title}"\ncategories:\n  - ai_history\n---\n\n{body}')
+        return path
+
+    def history_body(topic, original, year, url):
+        return (f"안녕하세요! 오늘의 여정입니다.\n\n{KEYWORD_SECTION}: {topic}\n * 원어: {original}\n * 시기: {year}년\n\n본문\n\n"
+                f"## ⚡ 무엇이 혁명적이었나? (Deep Dive)\n깊이\n\n## 📅 내일의 키워드 예고\n예고\n\n"
+                f"## 📚 참고 문헌\n* [source]({url})\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        posts_dir = os.path.join(tmp, "_posts", "ai_history")
+        os.makedirs(posts_dir)
+        paths = [
+            write(posts_dir, "2026-01-01-day0.md", "Day 0: MCP 뉴런 (1943)",
+                  history_body("매컬러-피츠 뉴런", "McCulloch-Pitts Neuron", 1943, "https://example.com/mcp")),
+            write(posts_dir, "2026-01-02-day1.md", "Day 1: 튜링 테스트",
+                  history_body("튜링 테스트", "Turing Test (Imitation Game)", 1950, "https://example.com/turing")),
+        ]
+        catalog = PostsCatalog(os.path.join(tmp, "catalog.sqlite"), posts=lambda: sorted(paths))
+
+        assert catalog.refresh() == {"parsed": 2, "touched": 0, "unchanged": 0, "removed": 0}
+        assert catalog.refresh() == {"parsed": 0, "touched": 0, "unchanged": 2, "removed": 0}
+        first = catalog.day("ai_history", 0)
+        assert first["year"] == 1943 and first["topic"] == "매컬러-피츠 뉴런" and first["title_day"] == 0
+        assert [s["header"][:5] for s in catalog.sections(first["path"])] == [KEYWORD_SECTION[:5], "## ⚡ ", "## 📅 "]
+        assert catalog.citations(first["path"]) == [{"title": "source", "url": "https://example.com/mcp"}]
+        assert [p["day"] for p in catalog.year(1940, 1960)] == [0, 1] and [p["day"] for p in catalog.year(1950)] == [1]
+        assert catalog.topic("turing")[0]["day"] == 1
+        assert catalog.citing("https://example.com/turing")[0]["day"] == 1
+
+        # mtime 만 바뀌면 다시 파싱하지 않고, 내용이 바뀐 파일만 다시 파싱합니다.
+        later = time.time() + 10
+        os.utime(paths[0], (later, later))
+        assert catalog.refresh()["touched"] == 1
+        write(posts_dir, "2026-01-02-day1.md", "Day 1: 튜링 테스트",
+              history_body("튜링 테스트", "Turing Test", 1950, "https://example.com/turing-v2"))
+        os.utime(paths[1], (later + 10, later + 10))
+        assert catalog.refresh()["parsed"] == 1
+        assert not catalog.citing("https://example.com/turing") and catalog.citing("https://example.com/turing-v2")
+
+        state = {"day_count": 2, "current_year": 1950, "last_topic": "Turing Test"}
+        assert check_series(catalog, "ai_history", state) == []
+        problems = check_series(catalog, "ai_history", {"day_count": 5, "current_year": 1956, "last_topic": "Dartmouth"})
+        assert len(problems) == 3, problems
+
+        # 빠진 Day, 제목 불일치, 삭제된 파일
+        paths.append(write(posts_dir, "2026-01-04-day3.md", "Day 4: 다트머스", history_body("다트머스 회의", "Dartmouth", 1956, "https://example.com/d")))
+        problems = check_series(catalog, "ai_history", state) if catalog.refresh()["parsed"] == 1 else None
+        assert any("빠진 Day: 2" in p for p in problems) and any("제목 Day 4" in p for p in problems), problems
+        os.remove(paths.pop())
+        assert catalog.refresh()["removed"] == 1 and catalog.latest("ai_history")["day"] == 1
+        catalog.close()
+
+        # 스키마 버전이 다르면 다시 만듭니다.
+        db = sqlite3.connect(os.path.join(tmp, "catalog.sqlite"))
+        db.execute("PRAGMA user_version = 0")
+        db.close()
+        with PostsCatalog(os.path.join(tmp, "catalog.sqlite"), posts=lambda: sorted(paths)) as catalog:
+            assert catalog.refresh()["parsed"] == 2
+    print("✅ catalog self-test passed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--self-test" in args:
+        self_test()
+        sys.exit(0)
+    bots = [a for a in args if not a.startswith("--")] or SERIES
+    with PostsCatalog() as catalog:
+        counts = catalog.refresh(rebuild="--rebuild" in args)
+        print(f"🗂️ 포스트 목록 갱신: 파싱 {counts['parsed']}, mtime 만 갱신 {counts['touched']}, "
+              f"그대로 {counts['unchanged']}, 삭제 {counts['removed']}")
+        failed = False
+        for bot, problems in check(bots, catalog).items():
+            posts = catalog.series(bot)
+            print(f"{'✅' if not problems else '⚠️'} {bot}: 포스트 {len(posts)}개"
+                  + (f", 마지막 Day {posts[-1]['day']}" if posts else ""))
+            for problem in problems:
+                print(f"   - {problem}")
+            failed = failed or bool(problems)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,306 @@
+"""
+컨텍스트 캐시 관리.
+
+매 호출마다 다시 보내는 정적 입력(시스템 프롬프트, 도구 설정, 소설 시놉시스 같은 고정 앞부분)을
+Gemini 의 cached content 로 만들어 두고 generate_content 에서 cached_content 로 참조합니다.
+
+* 캐시 항목은 (모델, 시스템 프롬프트, 도구, 고정 앞부분)의 해시로 구분되며 scripts/run_data/context_cache.json 에 기록됩니다.
+  API 키 하나를 모든 봇이 같이 쓰므로 기록도 공용입니다.
+* 남은 수명이 REFRESH_MARGIN_SECONDS 보다 짧으면 TTL 을 연장하고, 만료되었거나 연장에 실패하면 새로 만듭니다.
+* 고정 부분의 로컬 추정 토큰 수(common/tokens.py)가 모델의 캐시 최소 크기(MIN_CACHE_TOKENS)보다 작으면 캐시를 만들지 않습니다.
+* 같은 고정 부분이 TTL 안에 CONTEXT_CACHE_MIN_USES 번째로 요청될 때 캐시를 만듭니다. 한 번 쓰고 버릴 캐시는
+  생성(입력 단가)과 저장 비용이 절약(할인된 읽기)보다 큽니다.
+* 그래서 실제로 캐시가 쓰이는 곳은 섹션 분할 모드(BOT_WRITER_MODE=sections)의 조사 노트뿐입니다.
+  역사 봇의 지시문(작성자 약 540, 플래너 약 300, 조사 약 145 추정 토큰)은 최소 크기보다 작고,
+  ghost 의 시놉시스는 크지만 12시간마다 한 번 쓰여 TTL 안에서 다시 쓰이지 않습니다.
+* 캐시를 만들 수 없으면(미지원 모델, 권한 등) 원래 요청을 그대로 보내고, 같은 항목은 하루 동안 다시 시도하지 않습니다.
+* 캐시를 참조한 호출이 캐시 없음/권한 오류(404, 403)로 실패할 때만 기록을 버립니다. 그 밖의 오류는 캐시와 무관합니다.
+* report() 는 라우팅 기록(usage_metadata)의 캐시된 토큰 수로 읽기 절약액을 구하고,
+  이번 실행의 캐시 생성(입력 단가)과 저장(CACHE_STORAGE_USD_PER_MTOK_HOUR) 비용을 빼서 순절약액을 출력합니다.
+
+python -m common.context_cache --self-test 는 common/fake_genai.py 대역으로 생성/재사용/연장/재생성/대체 경로를 점검합니다.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from common.posts import SHARED_RUN_DATA_DIR
+from common.state_store import atomic_write_text
+from common.tokens import PRICES, estimate_tokens
+
+CONTEXT_CACHE_ENABLED = os.environ.get("BOT_CONTEXT_CACHE", "1") == "1"
+CONTEXT_CACHE_TTL_SECONDS = int(os.environ.get("BOT_CONTEXT_CACHE_TTL", "3600"))
+CONTEXT_CACHE_MIN_USES = int(os.environ.get("BOT_CONTEXT_CACHE_MIN_USES", "2"))
+REFRESH_MARGIN_SECONDS = 300
+UNAVAILABLE_RETRY_SECONDS = 24 * 3600
+# 캐시된 입력 토큰의 할인율 (2.5 계열 기준, 저장 비용 제외)
+CACHED_TOKEN_DISCOUNT = 0.9
+# 캐시 저장 비용 (USD / 1M 토큰 / 시간, 2.5 계열 기준)
+CACHE_STORAGE_USD_PER_MTOK_HOUR = 1.0
+# 모델별 캐시 최소 입력 토큰 수. 이보다 작으면 API 가 거절하거나, 만들어도 저장 비용이 절약보다 큽니다.
+MIN_CACHE_TOKENS = {
+    "gemini-3-flash-preview": 1024,
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-flash-lite": 1024,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+REGISTRY_PATH = os.path.join(SHARED_RUN_DATA_DIR, "context_cache.json")
+
+
+def _get(config, key):
+    if isinstance(config, dict):
+        return config.get(key)
+    return getattr(config, key, None)
+
+
+def _copy(config, update):
+    if isinstance(config, dict):
+        return {**config, **update}
+    return config.model_copy(update=update)
+
+
+def _stable(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, (list, tuple)):
+        return [_stable(v) for v in value]
+    return value
+
+
+def _text(value):
+    if value is None or isinstance(value, str):
+        return value or ""
+    return json.dumps(_stable(value), ensure_ascii=False, default=str)
+
+
+def is_cache_missing(error):
+    """캐시를 참조한 호출이 캐시 때문에 실패했는지 (서버에서 지워졌거나 접근 권한이 없음)"""
+    text = str(error)
+    return getattr(error, "code", None) in (403, 404) or any(
+        marker in text for marker in ("404", "NOT_FOUND", "403", "PERMISSION_DENIED"))
+
+
+def cache_key(model, system_instruction, tools, prefix):
+    payload = json.dumps([model, _stable(system_instruction), _stable(tools), prefix],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ContextCache:
+    def __init__(self, registry_path=REGISTRY_PATH, enabled=CONTEXT_CACHE_ENABLED, ttl=CONTEXT_CACHE_TTL_SECONDS,
+                 min_uses=CONTEXT_CACHE_MIN_USES):
+        self.registry_path = registry_path
+        self.enabled = enabled
+        self.ttl = ttl
+        self.min_uses = min_uses
+        self.events = Counter()
+        # 이번 실행에서 캐시를 만들고 유지하는 데 든 비용 (USD)
+        self.overhead_usd = 0.0
+        # 캐시가 없는 고정 부분의 최근 요청 시각 {key: [시각]}
+        self._seen = {}
+        self.entries = self._load()
+        # 섹션 분할 작성처럼 같은 앞부분으로 동시에 호출해도 캐시는 하나만 만듭니다.
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not os.path.exists(self.registry_path):
+            return {}
+        try:
+            with open(self.registry_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {key: entry for key, entry in entries.items()
+                if max(entry.get("expires", 0), entry.get("unavailable_until", 0)) > now}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.registry_path), exist_ok=True)
+        atomic_write_text(self.registry_path, json.dumps(self.entries, ensure_ascii=False, indent=2))
+
+    def apply(self, client, model, config, contents, prefix=None):
+        """
+        (config, contents, key) 를 반환합니다. 캐시를 쓰면 config 에서 시스템 프롬프트/도구를 빼고 cached_content 를 넣으며,
+        contents 에서 prefix 를 뺍니다. 캐시를 쓰지 못하면 key 는 None 이고 요청은 캐시가 없을 때와 같습니다.
+        """
+        full_contents = prefix + contents if prefix else contents
+        system_instruction = _get(config, "system_instruction")
+        if not self.enabled or not (system_instruction or prefix):
+            return config, full_contents, None
+        tools = _get(config, "tools")
+        estimated = estimate_tokens(_text(system_instruction), prefix or "", tools=len(tools or []))
+        if estimated < MIN_CACHE_TOKENS.get(model, DEFAULT_MIN_CACHE_TOKENS):
+            self.events["too_small"] += 1
+            return config, full_contents, None
+        key = cache_key(model, system_instruction, tools, prefix)
+        with self._lock:
+            name = self._ensure(client, model, key, system_instruction, tools, prefix)
+        if not name:
+            return config, full_contents, None
+        return _copy(config, {"cached_content": name, "system_instruction": None, "tools": None}), contents, key
+
+    def _ensure(self, client, model, key, system_instruction, tools, prefix):
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry and entry.get("unavailable_until", 0) > now:
+            self.events["fallback"] += 1
+            return None
+        if entry and entry.get("name"):
+            remaining = entry["expires"] - now
+            if remaining > REFRESH_MARGIN_SECONDS:
+                self.events["reused"] += 1
+                return entry["name"]
+            if remaining > 0:
+                try:
+                    client.caches.update(name=entry["name"], config={"ttl": f"{self.ttl}s"})
+                    self._charge(model, entry.get("tokens"), storage_seconds=now + self.ttl - entry["expires"])
+                    entry["expires"] = now + self.ttl
+                    self.events["refreshed"] += 1
+                    self._save()
+                    return entry["name"]
+                except Exception as e:
+                    print(f"      (Context cache: TTL refresh failed for {entry['name']}, recreating: {e})")
+
+        uses = [t for t in self._seen.get(key, []) if now - t < self.ttl] + [now]
+        self._seen[key] = uses
+        if len(uses) < self.min_uses:
+            self.events["single_use"] += 1
+            return None
+
+        cache_config = {"ttl": f"{self.ttl}s", "display_name": f"bot-{key}"}
+        if system_instruction:
+            cache_config["system_instruction"] = system_instruction
+        if tools:
+            cache_config["tools"] = tools
+        if prefix:
+            cache_config["contents"] = [prefix]
+        try:
+            created = client.caches.create(model=model, config=cache_config)
+        except Exception as e:
+            print(f"      (Context cache unavailable for {model}, sending the full prompt: {str(e)[:200]})")
+            self.entries[key] = {"model": model, "unavailable_until": now + UNAVAILABLE_RETRY_SECONDS, "error": str(e)[:300]}
+            self.events["fallback"] += 1
+            self._save()
+            return None
+        usage = getattr(created, "usage_metadata", None)
+        self.entries[key] = {
+            "name": created.name, "model": model, "created": now, "expires": now + self.ttl,
+            "tokens": getattr(usage, "total_token_count", None),
+        }
+        self.events["created"] += 1
+        self._charge(model, self.entries[key]["tokens"], storage_seconds=self.ttl, created=True)
+        self._save()
+        return created.name
+
+    def _charge(self, model, tokens, storage_seconds, created=False):
+        if not tokens or model not in PRICES:
+            return
+        cost = tokens * CACHE_STORAGE_USD_PER_MTOK_HOUR * max(storage_seconds, 0) / 3600
+        if created:
+            cost += tokens * PRICES[model][0]
+        self.overhead_usd += cost / 1_000_000
+
+    def invalidate(self, key):
+        """캐시를 참조한 호출이 캐시 없음/권한 오류로 실패했을 때 기록을 지웁니다."""
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self.events["invalidated"] += 1
+                self._save()
+
+    def report(self, decisions):
+        ok = [d for d in decisions if d.get("outcome") == "ok"]
+        prompt_tokens = sum(d.get("prompt_tokens") or 0 for d in ok)
+        cached_tokens = sum(d.get("cached_tokens") or 0 for d in ok)
+        events = " ".join(f"{name}={count}" for name, count in sorted(self.events.items())) or "none"
+        share = cached_tokens / prompt_tokens if prompt_tokens else 0
+        saved_usd = sum((d.get("cached_tokens") or 0) * CACHED_TOKEN_DISCOUNT * PRICES[d["model"]][0]
+                        for d in ok if d.get("model") in PRICES) / 1_000_000
+        print(f"   [cache] {events} | cached {cached_tokens}/{prompt_tokens} prompt tokens ({share:.0%}),"
+              f" ~{cached_tokens * CACHED_TOKEN_DISCOUNT:.0f} input tokens saved"
+              f" | ${saved_usd:.5f} saved - ${self.overhead_usd:.5f} create/storage = net ${saved_usd - self.overhead_usd:.5f}")
+        return saved_usd - self.overhead_usd
+
+
+def self_test():
+    import tempfile
+    from common.fake_genai import FakeClient, FakeConfig
+    from common.model_router import ModelRouter, route
+
+    routes = {"write": [route("standard")]}
+    system = "SYSTEM PROMPT " * 500
+    with tempfile.TemporaryDirectory() as tmp:
+        registry = os.path.join(tmp, "context_cache.json")
+        client = FakeClient()
+        cache = ContextCache(registry, enabled=True, ttl=3600)
+        router = ModelRouter(routes, tmp, context_cache=cache)
+        # 처음 요청은 캐시 없이 보내고, TTL 안에 다시 요청되면 캐시를 만들어 씁니다.
+        for _ in range(3):
+            router.generate(client, "write", "hello", FakeConfig(system_instruction=system, tools=None))
+        assert cache.events == {"single_use": 1, "created": 1, "reused": 1}, cache.events
+        # 생성/저장 비용을 빼면 한 번 읽은 캐시는 손해이고, 여러 번 읽어야 이득입니다.
+        assert cache.report(router.decisions) < 0
+        for _ in range(6):
+            router.generate(client, "write", "hello", FakeConfig(system_instruction=system))
+        assert cache.report(router.decisions) > 0
+        assert router.decisions[-1]["cached_tokens"], router.decisions[-1]
+
+        # 다음 실행: 기록을 다시 읽고, 만료 직전이면 TTL 을 연장합니다.
+        entry = next(iter(cache.entries.values()))
+        entry["expires"] = time.time() + 10
+        cache._save()
+        cache = ContextCache(registry, enabled=True, ttl=3600, min_uses=1)
+        ModelRouter(routes, tmp, context_cache=cache).generate(client, "write", "hello", FakeConfig(system_instruction=system))
+        assert cache.events["refreshed"] == 1, cache.events
+
+        # 서버에서 사라진 캐시: 호출 실패 → 기록을 버리고 같은 단계를 캐시 없이 다시 시도 → 다음 호출에서 재생성
+        client.caches.entries.clear()
+        router = ModelRouter(routes, tmp, context_cache=cache)
+        router.generate(client, "write", "hello", FakeConfig(system_instruction=system))
+        router.generate(client, "write", "hello", FakeConfig(system_instruction=system))
+        assert cache.events["invalidated"] == 1 and cache.events["created"] == 1, cache.events
+
+        # 캐시와 무관한 오류는 기록을 지우지 않고 다음 단계로 넘어갑니다.
+        def flaky(model, contents, config):
+            if not flaky.failed:
+                flaky.failed = True
+                raise RuntimeError("500 INTERNAL: backend error")
+            return "ok"
+        flaky.failed = False
+        client.respond = flaky
+        cache.events.clear()
+        ModelRouter({"write": [route("standard"), route("standard")]}, tmp, context_cache=cache).generate(
+            client, "write", "hello", FakeConfig(system_instruction=system))
+        assert cache.events == {"reused": 2}, cache.events
+
+        # 고정 앞부분(prefix)은 캐시에 넣고 요청에는 나머지만 보냅니다.
+        seen = []
+        client = FakeClient(respond=lambda model, contents, config: seen.append(contents) or "ok")
+        ModelRouter(routes, tmp, context_cache=cache).generate(
+            client, "write", "dynamic part", FakeConfig(system_instruction="S"), cache_prefix="SYNOPSIS " * 600)
+        assert seen == ["dynamic part"], seen
+
+        # 최소 크기보다 작은 고정 부분은 캐시를 만들지 않고 그대로 보냅니다.
+        seen.clear()
+        cache = ContextCache(os.path.join(tmp, "other.json"), enabled=True, min_uses=1)
+        ModelRouter(routes, tmp, context_cache=cache).generate(
+            client, "write", "dynamic part", FakeConfig(system_instruction="S"), cache_prefix="P:")
+        assert seen == ["P:dynamic part"] and cache.events == {"too_small": 1}, (seen, cache.events)
+
+        # 캐시를 만들 수 없으면 전체 프롬프트를 그대로 보냅니다.
+        seen.clear()
+        client = FakeClient(respond=lambda model, contents, config: seen.append(contents) or "ok", min_cache_tokens=10 ** 6)
+        prefix = "PROLOGUE " * 600
+        ModelRouter(routes, tmp, context_cache=cache).generate(
+            client, "write", "dynamic part", FakeConfig(system_instruction="S"), cache_prefix=prefix)
+        assert seen == [prefix + "dynamic part"] and cache.events["fallback"] == 1, (seen, cache.events)
+        cache.report(router.decisions)
+    print("✅ context cache self-test passed")
+
+
+if __name__ == "__main__":
+    if "--self-test" in sys.argv[1:]:
+        self_test()
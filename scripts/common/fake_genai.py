@@ -0,0 +1,135 @@
+"""
+google-genai 클라이언트의 로컬 대역(stand-in).
+
+API 키나 네트워크 없이 common/ 모듈(모델 라우팅, 컨텍스트 캐시 ...)을 점검할 때 씁니다.
+client.models.generate_content 와 client.caches.create/get/update/delete 중 봇이 쓰는 부분만 흉내 냅니다.
+토큰 수는 글자 수로 어림합니다.
+"""
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+
+class FakeAPIError(Exception):
+    pass
+
+
+def count_tokens(value):
+    if value is None:
+        return 0
+    if isinstance(value, (list, tuple)):
+        return sum(count_tokens(v) for v in value)
+    return max(1, len(str(value)) // 2)
+
+
+def _get(config, key):
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return config.get(key)
+    return getattr(config, key, None)
+
+
+def _ttl_seconds(ttl):
+    return float(str(ttl).rstrip("s"))
+
+
+class FakeConfig(SimpleNamespace):
+    """GenerateContentConfig 대역. model_copy(update=...) 만 지원합니다."""
+
+    def model_copy(self, update=None):
+        values = dict(vars(self))
+        values.update(update or {})
+        return FakeConfig(**values)
+
+
+class FakeCaches:
+    def __init__(self, client):
+        self.client = client
+        self.entries = {}
+        self._ids = itertools.count(1)
+
+    def create(self, model, config):
+        if not self.client.caching_available:
+            raise FakeAPIError("context caching is not available for this key")
+        tokens = (count_tokens(_get(config, "system_instruction")) + count_tokens(_get(config, "contents"))
+                  + count_tokens(str(_get(config, "tools") or "")))
+        if tokens < self.client.min_cache_tokens:
+            raise FakeAPIError(f"cached content is too small: {tokens} < {self.client.min_cache_tokens} tokens")
+        name = f"cachedContents/fake-{next(self._ids)}"
+        entry = SimpleNamespace(
+            name=name, model=model, config=config, tokens=tokens,
+            expire_time=datetime.now(timezone.utc) + timedelta(seconds=_ttl_seconds(_get(config, "ttl") or "3600s")),
+            usage_metadata=SimpleNamespace(total_token_count=tokens),
+        )
+        self.entries[name] = entry
+        self.client.calls.append(("caches.create", name))
+        return entry
+
+    def _live(self, name):
+        entry = self.entries.get(name)
+        if entry is None or entry.expire_time <= datetime.now(timezone.utc):
+            self.entries.pop(name, None)
+            raise FakeAPIError(f"404 NOT_FOUND: {name}")
+        return entry
+
+    def get(self, name):
+        return self._live(name)
+
+    def update(self, name, config):
+        entry = self._live(name)
+        entry.expire_time = datetime.now(timezone.utc) + timedelta(seconds=_ttl_seconds(_get(config, "ttl")))
+        self.client.calls.append(("caches.update", name))
+        return entry
+
+    def delete(self, name):
+        self.entries.pop(name, None)
+
+
+class FakeModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        if self.client.latency:
+            time.sleep(self.client.latency)
+        cached_tokens = None
+        prompt_tokens = count_tokens(contents) + count_tokens(_get(config, "system_instruction"))
+        cached_name = _get(config, "cached_content")
+        if cached_name:
+            entry = self.client.caches._live(cached_name)
+            if entry.model != model:
+                raise FakeAPIError(f"cached content {cached_name} was created for {entry.model}, not {model}")
+            if _get(config, "system_instruction") or _get(config, "tools"):
+                raise FakeAPIError("system_instruction/tools must not be set together with cached_content")
+            cached_tokens = entry.tokens
+            prompt_tokens += entry.tokens
+        text = self.client.respond(model, contents, config)
+        self.client.calls.append(("generate_content", model, bool(cached_name)))
+        return SimpleNamespace(
+            text=text,
+            candidates=[SimpleNamespace(grounding_metadata=None)],
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=prompt_tokens,
+                candidates_token_count=count_tokens(text),
+                thoughts_token_count=None,
+                cached_content_token_count=cached_tokens,
+            ),
+        )
+
+
+class FakeClient:
+    """
+    respond(model, contents, config) -> str 로 응답 텍스트를 정할 수 있습니다.
+    min_cache_tokens / caching_available 로 캐시 생성 실패를 흉내 냅니다.
+    """
+
+    def __init__(self, respond=None, min_cache_tokens=0, caching_available=True, latency=0.0):
+        self.respond = respond or (lambda model, contents, config: "ok")
+        self.min_cache_tokens = min_cache_tokens
+        self.caching_available = caching_available
+        self.latency = latency
+        self.calls = []
+        self.models = FakeModels(self)
+        self.caches = FakeCaches(self)
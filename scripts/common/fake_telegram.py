@@ -0,0 +1,70 @@
+"""
+Telegram Bot API 의 로컬 대역(stand-in) 서버.
+
+토큰이나 네트워크 없이 common/notify.py 의 전송, 재시도, 속도 제한을 점검할 때 씁니다.
+POST /bot<token>/sendMessage 만 흉내 내며, 받은 메시지는 server.messages 에 쌓입니다.
+failures 에 ("429", 초) 나 ("500", None) 를 넣어 두면 그만큼의 요청을 차례로 실패시킵니다.
+
+    with FakeTelegramServer() as server:
+        transport = TelegramTransport("token", "chat", api_base=server.url)
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server.owner
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with server.lock:
+            server.requests.append((time.monotonic(), self.path, payload))
+            failure = server.failures.pop(0) if server.failures else None
+        if not self.path.endswith("/sendMessage") or f"/bot{server.token}/" not in self.path:
+            return self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+        if failure and failure[0] == "429":
+            return self._reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                     "parameters": {"retry_after": failure[1]}})
+        if failure:
+            return self._reply(int(failure[0]), {"ok": False, "error_code": int(failure[0]), "description": "Fake failure"})
+        if not payload.get("chat_id") or not payload.get("text"):
+            return self._reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"})
+        with server.lock:
+            message_id = len(server.messages) + 1
+            server.messages.append(payload)
+        self._reply(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": payload["chat_id"]},
+                                                 "text": payload["text"]}})
+
+
+class FakeTelegramServer:
+    def __init__(self, token="fake-token", failures=None):
+        self.token = token
+        self.failures = list(failures or [])
+        self.messages = []
+        self.requests = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.owner = self
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,182 @@
+"""
+연재별 Atom / JSON Feed.
+
+jekyll-feed 의 /feed.xml 은 사이트 전체를 다시 빌드해야 갱신되고 연재를 구분하지 않습니다.
+여기서는 발행 단계에서 카테고리마다 feed/<category>.json (JSON Feed 1.1) 과 feed/<category>.xml (Atom) 을 씁니다.
+
+* 증분 갱신: 기존 JSON 피드의 항목 목록에 새 포스트만 앞에 붙이고 MAX_FEED_ENTRIES 개로 자릅니다. _posts 전체는 읽지 않습니다.
+  이미 있는 포스트(렌더링 갱신)는 그 자리의 항목만 바꿉니다. Atom 은 같은 항목 목록으로 다시 씁니다.
+* 새 포스트 알림: 처음 피드에 들어간 포스트의 정확한 URL 을 scripts/run_data/publish_manifest.json 에 순번과 함께 추가합니다.
+  알림 쪽은 이 목록에서 마지막으로 처리한 순번 이후만 읽으면 됩니다.
+* --rebuild 는 _posts 를 다시 읽어 피드를 새로 만들며, 매니페스트에는 추가하지 않습니다.
+
+usage: python -m common.feeds [--rebuild] [post.md ...]
+"""
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from common.posts import REPO_ROOT, SERIES, SHARED_RUN_DATA_DIR, SITE_URL, excerpt, list_posts, read_post
+from common.state_store import atomic_write_text
+
+FEED_DIR = os.path.join(REPO_ROOT, "feed")
+MANIFEST_PATH = os.path.join(SHARED_RUN_DATA_DIR, "publish_manifest.json")
+MAX_FEED_ENTRIES = int(os.environ.get("BOT_FEED_ENTRIES", "20"))
+MAX_MANIFEST_ENTRIES = 200
+# _config.yml 의 timezone(Asia/Seoul)
+TIMEZONE = "+09:00"
+FEED_TITLES = {
+    "ai_history": "[AI 자동생성]AI의 역사",
+    "cs_history": "[AI 자동생성]컴퓨터과학의 역사",
+    "ghost_in_the_legacy": "[AI 자동생성소설]Ghost in the Legacy",
+}
+AUTHOR = "Taehun Kim"
+
+_DAY_RE = re.compile(r"(\d+)/$")
+
+
+def feed_paths(category):
+    return os.path.join(FEED_DIR, f"{category}.json"), os.path.join(FEED_DIR, f"{category}.xml")
+
+
+def feed_item(post):
+    url = SITE_URL + post["url"]
+    return {
+        "id": url,
+        "url": url,
+        "title": post["title"],
+        "summary": excerpt(post["body"], 200),
+        "date_published": f"{post['date']}T00:00:00{TIMEZONE}",
+        "tags": [post["category"]],
+    }
+
+
+def _order_key(item):
+    """최신 순 정렬 기준: 날짜, 같은 날이면 URL 끝의 Day 번호"""
+    match = _DAY_RE.search(item["url"])
+    return item["date_published"], int(match.group(1)) if match else 0
+
+
+def load_feed(category):
+    json_path, _ = feed_paths(category)
+    if not os.path.exists(json_path):
+        return []
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get("items", [])
+
+
+def merge_items(items, new_items, limit=MAX_FEED_ENTRIES):
+    """(항목 목록, 처음 들어간 항목들). 새 항목은 앞에 붙이고, 이미 있는 항목은 제자리에서 바꿉니다."""
+    positions = {item["id"]: i for i, item in enumerate(items)}
+    items = list(items)
+    added = []
+    for item in new_items:
+        if item["id"] in positions:
+            items[positions[item["id"]]] = item
+        else:
+            added.append(item)
+    items = added + items
+    items.sort(key=_order_key, reverse=True)
+    return items[:limit], added
+
+
+def render_json_feed(category, items):
+    return json.dumps({
+        "version": "https://jsonfeed.org/version/1.1",
+        "title": FEED_TITLES.get(category, category),
+        "home_page_url": f"{SITE_URL}/{category}",
+        "feed_url": f"{SITE_URL}/feed/{category}.json",
+        "language": "ko-KR",
+        "authors": [{"name": AUTHOR}],
+        "items": items,
+    }, ensure_ascii=False, indent=1)
+
+
+def render_atom_feed(category, items):
+    title = escape(FEED_TITLES.get(category, category))
+    updated = items[0]["date_published"] if items else datetime.now().strftime(f"%Y-%m-%dT%H:%M:%S{TIMEZONE}")
+    entries = "".join(f"""  <entry>
+    <id>{escape(item['id'])}</id>
+    <title>{escape(item['title'])}</title>
+    <link href="{escape(item['url'])}" rel="alternate" type="text/html"/>
+    <published>{item['date_published']}</published>
+    <updated>{item['date_published']}</updated>
+    <category term="{escape(category)}"/>
+    <summary>{escape(item['summary'])}</summary>
+  </entry>
+""" for item in items)
+    return f"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ko-KR">
+  <id>{SITE_URL}/feed/{category}.xml</id>
+  <title>{title}</title>
+  <link href="{SITE_URL}/feed/{category}.xml" rel="self" type="application/atom+xml"/>
+  <link href="{SITE_URL}/{category}" rel="alternate" type="text/html"/>
+  <updated>{updated}</updated>
+  <author><name>{AUTHOR}</name></author>
+{entries}</feed>
+"""
+
+
+def write_feed(category, items):
+    json_path, atom_path = feed_paths(category)
+    os.makedirs(FEED_DIR, exist_ok=True)
+    atomic_write_text(json_path, render_json_feed(category, items))
+    atomic_write_text(atom_path, render_atom_feed(category, items))
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {"next_seq": 1, "posts": []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record_published(entries):
+    """새 포스트를 발행 매니페스트에 순번과 함께 추가합니다."""
+    manifest = load_manifest()
+    now = datetime.now().isoformat(timespec="seconds")
+    for category, item in entries:
+        manifest["posts"].append({"seq": manifest["next_seq"], "category": category, "title": item["title"],
+                                  "url": item["url"], "date": item["date_published"][:10], "published_at": now})
+        manifest["next_seq"] += 1
+    manifest["posts"] = manifest["posts"][-MAX_MANIFEST_ENTRIES:]
+    os.makedirs(SHARED_RUN_DATA_DIR, exist_ok=True)
+    atomic_write_text(MANIFEST_PATH, json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+def update(paths):
+    """paths 의 포스트를 카테고리 피드에 반영합니다. 처음 피드에 들어간 포스트의 URL 목록을 반환합니다."""
+    by_category = {}
+    for path in paths:
+        post = read_post(path)
+        by_category.setdefault(post["category"], []).append(feed_item(post))
+    published = []
+    for category, new_items in sorted(by_category.items()):
+        items, added = merge_items(load_feed(category), new_items)
+        write_feed(category, items)
+        published.extend((category, item) for item in added if item in items)
+    if published:
+        record_published(published)
+        for _, item in published:
+            print(f"📣 새 포스트: {item['url']}")
+    return [item["url"] for _, item in published]
+
+
+def rebuild(categories=SERIES):
+    for category in categories:
+        items = [feed_item(read_post(path)) for path in list_posts(category)]
+        items.sort(key=_order_key, reverse=True)
+        items = items[:MAX_FEED_ENTRIES]
+        write_feed(category, items)
+        print(f"📰 [{category}] 피드 {len(items)}개 항목")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--rebuild" in args:
+        rebuild()
+    else:
+        update([a for a in args if not a.startswith("--")])
@@ -0,0 +1,418 @@
+"""
+릴레이 소설(ghost_in_the_legacy) 장기 연재 성장 시뮬레이터.
+
+실제 연재는 8일치뿐이라 300일을 이어 가면 상태 파일, 프롬프트, 호출 지연이 어떻게 커지는지 알 수 없습니다.
+여기서는 ghost 봇의 main() 을 임시 폴더에서 N 일 동안 그대로 돌립니다. 바꾸는 것은 다음뿐입니다.
+
+* 모델: common/fake_genai.py 대역이 실제와 비슷한 크기의 응답(본문 약 1000자, 한 문장 요약, 며칠마다 인물/설정이
+  늘어나는 스토리 바이블)을 돌려줍니다. 요청은 실제와 같은 프롬프트로 라우터/컨텍스트 캐시를 거칩니다.
+* 경로: 상태/아티팩트/포스트/run_data 는 임시 폴더에 쓰고, 발행 단계(관련 글, 검색 색인, 피드)는 건너뜁니다.
+* 완결 판정은 실제로 계산하되(시간에 포함) 연재를 끝내지는 않습니다.
+
+하루마다 상태 파일 크기(스냅샷+저널), 호출별 프롬프트 토큰(로컬 추정), 모델 지연(LATENCY_MODEL 로 환산),
+상태 읽기/직렬화 시간, 실행 시간, 메모리 최대 사용량(tracemalloc)을 기록합니다.
+value ≈ a + b·day^k 로 맞춘 성장 차수 k 가 SUPERLINEAR_EXPONENT 를 넘는 지표는 (잡음이 큰 벽시계 시간 지표는 더 높은 기준)
+초선형 성장으로 표시하고 종료 코드 1 로 끝나므로 확장성 회귀 검사로 쓸 수 있습니다.
+스냅샷+저널 크기와 저널 재생 시간은 저널 압축 때마다 톱니 모양으로 떨어져 한 곡선으로 맞출 수 없으므로 최댓값만 보여 주고,
+성장 차수는 압축 직후의 스냅샷(현재 상태를 직렬화한 크기와 그 읽기 시간)으로 따로 구합니다.
+맞춤마다 결정계수 R² 를 함께 보여 주며, 많이 커졌는데 R² 가 MIN_FIT_R2 보다 낮은 지표는 차수를 믿을 수 없다고 표시합니다.
+
+usage: python -m common.growth_sim [--days N] [--html out.html] [--json out.json] [--self-test]
+"""
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from common.state_store import atomic_write_text
+
+DEFAULT_DAYS = 300
+SEED = 7
+# 호출 지연 환산: 기본 + 프롬프트 토큰당 + 출력 토큰당 (초)
+LATENCY_MODEL = {"base": 1.5, "prompt": 0.00015, "output": 0.012}
+# 성장 분석은 초기 구간(캐시 생성 등)을 건너뛰고 합니다.
+WARMUP_FRACTION = 0.1
+SUPERLINEAR_EXPONENT = float(os.environ.get("BOT_SIM_SUPERLINEAR", "1.3"))
+# 초선형 표시는 지표가 실제로 의미 있게 커졌을 때만 합니다 (마지막 / 처음)
+MIN_GROWTH_RATIO = 1.5
+SMOOTHING_WINDOW = 9
+# 벽시계 시간 지표는 반복 측정의 최솟값을 쓰고, 잡음을 감안해 차수 기준을 TIMING_TOLERANCE 만큼 높여 판정합니다.
+TIMING_REPEATS = 3
+TIMING_TOLERANCE = 0.7
+MAX_EXPONENT = 4.0
+EXPONENT_STEP = 0.05
+MIN_FIT_R2 = 0.9
+STORY_CHARS = 1000
+# 스토리 바이블에 인물/설정이 추가되는 간격 (일)
+NEW_CHARACTER_EVERY = 4
+NEW_ITEM_EVERY = 7
+
+# 지표 종류: 크기/개수, 벽시계 시간(잡음 허용), 저널 압축으로 톱니 모양이 되는 지표(차수를 구하지 않음)
+SIZE, TIMED, SAWTOOTH = "size", "timed", "sawtooth"
+# (지표, 이름, 종류)
+METRICS = [
+    ("state_bytes", "상태 파일 (스냅샷+저널, bytes)", SAWTOOTH),
+    ("compacted_bytes", "상태 크기 (압축 후 스냅샷, bytes)", SIZE),
+    ("bible_chars", "스토리 바이블 (JSON 글자 수)", SIZE),
+    ("write_prompt_tokens", "소설 작성 프롬프트 (토큰)", SIZE),
+    ("summarize_prompt_tokens", "상태 요약 프롬프트 (토큰)", SIZE),
+    ("model_latency_s", "모델 호출 지연 합계 (환산, 초)", SIZE),
+    ("load_ms", "상태 읽기 (스냅샷+저널 재생, ms)", SAWTOOTH),
+    ("snapshot_load_ms", "압축 후 스냅샷 읽기 (ms)", TIMED),
+    ("dump_ms", "상태 직렬화 (ms)", TIMED),
+    ("run_ms", "main() 로컬 실행 시간 (ms)", TIMED),
+    ("peak_kb", "메모리 최대 사용량 (KB)", SIZE),
+]
+
+_SYLLABLES = "가나다라마바사아자차카타파하고노도로모보소오조초코토포호그느드르므브스으즈츠크트프흐기니디리미비시이지치키티피히"
+
+
+class FakeStoryModel:
+    """ghost 봇의 두 작업(write, summarize_state)에 실제와 비슷한 크기의 응답을 돌려주는 대역"""
+
+    def __init__(self, seed=SEED):
+        self.rng = random.Random(seed)
+        self.day = 0
+
+    def _sentence(self, words):
+        return " ".join("".join(self.rng.choice(_SYLLABLES) for _ in range(self.rng.randint(2, 4)))
+                        for _ in range(words)) + "."
+
+    def _paragraphs(self, chars):
+        paragraphs = []
+        for _ in range(3):
+            text = ""
+            while len(text) < chars // 3:
+                text += self._sentence(self.rng.randint(5, 9)) + " "
+            paragraphs.append(text.strip())
+        return "\n\n".join(paragraphs)
+
+    def respond(self, model, contents, config):
+        if getattr(config, "response_mime_type", None) == "application/json":
+            return self._summarize(contents)
+        self.day += 1
+        return self._paragraphs(STORY_CHARS)
+
+    def _summarize(self, contents):
+        bible = json.loads(contents.split("===스토리 바이블===", 1)[1].strip())
+        setting = bible.setdefault("배경설정", {})
+        if self.day % NEW_CHARACTER_EVERY == 0:
+            setting.setdefault("인물", {})[f"인물{self.day}"] = [self._sentence(4), self._sentence(8)]
+        if self.day % NEW_ITEM_EVERY == 0:
+            setting.setdefault("외부 설정 및 아이템", {})[f"단서{self.day}"] = self._sentence(10)
+        return json.dumps({"plot_summary": self._sentence(12), "story_bible": bible}, ensure_ascii=False)
+
+
+@contextlib.contextmanager
+def simulated_bot(workdir, model):
+    """ghost 봇 모듈의 경로/모델 호출/발행 단계를 임시 폴더와 대역으로 바꾸고, 끝나면 되돌립니다."""
+    from common.artifacts import ArtifactStore
+    from common.bots import load_bot
+    from common.fake_genai import FakeClient, FakeConfig
+    from common.state_store import StateStore
+    from common.thinking_budget import ThinkingController
+
+    bot = load_bot("ghost_in_the_legacy")
+    client = FakeClient(model.respond)
+    assess_completion = bot.assess_completion
+
+    def get_llm_call_result(system_message, human_message, temperature, top_p, use_tools=True, return_json=False,
+                            task="write", cache_prefix=None):
+        # 실제 함수와 같은 설정을 대역 config 로 만들어 라우터를 거칩니다. (grounding 결과는 없음)
+        config = FakeConfig(tools=["google_search", "google_maps"] if use_tools else [], system_instruction=system_message,
+                            temperature=temperature, top_p=top_p, max_output_tokens=65536,
+                            response_mime_type="application/json" if return_json else None)
+        response = bot.router.generate(client, task, human_message, config, cache_prefix=cache_prefix)
+        return response.text, {}, {}, {}, {}
+
+    def never_finished(state):
+        completion = assess_completion(state)
+        return {**completion, "finished": False}
+
+    patches = {
+        "SCRIPT_DIR": workdir,
+        "RUN_DATA_DIR": os.path.join(workdir, "run_data"),
+        "POSTS_DIR": os.path.join(workdir, "_posts"),
+        "state_store": StateStore(workdir, bot.DEFAULT_STATE, snapshot_name=bot.STATE_FILE),
+        "artifact_store": ArtifactStore(workdir),
+        "get_llm_call_result": get_llm_call_result,
+        "run_publish_stages": lambda *paths: None,
+        "assess_completion": never_finished,
+        # thinking 예산 조절은 끄고, 상태 파일도 임시 폴더에 씁니다.
+        "thinking": ThinkingController(os.path.join(workdir, "run_data"), bot.THINKING_POLICY, enabled=False),
+    }
+    original = {name: getattr(bot, name) for name in list(patches) + ["router", "context_cache"]}
+    for name, value in patches.items():
+        setattr(bot, name, value)
+    try:
+        yield bot
+    finally:
+        for name, value in original.items():
+            setattr(bot, name, value)
+
+
+def _new_run(bot, workdir):
+    """실제 실행처럼 프로세스마다 새 라우터(기록)와 컨텍스트 캐시(기록 파일은 유지)를 씁니다."""
+    from common.context_cache import ContextCache
+    from common.model_router import ModelRouter
+    bot.context_cache = ContextCache(os.path.join(workdir, "run_data", "context_cache.json"), enabled=True)
+    # thinking 설정과 SLO(HTTP 타임아웃)는 google.genai 의 ThinkingConfig/HttpOptions 가 필요하고 대역 모델에는 의미가 없으므로 뺍니다.
+    routes = {task: [dict(step, slo=None, thinking_budget=None, thinking_level=None) for step in steps]
+              for task, steps in bot.MODEL_ROUTES.items()}
+    bot.router = ModelRouter(routes, bot.RUN_DATA_DIR, context_cache=bot.context_cache)
+
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def _best_ms(fn, repeats=TIMING_REPEATS):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _call_metrics(decisions, task):
+    from common.tokens import estimate_from_features
+    calls = [d for d in decisions if d["task"] == task and d["outcome"] == "ok"]
+    prompt = sum(d["estimated_prompt_tokens"] for d in calls)
+    output = sum(estimate_from_features(d["output_features"]) for d in calls if d.get("output_features"))
+    latency = sum(LATENCY_MODEL["base"] for _ in calls) + prompt * LATENCY_MODEL["prompt"] + output * LATENCY_MODEL["output"]
+    return prompt, latency
+
+
+def simulate(days, workdir, seed=SEED, progress=True):
+    """하루 단위 기록 목록"""
+    from common.state_store import StateStore
+    model = FakeStoryModel(seed)
+    records = []
+    with simulated_bot(workdir, model) as bot:
+        for _ in range(days):
+            _new_run(bot, workdir)
+            tracemalloc.start()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                bot.main(force=True)
+            run_ms = (time.perf_counter() - started) * 1000
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            store = StateStore(workdir, bot.DEFAULT_STATE, snapshot_name=bot.STATE_FILE)
+            state = store.load()
+            load_ms = _best_ms(store.load)
+            # 압축(StateStore.compact)이 쓰는 것과 같은 스냅샷 텍스트
+            snapshot = json.dumps(state, ensure_ascii=False, indent=2)
+            snapshot_load_ms = _best_ms(lambda: json.loads(snapshot))
+            dump_ms = _best_ms(lambda: json.dumps(state, ensure_ascii=False, indent=2))
+
+            write_prompt, write_latency = _call_metrics(bot.router.decisions, "write")
+            summarize_prompt, summarize_latency = _call_metrics(bot.router.decisions, "summarize_state")
+            record = {
+                "day": state["day_count"],
+                "state_bytes": _file_size(store.snapshot_path) + _file_size(store.journal_path),
+                "journal_bytes": _file_size(store.journal_path),
+                "compacted_bytes": len(snapshot.encode('utf-8')),
+                "bible_chars": len(json.dumps(state["스토리 바이블"], ensure_ascii=False)),
+                "write_prompt_tokens": write_prompt,
+                "summarize_prompt_tokens": summarize_prompt,
+                "model_latency_s": round(write_latency + summarize_latency, 2),
+                "load_ms": round(load_ms, 3),
+                "snapshot_load_ms": round(snapshot_load_ms, 3),
+                "dump_ms": round(dump_ms, 3),
+                "run_ms": round(run_ms, 1),
+                "peak_kb": round(peak / 1024, 1),
+            }
+            records.append(record)
+            if progress and record["day"] % 50 == 0:
+                print(f"   ... day {record['day']}: state {record['state_bytes']:,}B, "
+                      f"write prompt ~{record['write_prompt_tokens']:,} tokens")
+    return records
+
+
+# --- [Growth Analysis] ---
+def _smooth(values, window=SMOOTHING_WINDOW):
+    """이동 중앙값 (시간 측정값의 잡음 완화). 양 끝은 창을 대칭으로 줄여 단조 증가하는 값이 눌리지 않게 합니다."""
+    smoothed = []
+    for i in range(len(values)):
+        half = min(window // 2, i, len(values) - 1 - i)
+        around = sorted(values[i - half:i + half + 1])
+        smoothed.append(around[len(around) // 2])
+    return smoothed
+
+
+def _fit(xs, ys):
+    """최소제곱 직선 (절편, 기울기, 잔차 제곱합)"""
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var_x if var_x else 0.0
+    intercept = mean_y - slope * mean_x
+    return intercept, slope, sum((y - intercept - slope * x) ** 2 for x, y in zip(xs, ys))
+
+
+def growth_fit(days, values):
+    """
+    성장 차수 k 와 결정계수 R²: value ≈ a + b·day^k 를 k 격자(EXPONENT_STEP~MAX_EXPONENT)마다 최소제곱으로 맞춰
+    잔차가 가장 작은 k. 선형 ≈ 1, 제곱 ≈ 2, 늘지 않으면 (0, 1.0). 격자 끝(MAX_EXPONENT)이면 그 이상일 수 있습니다.
+    """
+    if len(days) < 3:
+        return 0.0, 1.0
+    mean = sum(values) / len(values)
+    total = sum((v - mean) ** 2 for v in values)
+    if not total:
+        return 0.0, 1.0
+    best = None
+    for step in range(1, int(round(MAX_EXPONENT / EXPONENT_STEP)) + 1):
+        k = step * EXPONENT_STEP
+        _, slope, error = _fit([d ** k for d in days], values)
+        if best is None or error < best[2]:
+            best = (k, slope, error)
+    return (best[0] if best[1] > 0 else 0.0), 1 - best[2] / total
+
+
+def growth_exponent(days, values):
+    """성장 차수 k (growth_fit 참고)"""
+    return growth_fit(days, values)[0]
+
+
+def analyze(records):
+    """{metric: {"first", "last", "peak", "exponent", "r2", "poor_fit", "superlinear"}} (톱니 지표는 exponent/r2 가 None)"""
+    start = int(len(records) * WARMUP_FRACTION)
+    days = [r["day"] for r in records][start:]
+    result = {}
+    for metric, _, kind in METRICS:
+        values = _smooth([r[metric] for r in records])[start:]
+        first = values[0]
+        row = {"first": first, "last": values[-1], "peak": max(r[metric] for r in records),
+               "exponent": None, "r2": None, "poor_fit": False, "superlinear": False}
+        if kind != SAWTOOTH:
+            exponent, r2 = growth_fit(days, values)
+            ratio = values[-1] / first if first else float("inf") if values[-1] else 1.0
+            limit = SUPERLINEAR_EXPONENT + (TIMING_TOLERANCE if kind == TIMED else 0.0)
+            row.update(exponent=round(exponent, 2), r2=round(r2, 3),
+                       poor_fit=ratio > MIN_GROWTH_RATIO and r2 < MIN_FIT_R2,
+                       superlinear=exponent > limit and ratio > MIN_GROWTH_RATIO)
+        result[metric] = row
+    return result
+
+
+def _describe(row):
+    if row["exponent"] is None:
+        return f"최대 {row['peak']:,.1f} (저널 압축 톱니)"
+    text = f"차수 {row['exponent']:5.2f}{'+' if row['exponent'] >= MAX_EXPONENT else ''}  R² {row['r2']:.2f}"
+    if row["superlinear"]:
+        text += " ⚠️ 초선형"
+    if row["poor_fit"]:
+        text += " ⚠️ 적합도 낮음"
+    return text
+
+
+def sparkline(values, width=40):
+    blocks = "▁▂▃▄▅▆▇█"
+    step = max(1, len(values) // width)
+    sampled = [max(values[i:i + step]) for i in range(0, len(values), step)]
+    low, high = min(sampled), max(sampled)
+    return "".join(blocks[int((v - low) / (high - low) * (len(blocks) - 1)) if high > low else 0] for v in sampled)
+
+
+def print_report(records, analysis):
+    print(f"📈 ghost 장기 연재 시뮬레이션: {len(records)}일")
+    for metric, label, _ in METRICS:
+        row = analysis[metric]
+        print(f"   {label:<28} {row['first']:>12,.1f} → {row['last']:>12,.1f}  "
+              f"{sparkline([r[metric] for r in records])}  {_describe(row)}")
+    flagged = [metric for metric in analysis if analysis[metric]["superlinear"]]
+    unreliable = [metric for metric in analysis if analysis[metric]["poor_fit"]]
+    if unreliable:
+        print(f"⚠️ 차수를 믿기 어려운 지표 (R² < {MIN_FIT_R2}): {', '.join(unreliable)}")
+    if flagged:
+        print(f"🚨 초선형 성장: {', '.join(flagged)} (차수 > {SUPERLINEAR_EXPONENT}, 시간 지표는 > {SUPERLINEAR_EXPONENT + TIMING_TOLERANCE})")
+    else:
+        print("✅ 초선형으로 커지는 지표가 없습니다.")
+    return flagged
+
+
+def render_html(records, analysis):
+    charts = []
+    width, height = 640, 160
+    for metric, label, _ in METRICS:
+        values = [r[metric] for r in records]
+        low, high = min(values), max(values) or 1
+        span = (high - low) or 1
+        points = " ".join(f"{i / max(1, len(values) - 1) * width:.1f},{height - (v - low) / span * height:.1f}"
+                          for i, v in enumerate(values))
+        row = analysis[metric]
+        color = "#e53935" if row["superlinear"] else "#1e88e5"
+        charts.append(f"""<h4>{label} — {_describe(row)}</h4>
+<svg width="{width}" height="{height + 20}"><polyline fill="none" stroke="{color}" stroke-width="1.5" points="{points}"/>
+<text x="0" y="{height + 15}">day {records[0]['day']}: {values[0]:,.1f}</text>
+<text x="{width}" y="{height + 15}" text-anchor="end">day {records[-1]['day']}: {values[-1]:,.1f}</text></svg>""")
+    return f"""<!doctype html><meta charset="utf-8"><title>ghost growth simulation</title>
+<style>body{{font:12px sans-serif}} svg{{background:#fafafa;overflow:visible}}</style>
+<h3>ghost_in_the_legacy {len(records)}일 시뮬레이션 ({datetime.now().isoformat(timespec='seconds')})</h3>
+{''.join(charts)}
+"""
+
+
+def self_test():
+    days = list(range(1, 101))
+    assert 0.9 < growth_exponent(days, [1000 + 50 * d for d in days]) < 1.1
+    assert 1.8 < growth_exponent(days, [1000 + d * d for d in days]) < 2.2
+    assert growth_exponent(days, [1000] * len(days)) == 0.0
+    assert growth_fit(days, [1000 + d * d for d in days])[1] > 0.99
+    with tempfile.TemporaryDirectory() as tmp:
+        records = simulate(30, tmp, progress=False)
+    assert [r["day"] for r in records] == list(range(1, 31))
+    assert records[-1]["bible_chars"] > records[0]["bible_chars"]
+    assert all(r["write_prompt_tokens"] > 0 and r["summarize_prompt_tokens"] > 0 for r in records)
+    analysis = analyze(records)
+    assert analysis["state_bytes"]["exponent"] is None
+    assert 0.8 < analysis["compacted_bytes"]["exponent"] < MAX_EXPONENT and analysis["compacted_bytes"]["r2"] > MIN_FIT_R2
+    assert not any(row["superlinear"] for row in analysis.values())
+    print_report(records, analysis)
+
+    # 상태가 날마다 제곱으로 커지도록 주입하면 (저널 압축 톱니와 상관없이) 초선형으로 잡혀야 합니다.
+    for r in records:
+        r["compacted_bytes"] = 2000 + 40 * r["day"] ** 2
+        # 시간 지표는 잡음 허용치(TIMING_TOLERANCE)만큼 기준이 높아 세제곱으로 넣습니다.
+        r["snapshot_load_ms"] = 0.05 + 0.0001 * r["day"] ** 3
+        r["state_bytes"] = r["compacted_bytes"] + 3000 * (r["day"] % 7)
+    analysis = analyze(records)
+    assert 1.8 < analysis["compacted_bytes"]["exponent"] < 2.2 and analysis["compacted_bytes"]["superlinear"]
+    assert analysis["snapshot_load_ms"]["superlinear"]
+    assert "compacted_bytes" in print_report(records, analysis)
+    # 톱니 하나만으로는 한 곡선에 맞지 않아 적합도가 낮게 나옵니다.
+    sawtooth = [1000 + 500 * (d % 40) for d in days]
+    assert growth_fit(days, sawtooth)[1] < MIN_FIT_R2
+    print("✅ growth_sim self-test passed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--self-test" in args:
+        self_test()
+        sys.exit(0)
+    days = int(args[args.index("--days") + 1]) if "--days" in args else DEFAULT_DAYS
+    with tempfile.TemporaryDirectory() as tmp:
+        records = simulate(days, tmp)
+    analysis = analyze(records)
+    flagged = print_report(records, analysis)
+    if "--html" in args:
+        output = args[args.index("--html") + 1]
+        atomic_write_text(output, render_html(records, analysis))
+        print(f"   [sim] HTML: {output}")
+    if "--json" in args:
+        output = args[args.index("--json") + 1]
+        atomic_write_text(output, json.dumps({"records": records, "analysis": analysis}, ensure_ascii=False, indent=1))
+        print(f"   [sim] JSON: {output}")
+    sys.exit(1 if flagged else 0)
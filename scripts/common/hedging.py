@@ -0,0 +1,171 @@
+"""
+Hedged request: 기본 요청이 과거 지연시간의 p{HEDGE_PERCENTILE} 안에 끝나지 않으면 같은 요청을 하나 더 보내고,
+먼저 완료되고 검증을 통과한 응답을 사용합니다.
+
+* 동기 genai 클라이언트를 데몬 스레드에서 호출합니다. 진 쪽은 결과를 기다리지 않고 버립니다(프로세스 종료를 막지 않음).
+  동기 호출은 취소할 수 없으므로, 라우터가 hedge 하는 요청마다 HTTP 타임아웃(call_timeout)을 걸어 진 요청도 그 안에 끝나게 합니다.
+* hedge 는 봇이 정한 작업(tasks)에만 씁니다. 실행당 추가 요청 수는 HEDGE_MAX_EXTRA_CALLS 로 제한하며,
+  봇은 프로세스당 Hedger 하나를 만들어 (미리 생성 포함) 모든 생성에 같이 씁니다.
+* BOT_HEDGE 가 꺼져 있으면 라우터가 Hedger 를 거치지 않으므로 hedge_stats.json 도 쓰지 않습니다.
+* 과거 기록이 HEDGE_MIN_SAMPLES 개 미만인 작업은 hedge 하지 않고 지연시간만 기록합니다.
+* 작업별 지연시간(실패한 호출 포함), hedge 비율, hedge 승리/실패 횟수는 run_data/hedge_stats.json 에 누적되어 임계값 조정에 사용됩니다.
+"""
+import json
+import math
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from common.state_store import atomic_write_text
+from common.tracing import tracer
+
+HEDGE_ENABLED = os.environ.get("BOT_HEDGE", "0") == "1"
+HEDGE_PERCENTILE = float(os.environ.get("BOT_HEDGE_PERCENTILE", "90"))
+HEDGE_MAX_EXTRA_CALLS = int(os.environ.get("BOT_HEDGE_MAX_EXTRA", "2"))
+HEDGE_MIN_SAMPLES = 5
+# 요청별 HTTP 타임아웃 = max(과거 최대 지연시간 × 이 값, HEDGE_MIN_TIMEOUT_SECONDS)
+HEDGE_TIMEOUT_FACTOR = 3
+HEDGE_MIN_TIMEOUT_SECONDS = 60
+MAX_RECENT_EVENTS = 100
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class Hedger:
+    def __init__(self, stats_path, tasks, enabled=HEDGE_ENABLED, pct=HEDGE_PERCENTILE, max_extra_calls=HEDGE_MAX_EXTRA_CALLS):
+        """tasks: hedge 할 라우터 작업 이름 목록"""
+        self.stats_path = stats_path
+        self.tasks = set(tasks)
+        self.enabled = enabled
+        self.pct = pct
+        self.max_extra_calls = max_extra_calls
+        self.extra_calls = 0
+        self.stats = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.stats_path):
+            return {}
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        atomic_write_text(self.stats_path, json.dumps(self.stats, ensure_ascii=False, indent=2))
+
+    def _task_stats(self, task):
+        stats = self.stats.setdefault(task, {"calls": 0, "hedged": 0, "hedge_wins": 0, "recent": []})
+        stats.setdefault("failed", 0)
+        return stats
+
+    def threshold(self, task):
+        """hedge 를 보낼 시점(초). 기록이 부족하면 None."""
+        latencies = [e["latency"] for e in self._task_stats(task)["recent"]]
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(latencies, self.pct)
+
+    def covers(self, task):
+        """라우터 작업 task 를 이 Hedger 로 보낼지"""
+        return self.enabled and task in self.tasks
+
+    def call_timeout(self, task):
+        """hedge 하는 작업의 요청별 타임아웃(초). 진 요청도 이 안에 끝납니다. hedge 를 쓰지 않거나 기록이 부족하면 None."""
+        if not self.enabled:
+            return None
+        latencies = [e["latency"] for e in self._task_stats(task)["recent"]]
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(max(latencies) * HEDGE_TIMEOUT_FACTOR, HEDGE_MIN_TIMEOUT_SECONDS)
+
+    def _can_hedge(self):
+        return self.enabled and self.extra_calls < self.max_extra_calls
+
+    def _record(self, task, latency, threshold, hedged, winner):
+        """winner: "primary" | "hedge" | None (모든 요청이 실패)"""
+        stats = self._task_stats(task)
+        stats["calls"] += 1
+        stats["hedged"] += int(hedged)
+        stats["hedge_wins"] += int(winner == "hedge")
+        stats["failed"] += int(winner is None)
+        # hedge 가 이긴 경우 기본 요청의 실제 지연시간은 알 수 없으므로 관측된 종단 지연시간(하한)을 기록합니다.
+        # 실패한 호출도 기록합니다. 빼면 느리게 실패하는 꼬리가 임계값에서 빠집니다.
+        stats["recent"].append({
+            "ts": datetime.now().isoformat(timespec="seconds"),
+            "latency": round(latency, 3),
+            "threshold": round(threshold, 3) if threshold is not None else None,
+            "hedged": hedged,
+            "winner": winner,
+            "ok": winner is not None,
+        })
+        stats["recent"] = stats["recent"][-MAX_RECENT_EVENTS:]
+        self._save()
+
+    def call(self, task, make_call, validate=None):
+        """
+        make_call: 인자 없이 모델을 호출해 응답을 반환하는 함수 (예: lambda: client.models.generate_content(...))
+        validate: 응답을 검증/파싱하는 함수. 예외를 던지면 그 응답은 탈락합니다. 반환값이 call() 의 결과가 됩니다.
+        """
+        validate = validate or (lambda response: response)
+        threshold = self.threshold(task) if self.enabled else None
+        results = queue.Queue()
+        started = time.perf_counter()
+
+        def worker(kind):
+            try:
+                value = validate(make_call())
+                results.put((kind, True, value))
+            except Exception as e:
+                results.put((kind, False, e))
+
+        def spawn(kind):
+            threading.Thread(target=tracer.bind(worker), args=(kind,), daemon=True).start()
+
+        spawn("primary")
+        pending, hedged, last_error = 1, False, None
+        while pending:
+            timeout = None
+            if not hedged and threshold is not None and self._can_hedge():
+                timeout = max(0.0, threshold - (time.perf_counter() - started))
+            try:
+                kind, ok, value = results.get(timeout=timeout)
+            except queue.Empty:
+                print(f"      (Hedge: '{task}' exceeded p{self.pct:.0f}={threshold:.1f}s, sending a second request)")
+                tracer.event("hedge_sent", task=task, threshold=round(threshold, 1))
+                self.extra_calls += 1
+                hedged = True
+                pending += 1
+                spawn("hedge")
+                continue
+            pending -= 1
+            if ok:
+                self._record(task, time.perf_counter() - started, threshold, hedged, kind)
+                return value
+            last_error = value
+        self._record(task, time.perf_counter() - started, threshold, hedged, None)
+        raise last_error
+
+    def report(self):
+        for task, stats in self.stats.items():
+            recent = stats["recent"]
+            if not recent:
+                continue
+            hedged = [e["latency"] for e in recent if e["hedged"]]
+            plain = [e["latency"] for e in recent if not e["hedged"]]
+            line = (f"   [hedge] {task}: calls={stats['calls']} hedge_rate={stats['hedged'] / max(stats['calls'], 1):.0%} "
+                    f"hedge_wins={stats['hedge_wins']} failed={stats['failed']} p50={percentile(plain, 50) or 0:.1f}s p{self.pct:.0f}={percentile(plain, self.pct) or 0:.1f}s")
+            if hedged:
+                line += f" hedged_p50={percentile(hedged, 50):.1f}s"
+            print(line)
+        if self.enabled:
+            print(f"   [hedge] extra calls this run: {self.extra_calls}/{self.max_extra_calls}")
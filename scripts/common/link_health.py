@@ -0,0 +1,382 @@
+"""
+인용 링크 상태 점검.
+
+포스트의 인용 영역(📚 참고 문헌, 웹 검색, 맵 검색)에 있는 URL 을 모아 동시에 확인하고,
+죽은 링크(4xx/5xx, 연결 실패)와 주소가 바뀐 링크(영구 리다이렉트)를 포스트별로 보고합니다.
+
+* 동시성: CONCURRENCY 개 작업 스레드가 호스트를 번갈아 가며 확인합니다.
+* 호스트별 속도 제한: 같은 호스트에는 HOST_INTERVAL_SECONDS 간격으로만 요청합니다.
+* 연결 재사용: 작업 스레드들이 (scheme, host) 별 keep-alive 연결 풀을 함께 씁니다.
+* 조건부 요청: 지난 실행의 ETag / Last-Modified 를 scripts/run_data/link_health.json 에 저장해 두고
+  If-None-Match / If-Modified-Since 로 보냅니다. 304 면 지난 결과를 그대로 씁니다.
+* 증분 실행: 정상 링크는 STALE_OK_SECONDS, 실패한 링크는 STALE_FAILED_SECONDS 가 지난 것만 다시 확인합니다 (--full 이면 전부).
+* HEAD 를 거부하는 서버(405/501)는 GET 으로 다시 확인하고 다음부터 바로 GET 을 씁니다.
+* 401/403/429 는 봇 차단일 수 있으므로 죽은 링크와 따로 'blocked' 로 분류합니다.
+
+usage: python -m common.link_health [--full] [--json report.json] [--self-test] [bot ...]
+"""
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin, urlsplit
+
+from common.posts import CITATION_HEADERS, SERIES, SHARED_RUN_DATA_DIR, citation_links, list_posts, read_post, relative_path
+from common.state_store import atomic_write_text
+
+CACHE_PATH = os.path.join(SHARED_RUN_DATA_DIR, "link_health.json")
+CONCURRENCY = int(os.environ.get("BOT_LINK_CONCURRENCY", "16"))
+HOST_INTERVAL_SECONDS = float(os.environ.get("BOT_LINK_HOST_INTERVAL", "1.0"))
+STALE_OK_SECONDS = 7 * 24 * 3600
+STALE_FAILED_SECONDS = 24 * 3600
+TIMEOUT_SECONDS = 10
+MAX_REDIRECTS = 5
+# GET 으로 확인할 때 읽는 최대 본문 크기. 다 읽지 못한 연결은 풀에 돌려놓지 않습니다.
+MAX_BODY_BYTES = 64 * 1024
+USER_AGENT = "Mozilla/5.0 (compatible; taehunkim.github.io link check)"
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+PERMANENT_REDIRECTS = (301, 308)
+BLOCKED_CODES = (401, 403, 429)
+
+
+def extract_citations(path):
+    """포스트의 인용 영역에 있는 (제목, URL) 목록"""
+    body = read_post(path)["body"]
+    starts = [body.find(header) for header in CITATION_HEADERS if header in body]
+    if not starts:
+        return []
+    return citation_links(body[min(starts):])
+
+
+def collect(paths):
+    """{URL: [포스트 경로, ...]}"""
+    posts_by_url = defaultdict(list)
+    for path in paths:
+        for _, url in extract_citations(path):
+            if path not in posts_by_url[url]:
+                posts_by_url[url].append(path)
+    return posts_by_url
+
+
+class ConnectionPool:
+    """(scheme, host) 별 keep-alive 연결 풀. 여러 스레드가 함께 씁니다."""
+
+    def __init__(self, timeout=TIMEOUT_SECONDS, max_idle_per_host=4):
+        self.timeout = timeout
+        self.max_idle_per_host = max_idle_per_host
+        self.idle = defaultdict(list)
+        self.lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, scheme, netloc):
+        with self.lock:
+            if self.idle[(scheme, netloc)]:
+                self.reused += 1
+                return self.idle[(scheme, netloc)].pop(), True
+            self.created += 1
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=self.timeout), False
+
+    def put(self, scheme, netloc, conn):
+        with self.lock:
+            if len(self.idle[(scheme, netloc)]) < self.max_idle_per_host:
+                self.idle[(scheme, netloc)].append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self.lock:
+            for conns in self.idle.values():
+                for conn in conns:
+                    conn.close()
+            self.idle.clear()
+
+
+class HostLimiter:
+    """같은 호스트에 대한 요청 사이에 최소 interval 초를 둡니다."""
+
+    def __init__(self, interval=HOST_INTERVAL_SECONDS):
+        self.interval = interval
+        self.next_allowed = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_allowed.get(host, 0.0))
+            self.next_allowed[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class LinkChecker:
+    def __init__(self, pool=None, limiter=None):
+        self.pool = pool or ConnectionPool()
+        self.limiter = limiter or HostLimiter()
+
+    def _request(self, method, url, headers):
+        parts = urlsplit(url)
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.limiter.wait(parts.hostname or parts.netloc)
+        for attempt in range(2):
+            conn, reused = self.pool.get(parts.scheme, parts.netloc)
+            try:
+                conn.request(method, target, headers=headers)
+                response = conn.getresponse()
+                if method == "HEAD":
+                    response.read()
+                    complete = True
+                else:
+                    response.read(MAX_BODY_BYTES)
+                    complete = response.isclosed()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                # 풀에서 꺼낸 연결이 서버 쪽에서 이미 닫힌 경우 새 연결로 한 번 더 시도합니다.
+                if reused and attempt == 0:
+                    continue
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if complete and not response.will_close:
+                self.pool.put(parts.scheme, parts.netloc, conn)
+            else:
+                conn.close()
+            return response.status, response.headers
+
+    def check(self, url, cached=None):
+        cached = cached or {}
+        method = "GET" if cached.get("head_unsupported") else "HEAD"
+        entry = {"url": url, "redirects": [], "head_unsupported": cached.get("head_unsupported", False)}
+        current = url
+        try:
+            hops = 0
+            while True:
+                headers = {"User-Agent": USER_AGENT, "Accept": "*/*"}
+                if current == cached.get("final_url") and cached.get("status") == 200:
+                    if cached.get("etag"):
+                        headers["If-None-Match"] = cached["etag"]
+                    if cached.get("last_modified"):
+                        headers["If-Modified-Since"] = cached["last_modified"]
+                status, response_headers = self._request(method, current, headers)
+                if method == "HEAD" and status in (405, 501):
+                    method = "GET"
+                    entry["head_unsupported"] = True
+                    continue
+                location = response_headers.get("Location")
+                if status in REDIRECT_CODES and location and hops < MAX_REDIRECTS:
+                    hops += 1
+                    current = urljoin(current, location)
+                    entry["redirects"].append([status, current])
+                    continue
+                break
+        except Exception as e:
+            entry.update({"status": None, "final_url": current, "error": f"{type(e).__name__}: {str(e)[:200]}"})
+            return entry
+        if status == 304:
+            entry.update({"status": cached["status"], "final_url": current, "not_modified": True,
+                          "etag": cached.get("etag"), "last_modified": cached.get("last_modified")})
+        else:
+            entry.update({"status": status, "final_url": current, "etag": response_headers.get("ETag"),
+                          "last_modified": response_headers.get("Last-Modified")})
+        return entry
+
+
+def classify(entry):
+    """"ok" | "redirected" | "blocked" | "dead" """
+    status = entry.get("status")
+    if status is None or (status >= 400 and status not in BLOCKED_CODES):
+        return "dead"
+    if status in BLOCKED_CODES:
+        return "blocked"
+    if any(code in PERMANENT_REDIRECTS for code, _ in entry.get("redirects", [])):
+        return "redirected"
+    return "ok"
+
+
+def is_stale(entry, now):
+    if not entry or "checked" not in entry:
+        return True
+    age = now - entry["checked"]
+    return age > (STALE_OK_SECONDS if classify(entry) in ("ok", "redirected") else STALE_FAILED_SECONDS)
+
+
+def _interleave_by_host(urls):
+    """한 호스트의 URL 들이 작업 스레드를 모두 붙잡지 않도록 호스트를 번갈아 가며 나열합니다."""
+    by_host = defaultdict(deque)
+    for url in urls:
+        by_host[urlsplit(url).hostname].append(url)
+    ordered = []
+    while by_host:
+        for host in list(by_host):
+            ordered.append(by_host[host].popleft())
+            if not by_host[host]:
+                del by_host[host]
+    return ordered
+
+
+def load_cache(path=CACHE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def run(paths, full=False, cache_path=CACHE_PATH, checker=None, concurrency=CONCURRENCY):
+    """(URL 별 포스트 목록, 캐시, 이번에 확인한 URL 수)"""
+    posts_by_url = collect(paths)
+    cache = load_cache(cache_path)
+    now = time.time()
+    targets = [url for url in posts_by_url if full or is_stale(cache.get(url), now)]
+    checker = checker or LinkChecker()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for entry in executor.map(lambda url: checker.check(url, cache.get(url)), _interleave_by_host(targets)):
+            entry["checked"] = now
+            cache[entry["url"]] = entry
+    checker.pool.close()
+    # 더 이상 어느 포스트에도 없는 URL 은 버립니다.
+    cache = {url: cache[url] for url in posts_by_url if url in cache}
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    atomic_write_text(cache_path, json.dumps(cache, ensure_ascii=False, indent=1))
+    print(f"🔗 링크 {len(posts_by_url)}개 중 {len(targets)}개 확인 ({time.perf_counter() - started:.1f}s, "
+          f"연결 {checker.pool.created}개 생성 / {checker.pool.reused}회 재사용)")
+    return posts_by_url, cache, len(targets)
+
+
+def build_report(posts_by_url, cache):
+    """{포스트 경로: [{url, kind, status, final_url, error}, ...]} (정상 링크 제외)"""
+    report = defaultdict(list)
+    for url, paths in posts_by_url.items():
+        entry = cache.get(url, {})
+        kind = classify(entry) if entry else "unchecked"
+        if kind == "ok":
+            continue
+        for path in paths:
+            report[relative_path(path)].append({
+                "url": url, "kind": kind, "status": entry.get("status"),
+                "final_url": entry.get("final_url"), "error": entry.get("error"),
+            })
+    return dict(sorted(report.items()))
+
+
+def print_report(report):
+    icons = {"dead": "❌", "redirected": "↪️", "blocked": "🚫", "unchecked": "❔"}
+    counts = defaultdict(int)
+    for path, problems in report.items():
+        print(f"📄 {path}")
+        for problem in problems:
+            counts[problem["kind"]] += 1
+            detail = problem["error"] or problem["status"]
+            if problem["kind"] == "redirected":
+                detail = f"{problem['status']} → {problem['final_url']}"
+            print(f"   {icons[problem['kind']]} {problem['url'][:120]} ({detail})")
+    summary = ", ".join(f"{kind} {count}" for kind, count in sorted(counts.items())) or "문제 없음"
+    print(f"📋 포스트 {len(report)}개: {summary}")
+
+
+def self_test():
+    import tempfile
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, headers=None, body=b""):
+            self.send_response(status)
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _handle(self):
+            requests.append((time.monotonic(), self.command, self.path, dict(self.headers)))
+            if self.path == "/ok":
+                if self.headers.get("If-None-Match") == '"v1"':
+                    return self._send(304, {"ETag": '"v1"'})
+                return self._send(200, {"ETag": '"v1"'}, b"hello")
+            if self.path == "/moved":
+                return self._send(301, {"Location": "/ok"})
+            if self.path == "/temp":
+                return self._send(302, {"Location": "/ok"})
+            if self.path == "/get-only":
+                if self.command == "HEAD":
+                    return self._send(405)
+                return self._send(200, {}, b"x" * 1000)
+            if self.path == "/forbidden":
+                return self._send(403)
+            self._send(404)
+
+        do_HEAD = do_GET = _handle
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            post = os.path.join(tmp, "2026-01-01-day1.md")
+            names = ["ok", "moved", "temp", "get-only", "forbidden", "gone"]
+            links = "\n".join(f"* [{name}]({base}/{name})" for name in names)
+            atomic_write_text(post, f"---\ntitle: t\n---\n본문 [본문 링크]({base}/body)\n\n## 📚 참고 문헌\n{links}\n")
+            cache_path = os.path.join(tmp, "cache.json")
+
+            checker = LinkChecker(limiter=HostLimiter(0.02))
+            posts_by_url, cache, checked = run([post], cache_path=cache_path, checker=checker, concurrency=4)
+            assert checked == 6 and f"{base}/body" not in posts_by_url, posts_by_url
+            kinds = {url.rsplit("/", 1)[1]: classify(entry) for url, entry in cache.items()}
+            assert kinds == {"ok": "ok", "moved": "redirected", "temp": "ok", "get-only": "ok",
+                             "forbidden": "blocked", "gone": "dead"}, kinds
+            assert cache[f"{base}/get-only"]["head_unsupported"]
+            assert checker.pool.reused > 0, "keep-alive 연결을 재사용해야 합니다"
+            times = sorted(t for t, *_ in requests)
+            assert all(b - a >= 0.015 for a, b in zip(times, times[1:])), "호스트별 간격을 지켜야 합니다"
+            report = build_report(posts_by_url, cache)
+            assert [p["kind"] for p in next(iter(report.values()))] == ["redirected", "blocked", "dead"], report
+
+            # 증분 실행: 오래되지 않은 항목은 다시 확인하지 않습니다.
+            _, _, checked = run([post], cache_path=cache_path, checker=LinkChecker(limiter=HostLimiter(0)))
+            assert checked == 0
+
+            # 전체 재확인: ETag 가 있는 링크는 조건부 요청으로 304 를 받습니다.
+            requests.clear()
+            _, cache, checked = run([post], full=True, cache_path=cache_path, checker=LinkChecker(limiter=HostLimiter(0)))
+            assert checked == 6 and cache[f"{base}/ok"].get("not_modified") and classify(cache[f"{base}/ok"]) == "ok"
+            assert any(h.get("If-None-Match") == '"v1"' for _, _, path, h in requests if path == "/ok")
+            assert not any(method == "HEAD" for _, method, path, _ in requests if path == "/get-only")
+    finally:
+        server.shutdown()
+        server.server_close()
+    print("✅ link health self-test passed")
+
+
+def main(args):
+    if "--self-test" in args:
+        self_test()
+        return 0
+    bots = [a for a in args if a in SERIES] or SERIES
+    paths = [path for bot in bots for path in list_posts(bot)]
+    posts_by_url, cache, _ = run(paths, full="--full" in args)
+    report = build_report(posts_by_url, cache)
+    print_report(report)
+    if "--json" in args:
+        output = args[args.index("--json") + 1]
+        atomic_write_text(output, json.dumps({"generated": datetime.now().isoformat(timespec="seconds"), "posts": report},
+                                             ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
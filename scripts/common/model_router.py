@@ -0,0 +1,273 @@
+"""
+작업별 모델 라우팅.
+
+각 봇은 작업(research, plan, write, summarize_state ...)마다 시도할 (모델 등급, thinking 설정, 지연 SLO) 목록을 정의합니다.
+앞 단계의 모델이 오류를 내거나 SLO 안에 응답하지 않으면 다음(더 빠른) 등급으로 넘어갑니다.
+마지막 단계는 SLO 와 관계없이 응답을 기다립니다.
+SLO 를 넘겨 버린 요청은 스레드에서 계속 돌지만 HTTP 타임아웃(SLO × ABANDONED_TIMEOUT_FACTOR)으로 끊기며,
+그 전에 끝나면 토큰 사용량을 outcome=abandoned 로 기록합니다.
+모든 라우팅 결정은 지연시간/토큰 사용량과 함께 run_data/routing_log.jsonl 에 기록됩니다. (BOT_MAX_LOG_BYTES 를 넘으면 최근 기록만 남김)
+context_cache 가 주어지면 시스템 프롬프트/도구/고정 앞부분(cache_prefix)을 캐시로 참조합니다. (common/context_cache.py)
+set_rate_limiter 로 공용 RPM/TPM 제한을 걸면 모든 호출이 그 버킷을 거칩니다. (common/rate_limit.py, common/scheduler.py)
+보내기 전에 프롬프트 토큰 수를 로컬에서 추정하고, 성공한 호출의 글자 종류별 개수를 실제 토큰 수와 함께 남겨 보정에 씁니다. (common/tokens.py)
+thinking 컨트롤러가 주어지면 첫 단계의 thinking 설정을 작업별 이력에 따라 고릅니다. (common/thinking_budget.py)
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from common.context_cache import is_cache_missing
+from common.rate_limit import is_rate_limited, retry_after_seconds
+from common.state_store import append_jsonl
+from common.tokens import estimate_from_features, predict_cost, text_features
+from common.tracing import tracer
+
+# 모델 등급. 모델을 바꿀 때는 여기만 고치면 됩니다.
+TIERS = {
+    "deep": "gemini-3-flash-preview",     # 장문 작성, 높은 추론
+    "standard": "gemini-2.5-flash",       # 검색 기반 조사, 소설 작성
+    "fast": "gemini-2.5-flash-lite",      # JSON 정리, 대체(fallback) 경로
+}
+
+# SLO 를 넘겨 버린 요청의 HTTP 타임아웃 = SLO × 이 값. 늦게라도 끝나면 사용량을 기록할 수 있게 SLO 보다 조금 깁니다.
+ABANDONED_TIMEOUT_FACTOR = 2
+
+# 프로세스 전체에서 함께 쓰는 QuotaLimiter (없으면 제한 없음)
+_rate_limiter = None
+
+
+def set_rate_limiter(limiter):
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+class SloExceeded(Exception):
+    pass
+
+
+def route(tier, slo=None, thinking_budget=None, thinking_level=None):
+    """라우팅 단계 하나. slo 는 초 단위이며 None 이면 무제한입니다."""
+    return {"tier": tier, "slo": slo, "thinking_budget": thinking_budget, "thinking_level": thinking_level}
+
+
+def usage_of(response):
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_token_count", None),
+        "output_tokens": getattr(usage, "candidates_token_count", None),
+        "thinking_tokens": getattr(usage, "thoughts_token_count", None),
+        "cached_tokens": getattr(usage, "cached_content_token_count", None),
+    }
+
+
+def _config_value(config, key):
+    if isinstance(config, dict):
+        return config.get(key)
+    return getattr(config, key, None)
+
+
+def _response_text(response):
+    try:
+        return response.text
+    except Exception:
+        return None
+
+
+def _output_features(response):
+    text = _response_text(response)
+    if not text:
+        return None
+    features = text_features(text)
+    features["call"] = 0
+    return features
+
+
+def _call_with_slo(fn, slo, on_abandoned=None):
+    """slo 초 안에 끝나지 않으면 SloExceeded. 버려진 호출이 나중에 끝나면 on_abandoned(ok, 결과 또는 예외, 경과 초)를 부릅니다."""
+    if slo is None:
+        return fn()
+    results = queue.Queue()
+    abandoned = threading.Event()
+    started = time.perf_counter()
+
+    def worker():
+        try:
+            outcome = (True, fn())
+        except Exception as e:
+            outcome = (False, e)
+        results.put(outcome)
+        if abandoned.is_set() and on_abandoned:
+            on_abandoned(*outcome, time.perf_counter() - started)
+
+    threading.Thread(target=tracer.bind(worker), daemon=True).start()
+    try:
+        ok, value = results.get(timeout=slo)
+    except queue.Empty:
+        abandoned.set()
+        # 제한 시간과 abandoned 표시 사이에 끝난 호출은 그대로 씁니다.
+        try:
+            ok, value = results.get_nowait()
+        except queue.Empty:
+            raise SloExceeded(f"no response within {slo}s")
+    if not ok:
+        raise value
+    return value
+
+
+class ModelRouter:
+    def __init__(self, routes, run_data_dir, hedger=None, context_cache=None, thinking=None):
+        self.routes = routes
+        self.thinking = thinking
+        self.log_path = os.path.join(run_data_dir, "routing_log.jsonl")
+        self.hedger = hedger
+        self.context_cache = context_cache
+        self.decisions = []
+        self._log_lock = threading.Lock()
+
+    def preferred_model(self, task):
+        return TIERS[self.routes[task][0]["tier"]]
+
+    def estimate(self, task, contents, config, cache_prefix=None, output_tokens=0):
+        """보내기 전 어림값: 첫 단계 모델 기준 {"model", "prompt_tokens", "cost"} (cost 는 USD, 출력은 output_tokens 로 가정)"""
+        model = self.preferred_model(task)
+        prompt_tokens = estimate_from_features(text_features(
+            _config_value(config, "system_instruction"), cache_prefix, contents, tools=len(_config_value(config, "tools") or [])))
+        return {"model": model, "prompt_tokens": prompt_tokens, "cost": predict_cost(model, prompt_tokens, output_tokens)}
+
+    def _thinking_config(self, step):
+        if step["thinking_level"] is None and step["thinking_budget"] is None:
+            return None
+        from google.genai import types
+        if step["thinking_level"]:
+            return types.ThinkingConfig(thinking_level=step["thinking_level"], include_thoughts=False)
+        return types.ThinkingConfig(thinking_budget=step["thinking_budget"], include_thoughts=False)
+
+    def _http_options(self, seconds):
+        from google.genai import types
+        return types.HttpOptions(timeout=int(seconds * 1000))
+
+    def _log(self, record):
+        with self._log_lock:
+            self.decisions.append(record)
+            if self.thinking:
+                self.thinking.record(record["task"], record)
+            append_jsonl(self.log_path, record)
+
+    def _prepare(self, client, model, config, contents, cache_prefix, use_cache):
+        """(config, contents, 캐시 key)"""
+        if self.context_cache and use_cache:
+            return self.context_cache.apply(client, model, config, contents, cache_prefix)
+        return config, (cache_prefix + contents if cache_prefix else contents), None
+
+    def generate(self, client, task, contents, config, validate=None, cache_prefix=None):
+        """
+        task 의 라우팅 단계를 순서대로 시도합니다.
+        validate 가 주어지면 그 반환값을, 아니면 응답 객체를 돌려줍니다. 모든 단계가 실패하면 마지막 예외를 던집니다.
+        cache_prefix: contents 앞에 붙는 고정 문자열. 컨텍스트 캐시가 있으면 캐시에 넣고 요청에서는 뺍니다.
+        """
+        steps = self.routes[task]
+        last_error = None
+        prompt_features = text_features(_config_value(config, "system_instruction"), cache_prefix, contents,
+                                        tools=len(_config_value(config, "tools") or []))
+        estimated = estimate_from_features(prompt_features)
+        index, use_cache = 0, True
+        while index < len(steps):
+            step = steps[index]
+            if self.thinking:
+                step = self.thinking.adjust(task, index, step)
+            model = TIERS[step["tier"]]
+            is_last = index == len(steps) - 1
+            update = {}
+            thinking_config = self._thinking_config(step)
+            if thinking_config is not None:
+                update["thinking_config"] = thinking_config
+            # 버려질 수 있는 요청(SLO 초과, hedge 에서 진 쪽)은 취소할 수 없으므로 HTTP 타임아웃으로 끊습니다.
+            timeouts = []
+            if step["slo"] is not None and not is_last:
+                timeouts.append(step["slo"] * ABANDONED_TIMEOUT_FACTOR)
+            hedged = self.hedger is not None and self.hedger.covers(task)
+            hedge_timeout = self.hedger.call_timeout(f"{task}:{model}") if hedged else None
+            if hedge_timeout is not None:
+                timeouts.append(hedge_timeout)
+            if timeouts:
+                update["http_options"] = self._http_options(min(timeouts))
+            step_config = config.model_copy(update=update) if update else config
+            step_config, step_contents, cache_key = self._prepare(client, model, step_config, contents, cache_prefix, use_cache)
+
+            # 버려진 hedge/SLO 스레드가 다음 단계의 값을 보지 않도록 기본 인자로 고정합니다.
+            def make_call(model=model, step_config=step_config, step_contents=step_contents):
+                limiter = _rate_limiter
+                if limiter is None:
+                    return client.models.generate_content(model=model, contents=step_contents, config=step_config)
+                limiter.acquire(model, estimated)
+                try:
+                    response = client.models.generate_content(model=model, contents=step_contents, config=step_config)
+                except Exception as e:
+                    if is_rate_limited(e):
+                        limiter.throttled(model, retry_after_seconds(e))
+                    raise
+                limiter.record(model, estimated, usage_of(response).get("prompt_tokens"))
+                return response
+
+            def check(response):
+                return response, (validate(response) if validate else response)
+
+            def attempt(make_call=make_call, key=f"{task}:{model}"):
+                if hedged:
+                    return self.hedger.call(key, make_call, check)
+                return check(make_call())
+
+            started = time.perf_counter()
+            record = {"ts": datetime.now().isoformat(timespec="seconds"), "task": task, "step": index,
+                      "tier": step["tier"], "model": model, "slo": step["slo"], "cached": cache_key is not None,
+                      "thinking": step["thinking_level"] or step["thinking_budget"],
+                      "estimated_prompt_tokens": estimated}
+
+            def abandoned(ok, result, latency, record=record):
+                late = usage_of(result[0]) if ok else {"error": str(result)[:300]}
+                print(f"      (Routing: abandoned {record['task']} call on {record['model']} finished after {latency:.1f}s)")
+                self._log({**record, "outcome": "abandoned", "latency": round(latency, 3), **late})
+
+            try:
+                with tracer.span(f"model:{task}", model=model, step=index, cached=cache_key is not None) as span:
+                    response, value = _call_with_slo(attempt, None if is_last else step["slo"], abandoned)
+                    span["attrs"].update({"outcome": "ok", **usage_of(response)})
+            except Exception as e:
+                outcome = "slo_exceeded" if isinstance(e, SloExceeded) else "error"
+                self._log({**record, "outcome": outcome, "latency": round(time.perf_counter() - started, 3),
+                           "error": str(e)[:300]})
+                last_error = e
+                if cache_key and outcome == "error" and is_cache_missing(e):
+                    # 캐시가 서버에서 사라졌거나 권한이 없으므로 기록을 버리고 같은 단계를 캐시 없이 한 번 더 시도합니다.
+                    print(f"      (Routing: {task} on {model} failed with cached context, retrying without cache)")
+                    tracer.event("cache_retry", task=task, model=model)
+                    self.context_cache.invalidate(cache_key)
+                    use_cache = False
+                    continue
+                if not is_last:
+                    print(f"      (Routing: {task} on {model} {outcome}, falling back to {TIERS[steps[index + 1]['tier']]})")
+                    tracer.event("fallback", task=task, from_model=model, to_model=TIERS[steps[index + 1]['tier']], reason=outcome)
+                index, use_cache = index + 1, True
+                continue
+            self._log({**record, "outcome": "ok", "latency": round(time.perf_counter() - started, 3), **usage_of(response),
+                       "prompt_features": prompt_features, "output_features": _output_features(response)})
+            return value
+        raise last_error
+
+    def report(self):
+        total_cost = 0.0
+        for record in self.decisions:
+            tokens = ""
+            if record["outcome"] == "ok":
+                tokens = (f" prompt={record.get('prompt_tokens')} (est {record.get('estimated_prompt_tokens')})"
+                          f" output={record.get('output_tokens')}"
+                          f" thinking={record.get('thinking_tokens')} cached={record.get('cached_tokens')}")
+                total_cost += predict_cost(record["model"], record.get("prompt_tokens") or 0, record.get("output_tokens") or 0,
+                                           record.get("thinking_tokens") or 0, record.get("cached_tokens") or 0) or 0.0
+            print(f"   [route] {record['task']:<16} {record['model']:<24} {record['outcome']:<13} {record['latency']:7.1f}s{tokens}")
+        if total_cost:
+            print(f"   [route] estimated cost ${total_cost:.4f}")
@@ -0,0 +1,323 @@
+"""
+새 포스트 알림 발송.
+
+발행 단계(common/feeds.py)가 scripts/run_data/publish_manifest.json 에 순번과 함께 남긴 새 포스트 중
+마지막으로 전달을 확인한 순번(acked_seq) 이후의 것을 모아 연재별로 묶은 메시지 하나(digest)로 보냅니다.
+여러 봇이 잇달아 발행해도 페이지 빌드 후 한 번만 알립니다.
+
+* 전송: TRANSPORTS 중 BOT_NOTIFY_TRANSPORT(기본 telegram) 로 고릅니다. console 은 출력만 합니다.
+* 재시도: 429 는 retry_after 만큼, 네트워크 오류와 5xx 는 지수 백오프로 MAX_ATTEMPTS 번까지 시도합니다. 그 밖의 4xx 는 바로 실패합니다.
+* 속도 제한: 같은 채팅에 분당 MESSAGES_PER_MINUTE 개를 넘지 않게 기다립니다 (긴 digest 는 여러 메시지로 나뉩니다).
+* 전달 상태: scripts/run_data/notify_state.json. 보내기 전에 pending 을 기록하고, 메시지 하나가 전달될 때마다
+  그 메시지에 담긴 순번을 pending.delivered 에 남기며, 모두 보낸 뒤 acked_seq 를 올립니다.
+  pending 이 남아 있으면 전송 도중 중단된 것이므로 다음 실행은 전달된 순번만 빼고 나머지를 새 포스트와 함께 보냅니다.
+  (전달 직후 기록 전에 프로세스가 죽으면 그 메시지 하나는 다시 갈 수 있습니다.) --resend-pending 이면 묶음 전체를 다시 보냅니다.
+
+usage: python -m common.notify [--dry-run] [--resend-pending] [--self-test]
+    환경 변수: TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+"""
+import html
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+from common.feeds import FEED_TITLES, MANIFEST_PATH, load_manifest
+from common.posts import SHARED_RUN_DATA_DIR, SITE_URL
+from common.rate_limit import TokenBucket
+from common.state_store import atomic_write_text
+
+STATE_PATH = os.path.join(SHARED_RUN_DATA_DIR, "notify_state.json")
+TELEGRAM_API = "https://api.telegram.org"
+# Telegram 메시지 길이 제한은 4096자
+MAX_MESSAGE_CHARS = 4000
+MESSAGES_PER_MINUTE = int(os.environ.get("BOT_NOTIFY_PER_MINUTE", "20"))
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 2.0
+MAX_DELIVERIES = 100
+
+
+class TransportError(Exception):
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class TelegramTransport:
+    def __init__(self, token, chat_id, api_base=TELEGRAM_API, timeout=10):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_base = api_base.rstrip("/")
+        self.timeout = timeout
+
+    def send(self, text):
+        """보낸 메시지의 id 를 반환합니다."""
+        payload = json.dumps({"chat_id": self.chat_id, "text": text, "parse_mode": "HTML",
+                              "disable_web_page_preview": True}).encode('utf-8')
+        request = urllib.request.Request(f"{self.api_base}/bot{self.token}/sendMessage", data=payload,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                body = json.loads(e.read())
+            except ValueError:
+                body = {}
+            retry_after = (body.get("parameters") or {}).get("retry_after")
+            description = body.get("description") or str(e)
+            raise TransportError(f"HTTP {e.code}: {description}", retryable=e.code == 429 or e.code >= 500,
+                                 retry_after=retry_after)
+        except (urllib.error.URLError, OSError) as e:
+            raise TransportError(str(e))
+        if not body.get("ok"):
+            raise TransportError(body.get("description", "unknown error"), retryable=False)
+        return body["result"]["message_id"]
+
+
+class ConsoleTransport:
+    def __init__(self):
+        self.sent = 0
+
+    def send(self, text):
+        self.sent += 1
+        print(text)
+        return f"console-{self.sent}"
+
+
+def _telegram_from_env():
+    token, chat_id = os.environ.get("TELEGRAM_TOKEN"), os.environ.get("TELEGRAM_CHAT_ID")
+    if not token or not chat_id:
+        raise SystemExit("❌ TELEGRAM_TOKEN / TELEGRAM_CHAT_ID 가 없습니다.")
+    return TelegramTransport(token, chat_id)
+
+
+TRANSPORTS = {
+    "telegram": _telegram_from_env,
+    "console": ConsoleTransport,
+}
+
+
+class Dispatcher:
+    """재시도와 분당 전송 수 제한을 적용해 transport 로 보냅니다."""
+
+    def __init__(self, transport, per_minute=MESSAGES_PER_MINUTE, max_attempts=MAX_ATTEMPTS,
+                 base_backoff=BASE_BACKOFF_SECONDS, sleep=time.sleep):
+        self.transport = transport
+        self.bucket = TokenBucket(per_minute)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.sleep = sleep
+
+    def send(self, text):
+        for attempt in range(1, self.max_attempts + 1):
+            wait = self.bucket.wait_time(1, time.monotonic())
+            if wait > 0:
+                self.sleep(wait)
+            self.bucket.take(1)
+            try:
+                return self.transport.send(text)
+            except TransportError as e:
+                if not e.retryable or attempt == self.max_attempts:
+                    raise
+                delay = e.retry_after or self.base_backoff * 2 ** (attempt - 1) * random.uniform(0.8, 1.2)
+                print(f"      (Notify: attempt {attempt} failed: {e}, retrying in {delay:.1f}s)")
+                self.sleep(delay)
+
+
+def build_digest(posts, max_chars=MAX_MESSAGE_CHARS):
+    """연재별로 묶은 알림 메시지 목록 [(HTML, 담긴 순번 목록)]. 길면 여러 메시지로 나눕니다."""
+    lines = []
+    for category in sorted({post["category"] for post in posts}, key=lambda c: min(p["seq"] for p in posts if p["category"] == c)):
+        lines.append((f"\n<b>{html.escape(FEED_TITLES.get(category, category))}</b>", None))
+        for post in (p for p in posts if p["category"] == category):
+            lines.append((f'• <a href="{html.escape(post["url"], quote=True)}">{html.escape(post["title"])}</a>', post["seq"]))
+    header = f"📰 새 포스트 {len(posts)}개가 발행되었습니다."
+    messages, current, seqs = [], header, []
+    for line, seq in lines:
+        if len(current) + len(line) + 1 > max_chars:
+            messages.append((current, seqs))
+            current, seqs = header + " (계속)", []
+        current += "\n" + line
+        if seq is not None:
+            seqs.append(seq)
+    messages.append((current + f'\n\n<a href="{SITE_URL}/">{SITE_URL.split("//")[1]}</a>', seqs))
+    return messages
+
+
+class DeliveryState:
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.data = {"acked_seq": 0, "pending": None, "deliveries": []}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=2))
+
+    def begin(self, seqs, resumed=None):
+        """resumed: 이어서 보내는 중단된 묶음의 {"delivered", "messages"}"""
+        resumed = resumed or {}
+        self.data["pending"] = {"seqs": seqs, "delivered": resumed.get("delivered", []),
+                                "messages": resumed.get("messages", []),
+                                "started": datetime.now().isoformat(timespec="seconds")}
+        self._save()
+
+    def delivered(self, seqs, message_id):
+        """pending 묶음의 메시지 하나가 전달되었습니다."""
+        pending = self.data["pending"]
+        pending["delivered"] = sorted(set(pending["delivered"]) | set(seqs))
+        pending["messages"].append(message_id)
+        self._save()
+
+    def ack(self, seqs, message_ids):
+        self.data["acked_seq"] = max([self.data["acked_seq"]] + seqs)
+        self.data["pending"] = None
+        self.data["deliveries"] = (self.data["deliveries"] + [{
+            "seqs": [min(seqs), max(seqs)], "messages": message_ids,
+            "sent": datetime.now().isoformat(timespec="seconds"),
+        }])[-MAX_DELIVERIES:]
+        self._save()
+
+
+def notify(transport, manifest_path=MANIFEST_PATH, state_path=STATE_PATH, resend_pending=False, sleep=time.sleep):
+    """보낸 포스트 수를 반환합니다."""
+    state = DeliveryState(state_path)
+    pending = state.data.get("pending")
+    # pending 묶음은 아직 확인되지 않았으므로 acked_seq 이후에 그대로 포함됩니다. 이미 전달된 순번만 뺍니다.
+    already_sent = set()
+    if pending and not resend_pending:
+        # delivered 가 없는 예전 형식의 기록은 어디까지 갔는지 모르므로 모두 전달된 것으로 봅니다.
+        already_sent = set(pending.get("delivered", pending["seqs"]))
+        if already_sent:
+            print(f"⚠️ 이전 알림(순번 {min(pending['seqs'])}~{max(pending['seqs'])})이 전송 도중 중단되었습니다. "
+                  f"전달된 {len(already_sent)}개는 빼고 보냅니다 (--resend-pending 으로 모두 다시 보낼 수 있음).")
+    unacked = [p for p in load_manifest(manifest_path)["posts"] if p["seq"] > state.data["acked_seq"]]
+    posts = [p for p in unacked if p["seq"] not in already_sent]
+    if not posts:
+        if unacked:
+            state.ack([p["seq"] for p in unacked], pending.get("messages", []))
+        print("📭 새로 알릴 포스트가 없습니다.")
+        return 0
+
+    seqs = [p["seq"] for p in unacked]
+    dispatcher = Dispatcher(transport, sleep=sleep)
+    resumed = {"delivered": sorted(already_sent), "messages": pending.get("messages", [])} if already_sent else None
+    state.begin(seqs, resumed)
+    messages = build_digest(posts)
+    for text, message_seqs in messages:
+        state.delivered(message_seqs, dispatcher.send(text))
+    state.ack(seqs, state.data["pending"]["messages"])
+    print(f"📨 알림 전송 완료: 포스트 {len(posts)}개, 메시지 {len(messages)}개")
+    return len(posts)
+
+
+def self_test():
+    import tempfile
+    from common.fake_telegram import FakeTelegramServer
+
+    def post(seq, category="cs_history"):
+        return {"seq": seq, "category": category, "title": f"Day {seq}: <테스트> & 알림", "date": "2026-01-01",
+                "url": f"{SITE_URL}/{category}/day{seq}/", "published_at": "2026-01-01T00:00:00"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest_path = os.path.join(tmp, "manifest.json")
+        state_path = os.path.join(tmp, "state.json")
+        write = lambda posts: atomic_write_text(manifest_path, json.dumps({"next_seq": len(posts) + 1, "posts": posts}))
+        slept = []
+
+        # 두 연재의 포스트를 한 메시지로 묶고, 429 와 500 을 재시도해 한 번만 전달합니다.
+        write([post(1), post(2, "ai_history"), post(3)])
+        with FakeTelegramServer(failures=[("429", 1), ("500", None)]) as server:
+            transport = TelegramTransport(server.token, "chat", api_base=server.url)
+            assert notify(transport, manifest_path, state_path, sleep=slept.append) == 3
+            assert len(server.messages) == 1 and len(server.requests) == 3, server.requests
+            assert slept[0] == 1, slept
+            text = server.messages[0]["text"]
+            assert "&lt;테스트&gt; &amp; 알림" in text and text.index("day1/") < text.index("day3/") < text.index("day2/"), text
+
+            # 이미 전달한 포스트는 다시 보내지 않습니다.
+            assert notify(transport, manifest_path, state_path, sleep=slept.append) == 0
+            assert len(server.messages) == 1
+
+            # 영구 오류(4xx)는 재시도하지 않습니다. 아무것도 전달되지 않았으므로 다음 실행이 그 포스트를 보냅니다.
+            write([post(i) for i in range(1, 5)])
+            bad = TelegramTransport("wrong-token", "chat", api_base=server.url)
+            try:
+                notify(bad, manifest_path, state_path, sleep=slept.append)
+                raise AssertionError("expected TransportError")
+            except TransportError as e:
+                assert not e.retryable
+            pending = DeliveryState(state_path).data["pending"]
+            assert pending["seqs"] == [4] and pending["delivered"] == [], pending
+            write([post(i) for i in range(1, 6)])
+            assert notify(transport, manifest_path, state_path, sleep=slept.append) == 2
+            assert "day4/" in server.messages[-1]["text"] and "day5/" in server.messages[-1]["text"]
+
+        # 여러 메시지 중 일부만 전달되면, 다음 실행은 전달된 순번만 빼고 보냅니다.
+        state = DeliveryState(state_path)
+        long_posts = [dict(post(i), title="긴 제목 " * 250) for i in range(6, 12)]
+        write([post(i) for i in range(1, 6)] + long_posts)
+        with FakeTelegramServer(failures=[None, ("400", None)]) as server:
+            transport = TelegramTransport(server.token, "chat", api_base=server.url)
+            try:
+                notify(transport, manifest_path, state_path, sleep=slept.append)
+                raise AssertionError("expected TransportError")
+            except TransportError:
+                pass
+            delivered = DeliveryState(state_path).data["pending"]["delivered"]
+            assert delivered and len(delivered) < len(long_posts), delivered
+            assert notify(transport, manifest_path, state_path, sleep=slept.append) == len(long_posts) - len(delivered)
+            resent = "".join(m["text"] for m in server.messages[1:])
+            assert all(f"day{seq}/" not in resent for seq in delivered), delivered
+            assert all(f"day{p['seq']}/" in resent for p in long_posts if p["seq"] not in delivered)
+            assert DeliveryState(state_path).data["acked_seq"] == 11 and state.data["acked_seq"] == 5
+
+            # 모두 전달된 뒤 중단된 묶음은 확인 처리만 하고, --resend-pending 이면 묶음 전체를 다시 보냅니다.
+            write([post(i) for i in range(1, 6)] + long_posts + [post(12)])
+            DeliveryState(state_path).begin([12], {"delivered": [12], "messages": [99]})
+            assert notify(transport, manifest_path, state_path, sleep=slept.append) == 0
+            assert DeliveryState(state_path).data["acked_seq"] == 12
+            write([post(i) for i in range(1, 6)] + long_posts + [post(12), post(13)])
+            DeliveryState(state_path).begin([13], {"delivered": [13], "messages": [100]})
+            assert notify(transport, manifest_path, state_path, resend_pending=True, sleep=slept.append) == 1
+
+        # 긴 digest 는 여러 메시지로 나뉘고, 분당 전송 수 제한에 맞춰 기다립니다.
+        messages = build_digest([post(i) for i in range(1, 200)], max_chars=1000)
+        assert len(messages) > 3 and all(len(text) <= 1100 for text, _ in messages)
+        assert sorted(seq for _, seqs in messages for seq in seqs) == list(range(1, 200))
+        slept.clear()
+        dispatcher = Dispatcher(ConsoleTransport(), per_minute=2, sleep=slept.append)
+        dispatcher.transport.send = lambda text: "ok"
+        for _ in range(3):
+            dispatcher.send("x")
+        assert len(slept) == 1 and slept[0] > 25, slept
+    print("✅ notify self-test passed")
+
+
+def main(args):
+    if "--self-test" in args:
+        self_test()
+        return 0
+    name = "console" if "--dry-run" in args else os.environ.get("BOT_NOTIFY_TRANSPORT", "telegram")
+    transport = TRANSPORTS[name]()
+    if name == "console":
+        # 출력만 하고 전달 상태는 바꾸지 않습니다.
+        state = DeliveryState()
+        posts = [p for p in load_manifest()["posts"] if p["seq"] > state.data["acked_seq"]]
+        for text, _ in build_digest(posts) if posts else [("📭 새로 알릴 포스트가 없습니다.", [])]:
+            transport.send(text)
+        return 0
+    notify(transport, resend_pending="--resend-pending" in args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
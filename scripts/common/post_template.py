@@ -0,0 +1,206 @@
+"""
+역사 봇(ai_history, cs_history) 작성자 출력의 템플릿 검사.
+
+작성자(writer) 응답의 content 는 `Day N: 제목` 줄과 아래 REQUIRED_SECTIONS 의 순서를 따라야 하고,
+main() 의 연재 종료 처리는 '## 📅 내일의 키워드 예고' 헤더를 찾아 교체합니다.
+여기서는 모델 호출 없이 content 를 섹션으로 나눠 검사하고, 문제가 있는 섹션만 다시 요청해 끼워 넣을 수 있게 합니다.
+
+usage: python -m common.post_template [bot ...]   # 저장된 아티팩트를 검사
+"""
+import os
+import re
+import sys
+
+# (헤더 접두어, 작성자 프롬프트의 헤더 템플릿, 본문 최소 글자 수)
+REQUIRED_SECTIONS = [
+    ("## 🕰️ 오늘의 키워드", "## 🕰️ 오늘의 키워드: {Topic Name}", 100),
+    ("## ⚡ 무엇이 혁명적이었나?", "## ⚡ 무엇이 혁명적이었나? (Deep Dive)", 300),
+    ("## 🔗 현대와의 연결", "## 🔗 현대와의 연결: {Modern Analogy}", 150),
+    ("## 📅 내일의 키워드 예고", "## 📅 내일의 키워드 예고", 30),
+]
+SECTION_MAX_CHARS = 6000
+INTRO_MIN_CHARS = 50
+# 오늘 주제의 글자 bigram 중 키워드 섹션(헤더+본문)에 나와야 하는 비율.
+# 기존 포스트에서 맞는 주제는 0.77 이상, 다른 날 주제는 0.35 이하였습니다.
+TOPIC_MIN_OVERLAP = 0.5
+
+_SECTION_RE = re.compile(r"^## .*$", re.MULTILINE)
+# 작성자 지시문의 JSON 출력 형식 부분 (마크다운 템플릿 앞까지)
+_JSON_OUTPUT = re.compile(r"\*\*Output Format:\*\*.*?(?=\*\*Markdown Template)", re.DOTALL)
+
+
+def parse_sections(content):
+    """content → (제목 줄, 도입부, [(헤더 줄, 본문)])"""
+    content = content.strip()
+    title, _, rest = content.partition("\n")
+    headers = list(_SECTION_RE.finditer(rest))
+    intro = rest[:headers[0].start()] if headers else rest
+    sections = []
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(rest)
+        sections.append((match.group(0).strip(), rest[match.end():end].strip()))
+    return title.strip(), intro.strip(), sections
+
+
+def find_section(sections, prefix):
+    return [i for i, (header, _) in enumerate(sections) if header.startswith(prefix)]
+
+
+def _bigrams(text):
+    text = re.sub(r"[\W_]+", "", str(text).lower())
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def topic_overlap(topic, text):
+    """topic 의 글자 bigram 중 text 에도 있는 비율 (0~1). 주제가 비어 있으면 1."""
+    grams = _bigrams(topic)
+    if not grams:
+        return 1.0
+    return len(grams & _bigrams(text)) / len(grams)
+
+
+def validate_content(content, day_count, metadata=None, expected=None):
+    """
+    문제 목록을 반환합니다. 각 항목은 {"section": 헤더 접두어 | "title" | "intro" | "metadata", "problem": 설명}.
+    metadata: 응답의 metadata (dict), expected: 플래너가 정한 {"current_topic", "next_topic", "next_year"}
+    키워드 섹션은 오늘 주제(expected 의 current_topic, 없으면 metadata.current_topic)를 다뤄야 합니다.
+    """
+    issues = []
+    title, intro, sections = parse_sections(content)
+    if not re.match(rf"^#*\s*Day\s+{day_count}\s*:", title):
+        issues.append({"section": "title", "problem": f"제목 줄이 'Day {day_count}:' 로 시작하지 않습니다: {title[:40]!r}"})
+    if len(intro) < INTRO_MIN_CHARS:
+        issues.append({"section": "intro", "problem": f"도입 인사가 너무 짧습니다 ({len(intro)}자)"})
+
+    last_index = -1
+    for prefix, _, min_chars in REQUIRED_SECTIONS:
+        found = find_section(sections, prefix)
+        if not found:
+            issues.append({"section": prefix, "problem": "섹션이 없습니다"})
+            continue
+        if len(found) > 1:
+            issues.append({"section": prefix, "problem": f"섹션이 {len(found)}번 나옵니다"})
+        index = found[0]
+        body = sections[index][1]
+        if index < last_index:
+            issues.append({"section": prefix, "problem": "섹션 순서가 템플릿과 다릅니다"})
+        last_index = max(last_index, index)
+        if len(body) < min_chars:
+            issues.append({"section": prefix, "problem": f"본문이 너무 짧습니다 ({len(body)}자 < {min_chars}자)"})
+        elif len(body) > SECTION_MAX_CHARS:
+            issues.append({"section": prefix, "problem": f"본문이 너무 깁니다 ({len(body)}자 > {SECTION_MAX_CHARS}자)"})
+
+    expected = expected or {}
+    keyword = find_section(sections, REQUIRED_SECTIONS[0][0])
+    topic = expected.get("current_topic") or (metadata or {}).get("current_topic")
+    if keyword and topic:
+        header, body = sections[keyword[0]]
+        overlap = topic_overlap(topic, f"{header}\n{body}")
+        if overlap < TOPIC_MIN_OVERLAP:
+            issues.append({"section": REQUIRED_SECTIONS[0][0],
+                           "problem": f"키워드 섹션이 오늘 주제({topic!r})를 다루지 않습니다 (겹침 {overlap:.2f})"})
+
+    if metadata:
+        if keyword and str(metadata.get("current_year")) not in sections[keyword[0]][1]:
+            issues.append({"section": "metadata",
+                           "problem": f"metadata.current_year({metadata.get('current_year')})가 키워드 섹션의 시기와 다릅니다"})
+        if expected.get("current_topic") and \
+                topic_overlap(expected["current_topic"], metadata.get("current_topic") or "") < TOPIC_MIN_OVERLAP:
+            issues.append({"section": "metadata",
+                           "problem": f"metadata.current_topic({metadata.get('current_topic')!r})가 "
+                                      f"오늘 주제({expected['current_topic']!r})와 다릅니다"})
+        for key in ("next_topic", "next_year"):
+            if key in expected and metadata.get(key) != expected[key]:
+                issues.append({"section": "metadata",
+                               "problem": f"metadata.{key}({metadata.get(key)!r})가 플래너 결정({expected[key]!r})과 다릅니다"})
+    return issues
+
+
+def section_template(prefix):
+    for section_prefix, template, _ in REQUIRED_SECTIONS:
+        if section_prefix == prefix:
+            return template
+    raise KeyError(prefix)
+
+
+def splice_section(content, prefix, section_text):
+    """
+    prefix 섹션을 section_text(헤더 줄 포함)로 바꿉니다. 섹션이 없으면 템플릿 순서에 맞는 위치에 넣습니다.
+    같은 헤더가 여러 번 나오면 모두 지우고 하나만 남깁니다.
+    """
+    title, intro, sections = parse_sections(content)
+    header, _, body = section_text.strip().partition("\n")
+    new_section = (header.strip(), body.strip())
+    order = [p for p, _, _ in REQUIRED_SECTIONS]
+
+    found = find_section(sections, prefix)
+    if found:
+        sections[found[0]] = new_section
+        sections = [s for i, s in enumerate(sections) if i not in found[1:]]
+    else:
+        later = order[order.index(prefix) + 1:]
+        position = next((i for i, (h, _) in enumerate(sections) if any(h.startswith(p) for p in later)), len(sections))
+        sections.insert(position, new_section)
+
+    parts = [title, intro] + [f"{h}\n{b}" for h, b in sections]
+    return "\n\n".join(part for part in parts if part)
+
+
+def extract_section(text, prefix):
+    """섹션만 다시 요청한 응답에서 코드 블록 표시를 걷어내고 prefix 헤더부터의 섹션을 꺼냅니다. 없으면 None."""
+    text = re.sub(r"^```[a-z]*\s*$", "", text.strip(), flags=re.MULTILINE).strip()
+    headers = list(_SECTION_RE.finditer(text))
+    for i, match in enumerate(headers):
+        if match.group(0).startswith(prefix):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+            return f"{match.group(0).strip()}\n{text[match.end():end].strip()}"
+    return None
+
+
+def markdown_only(writer_prompt):
+    """
+    작성자 지시문에서 JSON 출력 형식 부분을 빼고 템플릿을 따르는 마크다운만 쓰라는 지시로 바꿉니다.
+    섹션/부분만 요청할 때 씁니다. JSON 으로 감싼 응답은 '## ' 헤더가 문자열 안에 이스케이프되어 extract_section 이 찾지 못합니다.
+    """
+    prompt = _JSON_OUTPUT.sub(
+        "**Output Format:**\nOutput Markdown only (no JSON, no code fences), following the template below. "
+        "Write only the part you are asked for.\n\n", writer_prompt)
+    return prompt.replace("**Markdown Template for 'content':**", "**Markdown Template:**")
+
+
+def fix_title(content, day_count):
+    title, _, rest = content.strip().partition("\n")
+    name = re.sub(r"^#*\s*(Day\s+\d+\s*:)?\s*", "", title)
+    return f"Day {day_count}: {name}\n{rest}"
+
+
+if __name__ == "__main__":
+    from common.artifacts import ArtifactStore
+    from common.posts import REPO_ROOT
+
+    bots = sys.argv[1:] or ["ai_history", "cs_history"]
+    checked, failed = 0, 0
+    # metadata 가 없는 아티팩트(마크다운에서 역변환한 포스트)는 주제/메타데이터 검사를 할 수 없어 따로 셉니다.
+    unchecked = {}
+    for bot in bots:
+        store = ArtifactStore(os.path.join(REPO_ROOT, "scripts", bot))
+        for path in store.list():
+            artifact = store.load(path)
+            metadata = artifact["response"].get("metadata")
+            if not metadata:
+                unchecked.setdefault(bot, []).append(artifact["post"])
+            checked += 1
+            problems = validate_content(artifact["response"]["content"], artifact["day"], metadata)
+            # 연재 마지막 포스트는 예고 섹션이 종료 안내로 교체되어 있습니다.
+            if "## 🛑 긴 여정의 마침표" in artifact["response"]["content"]:
+                problems = [p for p in problems if p["section"] != REQUIRED_SECTIONS[-1][0]]
+            if problems:
+                failed += 1
+                print(f"❌ {artifact['post']}")
+                for problem in problems:
+                    print(f"   [{problem['section']}] {problem['problem']}")
+    print(f"🧾 템플릿 검사: {checked}개 중 실패 {failed}개")
+    for bot, posts in unchecked.items():
+        print(f"⚠️ [{bot}] metadata 가 없어 구조만 검사하고 주제/메타데이터 검사는 건너뛴 아티팩트 {len(posts)}개 "
+              f"({posts[0]} ~ {posts[-1]})")
+    sys.exit(1 if failed else 0)
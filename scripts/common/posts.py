@@ -0,0 +1,107 @@
+"""_posts 아래 마크다운 포스트를 읽는 공용 함수 (front matter 는 봇이 쓰는 단순한 형식만 지원)"""
+import glob
+import os
+import re
+
+REPO_ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+POSTS_ROOT = os.path.join(REPO_ROOT, "_posts")
+DATA_DIR = os.path.join(REPO_ROOT, "_data")
+SHARED_RUN_DATA_DIR = os.path.join(REPO_ROOT, "scripts", "run_data")
+SITE_URL = "https://taehunkim.github.io"
+SERIES = ["ai_history", "cs_history", "ghost_in_the_legacy"]
+
+# 인용/면책 영역은 본문 분석에서 제외합니다.
+CITATION_HEADERS = ["## 📚 참고 문헌", "## 웹 검색", "## 맵 검색"]
+DISCLAIMER = "*이 콘텐츠는 AI에 의해 생성되었으며, 오류나 부정확한 정보를 포함할 수 있습니다.*"
+
+_FILENAME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})-(.+)\.md$")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\((https?://[^)\s]+)\)")
+
+
+def list_posts(series=None):
+    names = [series] if series else SERIES
+    paths = []
+    for name in names:
+        paths.extend(glob.glob(os.path.join(POSTS_ROOT, name, "*.md")))
+    return sorted(paths)
+
+
+def relative_path(path):
+    """Jekyll 의 page.path 와 같은 저장소 기준 상대 경로"""
+    return os.path.relpath(os.path.abspath(path), REPO_ROOT).replace(os.sep, "/")
+
+
+def split_front_matter(text):
+    if not text.startswith("---"):
+        return {}, text
+    end = text.find("\n---", 3)
+    if end == -1:
+        return {}, text
+    raw = text[3:end].strip("\n")
+    body = text[end + 4:].lstrip("\n")
+    front = {}
+    current_list = None
+    for line in raw.splitlines():
+        if re.match(r"^\s+-\s+", line) and current_list is not None:
+            front[current_list].append(line.strip()[1:].strip().strip('"'))
+            continue
+        key, sep, value = line.partition(":")
+        if not sep:
+            continue
+        key, value = key.strip(), value.strip()
+        if value == "":
+            front[key] = []
+            current_list = key
+        else:
+            front[key] = value.strip('"')
+            current_list = None
+    return front, body
+
+
+def post_url(category, path):
+    """_config.yml 의 permalink(/:categories/:title/) 규칙에 따른 URL"""
+    match = _FILENAME_RE.match(os.path.basename(path))
+    slug = match.group(2) if match else os.path.splitext(os.path.basename(path))[0]
+    return f"/{category}/{slug}/"
+
+
+def strip_citations(body):
+    cut = len(body)
+    for header in CITATION_HEADERS:
+        index = body.find(header)
+        if index != -1:
+            cut = min(cut, index)
+    return body[:cut].replace(DISCLAIMER, "").rstrip().rstrip("-").rstrip()
+
+
+def citation_links(body):
+    """(제목, URL) 목록"""
+    return _LINK_RE.findall(body)
+
+
+def excerpt(body, length=120):
+    for paragraph in re.split(r"\n\s*\n", strip_citations(body)):
+        paragraph = paragraph.strip()
+        if not paragraph or paragraph.startswith(("#", "*", "-", ">")):
+            continue
+        paragraph = re.sub(r"[*_`]", "", _LINK_RE.sub(r"\1", paragraph)).replace("\n", " ")
+        return paragraph if len(paragraph) <= length else paragraph[:length].rstrip() + "…"
+    return ""
+
+
+def read_post(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    front, body = split_front_matter(text)
+    categories = front.get("categories") or [os.path.basename(os.path.dirname(path))]
+    category = categories[0] if isinstance(categories, list) else categories
+    match = _FILENAME_RE.match(os.path.basename(path))
+    return {
+        "path": relative_path(path),
+        "category": category,
+        "date": match.group(1) if match else "",
+        "title": front.get("title", ""),
+        "front_matter": front,
+        "body": body,
+        "url": post_url(category, path),
+    }
@@ -0,0 +1,47 @@
+"""
+포스트 파일을 쓴 직후 실행하는 발행 후처리 단계.
+각 단계는 독립적이며, 실패해도 이미 저장된 포스트와 상태에는 영향을 주지 않습니다.
+"""
+import traceback
+
+from common.tracing import tracer
+
+
+def _update_related_posts(post_paths):
+    from common import related_posts
+    related_posts.update(post_paths)
+
+
+def _update_search_index(post_paths):
+    from common import search_index
+    search_index.update(post_paths)
+
+
+def _update_feeds(post_paths):
+    from common import feeds
+    feeds.update(post_paths)
+
+
+def _update_translation(post_paths):
+    # BOT_TRANSLATE=1 일 때만 모델을 호출합니다 (common/translation.py)
+    from common import translation
+    translation.update(post_paths)
+
+
+PUBLISH_STAGES = [
+    ("related_posts", _update_related_posts),
+    ("search_index", _update_search_index),
+    ("feeds", _update_feeds),
+    ("translation", _update_translation),
+]
+
+
+def run_publish_stages(*post_paths):
+    """봇은 새 포스트 하나를, common/render.py 는 다시 쓴 포스트 전체를 넘깁니다."""
+    for name, stage in PUBLISH_STAGES:
+        try:
+            with tracer.span(f"publish:{name}", posts=len(post_paths)):
+                stage(list(post_paths))
+        except Exception as e:
+            print(f"⚠️ [{name}] 발행 후처리 실패: {e}")
+            traceback.print_exc()
@@ -0,0 +1,131 @@
+"""
+API 키 하나를 함께 쓰는 모델 호출의 RPM/TPM 제한.
+
+모델마다 요청 수(RPM)와 입력 토큰 수(TPM) 토큰 버킷을 두고, 호출 전에 두 버킷에 여유가 생길 때까지 기다립니다.
+429(RESOURCE_EXHAUSTED)를 받으면 그 모델의 버킷을 비우고 retryDelay(없으면 지수 백오프 + 지터) 동안 멈춰,
+같은 키를 쓰는 다른 스레드가 연달아 429 를 받지 않게 합니다.
+
+한도는 무료 등급 기준 기본값이며, BOT_QUOTAS='{"gemini-2.5-flash": [1000, 1000000]}' 처럼 모델별 [RPM, TPM] 로 덮어씁니다.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+
+DEFAULT_QUOTAS = {
+    "gemini-3-flash-preview": (5, 250_000),
+    "gemini-2.5-flash": (10, 250_000),
+    "gemini-2.5-flash-lite": (15, 250_000),
+}
+FALLBACK_QUOTA = (5, 250_000)
+MAX_BACKOFF_SECONDS = 600
+
+
+def load_quotas():
+    quotas = dict(DEFAULT_QUOTAS)
+    override = os.environ.get("BOT_QUOTAS")
+    if override:
+        quotas.update({model: tuple(limits) for model, limits in json.loads(override).items()})
+    return quotas
+
+
+def rough_token_count(*values):
+    """요청 전 TPM 예약용 어림값 (한국어/영어 혼합 기준 약 2글자당 1토큰)"""
+    return max(1, sum(len(str(v)) for v in values if v) // 2)
+
+
+def is_rate_limited(error):
+    text = str(error)
+    return getattr(error, "code", None) == 429 or "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+def retry_after_seconds(error):
+    """오류 메시지의 retryDelay('23s') 또는 'retry in 23.5s' 를 초로 반환합니다. 없으면 None."""
+    match = re.search(r"retry(?:Delay)?['\"]?\s*[:=]?\s*['\"]?(?:in\s+)?(\d+(?:\.\d+)?)s", str(error), re.IGNORECASE)
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        self.tokens -= amount
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class QuotaLimiter:
+    def __init__(self, quotas=None):
+        self.quotas = quotas if quotas is not None else load_quotas()
+        self.buckets = {}
+        self.paused_until = {}
+        self.strikes = {}
+        self.stats = {}
+        self.condition = threading.Condition()
+
+    def _buckets(self, model):
+        if model not in self.buckets:
+            rpm, tpm = self.quotas.get(model, FALLBACK_QUOTA)
+            self.buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+            self.stats[model] = {"calls": 0, "waited": 0.0, "throttled": 0, "tokens": 0}
+        return self.buckets[model]
+
+    def acquire(self, model, estimated_tokens):
+        """요청 1개와 estimated_tokens 를 예약할 수 있을 때까지 기다립니다."""
+        started = time.monotonic()
+        with self.condition:
+            requests, tokens = self._buckets(model)
+            while True:
+                now = time.monotonic()
+                wait = max(self.paused_until.get(model, 0.0) - now,
+                           requests.wait_time(1, now), tokens.wait_time(estimated_tokens, now))
+                if wait <= 0:
+                    requests.take(1)
+                    tokens.take(estimated_tokens)
+                    break
+                self.condition.wait(timeout=wait)
+            stats = self.stats[model]
+            stats["calls"] += 1
+            stats["waited"] += time.monotonic() - started
+
+    def record(self, model, estimated_tokens, actual_tokens):
+        """응답의 실제 입력 토큰 수로 예약량을 정산하고, 429 연속 횟수를 초기화합니다."""
+        with self.condition:
+            _, tokens = self._buckets(model)
+            if actual_tokens is not None:
+                tokens.take(actual_tokens - estimated_tokens)
+                self.stats[model]["tokens"] += actual_tokens
+            self.strikes[model] = 0
+
+    def throttled(self, model, retry_after=None):
+        with self.condition:
+            requests, tokens = self._buckets(model)
+            self.strikes[model] = self.strikes.get(model, 0) + 1
+            delay = retry_after or min(MAX_BACKOFF_SECONDS, 15 * 2 ** (self.strikes[model] - 1)) * random.uniform(0.8, 1.2)
+            self.paused_until[model] = max(self.paused_until.get(model, 0.0), time.monotonic() + delay)
+            requests.drain()
+            tokens.drain()
+            self.stats[model]["throttled"] += 1
+            self.condition.notify_all()
+        print(f"      (Rate limit: {model} returned 429, pausing it for {delay:.0f}s)")
+
+    def report(self):
+        for model, stats in sorted(self.stats.items()):
+            print(f"   [quota] {model:<24} calls={stats['calls']} input_tokens={stats['tokens']}"
+                  f" waited={stats['waited']:.1f}s throttled={stats['throttled']}")
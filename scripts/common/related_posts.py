@@ -0,0 +1,175 @@
+"""
+관련 포스트 색인.
+
+_config.yml 에서 LSI(related)를 끈 상태이므로 Jekyll 의 site.related_posts 는 단순히 최신 글 목록입니다.
+여기서는 포스트를 쓸 때마다 문자 n-gram TF-IDF 유사도를 증분 갱신하고,
+결과를 _data/related_posts.json 에 기록해 빌드 시간 비용 없이 _includes/page__related.html 에서 사용합니다.
+
+* 특징: 제목(가중치 3) + 본문(참고 문헌/면책 제외)의 문자 2~3-gram 을 해시 버킷으로 모아 포스트당 상위 MAX_TERMS 개만 저장
+* 증분 갱신: 새 글(또는 바뀐 글)의 행만 다시 계산하고, 새 글이 기존 글의 상위 TOP_K 에 들어가는 이웃만 목록을 고칩니다.
+  다른 글의 점수는 그 글이 갱신될 때의 IDF 기준이므로, 가끔 --rebuild 로 전체를 다시 계산하면 됩니다.
+
+usage: python -m common.related_posts [--rebuild] [post.md ...]
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import zlib
+from collections import Counter
+
+from common.posts import DATA_DIR, SHARED_RUN_DATA_DIR, excerpt, list_posts, read_post, relative_path, strip_citations
+from common.state_store import atomic_write_text
+
+INDEX_PATH = os.path.join(SHARED_RUN_DATA_DIR, "related_posts_index.json")
+OUTPUT_PATH = os.path.join(DATA_DIR, "related_posts.json")
+TOP_K = 4
+MAX_TERMS = 300
+BUCKETS = 1 << 20
+TITLE_WEIGHT = 3
+
+
+def _ngrams(text):
+    text = re.sub(r"[^\w]+", " ", text.lower())
+    grams = Counter()
+    for token in text.split():
+        padded = f" {token} "
+        for n in (2, 3):
+            for i in range(len(padded) - n + 1):
+                grams[zlib.crc32(padded[i:i + n].encode('utf-8')) % BUCKETS] += 1
+    return grams
+
+
+def document_terms(post):
+    grams = _ngrams(strip_citations(post["body"]))
+    for bucket, count in _ngrams(post["title"]).items():
+        grams[bucket] += count * TITLE_WEIGHT
+    top = grams.most_common(MAX_TERMS)
+    return {str(bucket): round(1 + math.log(count), 4) for bucket, count in top}
+
+
+def _vector(terms, df, n_docs):
+    vec = {t: w * math.log((1 + n_docs) / (1 + df.get(t, 0))) for t, w in terms.items()}
+    norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+    return {t: v / norm for t, v in vec.items()}
+
+
+def _cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+def load_index():
+    if not os.path.exists(INDEX_PATH):
+        return {"docs": {}, "df": {}}
+    with open(INDEX_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _remove_doc(index, key):
+    doc = index["docs"].pop(key, None)
+    if not doc:
+        return
+    for t in doc["terms"]:
+        index["df"][t] -= 1
+        if index["df"][t] <= 0:
+            del index["df"][t]
+
+
+def _add_doc(index, post, digest):
+    terms = document_terms(post)
+    index["docs"][post["path"]] = {
+        "hash": digest, "title": post["title"], "url": post["url"],
+        "excerpt": excerpt(post["body"]), "terms": terms, "related": []
+    }
+    for t in terms:
+        index["df"][t] = index["df"].get(t, 0) + 1
+
+
+def _insert_neighbor(doc, key, score):
+    related = [r for r in doc["related"] if r[0] != key]
+    related.append([key, round(score, 4)])
+    related.sort(key=lambda r: -r[1])
+    doc["related"] = related[:TOP_K]
+
+
+def _recompute_row(index, key, vectors):
+    doc = index["docs"][key]
+    scores = [(other, _cosine(vectors[key], vec)) for other, vec in vectors.items() if other != key]
+    scores.sort(key=lambda s: -s[1])
+    doc["related"] = [[other, round(score, 4)] for other, score in scores[:TOP_K]]
+    return scores
+
+
+def update(paths=None, rebuild=False):
+    """paths 의 포스트를 색인에 반영합니다. paths 가 없으면 _posts 전체를 훑어 바뀐 글만 반영합니다."""
+    index = {"docs": {}, "df": {}} if rebuild else load_index()
+    all_paths = list_posts()
+    existing_keys = {relative_path(p) for p in all_paths}
+    candidates = paths if paths else all_paths
+
+    changed = []
+    for path in candidates:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        post = read_post(path)
+        current = index["docs"].get(post["path"])
+        if current and current["hash"] == digest:
+            continue
+        _remove_doc(index, post["path"])
+        _add_doc(index, post, digest)
+        changed.append(post["path"])
+
+    removed = [key for key in index["docs"] if key not in existing_keys]
+    for key in removed:
+        _remove_doc(index, key)
+
+    n_docs = len(index["docs"])
+    vectors = {key: _vector(doc["terms"], index["df"], n_docs) for key, doc in index["docs"].items()}
+
+    if rebuild:
+        for key in index["docs"]:
+            _recompute_row(index, key, vectors)
+    else:
+        affected = set()
+        for key, doc in index["docs"].items():
+            if any(r[0] in removed or r[0] in changed for r in doc["related"]) and key not in changed:
+                affected.add(key)
+        for key in changed:
+            for other, score in _recompute_row(index, key, vectors):
+                doc = index["docs"][other]
+                if other in affected or other in changed:
+                    continue
+                if len(doc["related"]) < TOP_K or score > doc["related"][-1][1]:
+                    _insert_neighbor(doc, key, score)
+        # 이웃이 삭제/변경된 글은 자신의 행을 다시 계산합니다.
+        for key in affected:
+            _recompute_row(index, key, vectors)
+
+    os.makedirs(SHARED_RUN_DATA_DIR, exist_ok=True)
+    atomic_write_text(INDEX_PATH, json.dumps(index, ensure_ascii=False, separators=(",", ":")))
+    write_output(index)
+    return changed
+
+
+def write_output(index):
+    output = {}
+    for key, doc in sorted(index["docs"].items()):
+        output[key] = [
+            {"title": index["docs"][other]["title"], "url": index["docs"][other]["url"],
+             "excerpt": index["docs"][other]["excerpt"]}
+            for other, _ in doc["related"] if other in index["docs"]
+        ]
+    os.makedirs(DATA_DIR, exist_ok=True)
+    atomic_write_text(OUTPUT_PATH, json.dumps(output, ensure_ascii=False, indent=1))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    rebuild = "--rebuild" in args
+    targets = [a for a in args if not a.startswith("--")]
+    updated = update(targets or None, rebuild=rebuild)
+    print(f"🔗 관련 포스트 색인 갱신: {len(updated)}개 포스트")
@@ -0,0 +1,98 @@
+"""
+아티팩트로부터 _posts 마크다운을 일괄 재렌더링합니다. 모델은 호출하지 않습니다.
+
+각 봇 모듈의 render_post(artifact) 가 템플릿(front matter, 인용 블록, 면책 문구)을 정의하므로
+템플릿을 고친 뒤 이 명령을 실행하면 모든 포스트에 반영됩니다. 렌더링 결과가 기존 파일과 다른 포스트만 다시 쓰고,
+바뀐 포스트에 대해서만 발행 후처리(관련 포스트, 검색 색인)를 실행합니다.
+빈 줄 개수나 파일 끝 줄바꿈처럼 공백만 다른 경우는 같은 것으로 보아, 이미 발행된 포스트를 공백 때문에 다시 쓰지 않습니다.
+
+usage: python -m common.render [--check] [--backfill] [--jobs N] [bot ...]
+    --check     파일을 쓰지 않고 바뀔 포스트만 출력합니다 (바뀔 포스트가 있으면 종료 코드 1)
+    --backfill  아티팩트가 없는 기존 포스트를 마크다운에서 역으로 아티팩트로 만듭니다
+"""
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from common.artifacts import ArtifactStore
+from common.bots import BOTS, SCRIPTS_DIR, load_bot
+from common.posts import REPO_ROOT, list_posts
+from common.publish import run_publish_stages
+from common.state_store import atomic_write_text
+
+
+def _same_text(a, b):
+    """줄 끝 공백, 연속된 빈 줄, 파일 끝 줄바꿈 차이는 무시합니다."""
+    def normalize(text):
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(line.rstrip() for line in text.splitlines())).strip()
+    return normalize(a) == normalize(b)
+
+
+def render_one(bot, artifact_path, check=False):
+    """(포스트 경로, "unchanged" | "changed" | "created")"""
+    module = load_bot(bot)
+    artifact = module.artifact_store.load(artifact_path)
+    post_path = os.path.join(REPO_ROOT, artifact["post"])
+    text = module.render_post(artifact)
+    current = None
+    if os.path.exists(post_path):
+        with open(post_path, 'r', encoding='utf-8') as f:
+            current = f.read()
+    if current is not None and _same_text(current, text):
+        return post_path, "unchanged"
+    if not check:
+        os.makedirs(os.path.dirname(post_path), exist_ok=True)
+        atomic_write_text(post_path, text)
+    return post_path, "created" if current is None else "changed"
+
+
+def _render_task(args):
+    return render_one(*args)
+
+
+def backfill(bot):
+    module = load_bot(bot)
+    count = 0
+    for path in list_posts(bot):
+        if module.artifact_store.exists(path):
+            continue
+        module.artifact_store.save(path, module.artifact_from_post(path))
+        count += 1
+    return count
+
+
+def render_all(bots, jobs=None, check=False):
+    tasks = [(bot, path, check) for bot in bots for path in ArtifactStore(os.path.join(SCRIPTS_DIR, bot)).list()]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(_render_task, tasks, chunksize=8))
+    return results
+
+
+def main(args):
+    check = "--check" in args
+    jobs = int(args[args.index("--jobs") + 1]) if "--jobs" in args else None
+    bots = [a for a in args if a in BOTS] or list(BOTS)
+
+    if "--backfill" in args:
+        for bot in bots:
+            print(f"🗂️ [{bot}] 아티팩트 역변환: {backfill(bot)}개")
+
+    results = render_all(bots, jobs=jobs, check=check)
+    touched = [path for path, status in results if status != "unchanged"]
+    for path, status in results:
+        if status != "unchanged":
+            print(f"   {status:<9} {os.path.relpath(path, REPO_ROOT)}")
+    missing = sum(len(list_posts(bot)) for bot in bots) - len(results)
+    print(f"🖨️ 렌더링: {len(results)}개 중 {len(touched)}개 {'변경 예정' if check else '갱신'}"
+          + (f" (아티팩트 없는 포스트 {missing}개는 건너뜀, --backfill 참고)" if missing > 0 else ""))
+
+    if check:
+        return 1 if touched else 0
+    if touched:
+        run_publish_stages(*touched)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,229 @@
+"""
+중복 실행 방지.
+
+* RunLock: 같은 머신에서 겹치는 실행을 막는 lock 파일 (오래되었거나 죽은 프로세스의 lock 은 회수)
+* run_key: 실행 칸(run_slot: 날짜, 하루 여러 번 도는 cron 이면 날짜 + 칸 번호) + 대상 Day N
+* 발행을 마친 실행은 같은 칸의 다음 실행이 만들 대상의 키(다음 Day)를 상태의 last_run_key 에 남깁니다.
+  같은 칸에서 다시 실행되면 그 키와 같아져 건너뛰고, 다음 cron 칸의 실행은 키가 달라 그대로 진행합니다.
+* find_duplicate_run: 상태의 last_run_key 가 이번 실행의 run_key 와 같거나, 대상 포스트가 이미 있거나,
+  오늘 할당량을 다 채웠으면 이유를 반환 (run_key 비교는 파일/git 을 보지 않는 가장 싼 검사라 먼저 합니다)
+
+python -m common.run_guard --self-test 는 각 봇의 상태 갱신 코드로 발행을 흉내 낸 뒤 같은 칸에서 main() 을 다시 실행해
+모델 호출 전에 건너뛰는지 확인합니다.
+
+GitHub Actions 러너끼리는 파일시스템을 공유하지 않으므로, 워크플로의 concurrency 그룹이 러너 간 직렬화를 담당하고
+이 모듈은 그 뒤에 도착한 중복 트리거를 모델 호출 없이 밀리초 단위로 끝내는 역할을 합니다.
+"""
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+LOCK_FILE = ".run.lock"
+# 가장 긴 정상 실행(연구 + 플래너 + 작성 + 재시도)보다 충분히 긴 시간
+STALE_LOCK_SECONDS = int(os.environ.get("BOT_STALE_LOCK_SECONDS", str(60 * 60)))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class RunLock:
+    """
+    with RunLock(script_dir) as acquired:
+        if not acquired: return
+    """
+
+    def __init__(self, directory, name=LOCK_FILE, stale_after=STALE_LOCK_SECONDS):
+        self.path = os.path.join(directory, name)
+        self.stale_after = stale_after
+        self.acquired = False
+
+    def _read_owner(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _is_stale(self, owner):
+        started = owner.get("started", 0)
+        if time.time() - started > self.stale_after:
+            return True
+        if owner.get("host") == socket.gethostname() and isinstance(owner.get("pid"), int):
+            return not _pid_alive(owner["pid"])
+        # 내용을 읽을 수 없는 lock 은 파일 시각으로 판단
+        if not owner:
+            try:
+                return time.time() - os.path.getmtime(self.path) > self.stale_after
+            except OSError:
+                return True
+        return False
+
+    def acquire(self):
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                owner = self._read_owner()
+                if not self._is_stale(owner):
+                    print(f"🔒 다른 실행이 진행 중입니다. (pid={owner.get('pid')}, host={owner.get('host')})")
+                    return False
+                print("🔓 오래된 lock 을 회수합니다.")
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"pid": os.getpid(), "host": socket.gethostname(), "started": time.time()}, f)
+            self.acquired = True
+            return True
+        return False
+
+    def release(self):
+        if self.acquired:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.acquired = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def run_slot(max_runs_per_day=None, now=None):
+    """하루를 max_runs_per_day 개로 나눈 칸 (예: '2026-10-19#1'). 횟수 제한이 없으면 날짜."""
+    now = now or datetime.now()
+    if not max_runs_per_day or max_runs_per_day <= 1:
+        return now.strftime('%Y-%m-%d')
+    return f"{now:%Y-%m-%d}#{now.hour * max_runs_per_day // 24}"
+
+
+def run_key(slot, day):
+    return f"{slot}/day{day}"
+
+
+def find_posts_for_day(posts_dir, day):
+    return sorted(glob.glob(os.path.join(posts_dir, f"*-day{day}.md")))
+
+
+def is_committed(paths):
+    """모든 경로가 git 에 추적되고 있고 작업 트리 변경이 없으면 True. git 을 쓸 수 없으면 None."""
+    try:
+        paths = [os.path.abspath(p) for p in paths]
+        cwd = os.path.dirname(paths[0])
+        tracked = subprocess.run(["git", "ls-files", "--error-unmatch", "--", *paths],
+                                 cwd=cwd, capture_output=True, text=True)
+        if tracked.returncode != 0:
+            return False
+        status = subprocess.run(["git", "status", "--porcelain", "--", *paths],
+                                cwd=cwd, capture_output=True, text=True)
+        return status.returncode == 0 and not status.stdout.strip()
+    except (OSError, IndexError):
+        return None
+
+
+def find_duplicate_run(posts_dir, day, today, state_paths, max_runs_per_day=None, last_run_key=None, slot=None):
+    """
+    이번 실행이 중복이면 그 이유(문자열)를, 진행해도 되면 None 을 반환합니다.
+    day 는 이번 실행이 만들 포스트 파일명의 Day 번호, last_run_key 는 마지막으로 발행한 실행이 남긴 키,
+    slot 은 이번 실행의 run_slot (없으면 지금 시각으로 계산)입니다.
+    """
+    key = run_key(slot or run_slot(max_runs_per_day), day)
+    if last_run_key == key:
+        return f"실행 키 {key} 는 이미 완료된 실행입니다 (last_run_key)."
+
+    existing = find_posts_for_day(posts_dir, day)
+    if existing:
+        committed = is_committed(existing + [p for p in state_paths if os.path.exists(p)])
+        name = os.path.basename(existing[0])
+        if committed is False:
+            return f"{name} 이(가) 이미 있지만 포스트/상태가 커밋되지 않았습니다. 상태를 확인하세요."
+        if committed is None:
+            return f"{name} 이(가) 이미 있습니다. git 을 쓸 수 없어 커밋 여부는 확인하지 못했습니다."
+        return f"{name} 와(과) 대응하는 상태가 이미 커밋되어 있습니다."
+
+    if max_runs_per_day:
+        published_today = glob.glob(os.path.join(posts_dir, f"{today}-day*.md"))
+        if len(published_today) >= max_runs_per_day:
+            return f"오늘({today}) 할당량 {max_runs_per_day}회를 이미 발행했습니다."
+    return None
+
+
+def self_test():
+    import contextlib
+    import io
+    import tempfile
+    from types import SimpleNamespace
+    from common.bots import BOTS, load_bot
+    from common.state_store import StateStore
+
+    morning = datetime(2026, 10, 19, 9, 27)
+    assert run_slot(2, morning) == "2026-10-19#0" and run_slot(2, morning.replace(hour=21)) == "2026-10-19#1"
+    assert run_slot(None, morning) == "2026-10-19"
+
+    for bot in BOTS:
+        module = load_bot(bot)
+        saved = {name: getattr(module, name) for name in ("SCRIPT_DIR", "POSTS_DIR", "state_store")}
+        with tempfile.TemporaryDirectory() as tmp:
+            module.SCRIPT_DIR, module.POSTS_DIR = tmp, os.path.join(tmp, "_posts")
+            module.state_store = StateStore(tmp, module.DEFAULT_STATE, snapshot_name=module.STATE_FILE)
+            try:
+                # 봇의 상태 갱신 코드로 이번 칸의 발행을 흉내 냅니다.
+                state = module.load_state()
+                slot = run_slot(module.MAX_RUNS_PER_DAY)
+                if hasattr(module, "extract_metadata"):
+                    metadata = SimpleNamespace(current_year=state['next_year'], current_topic=state['next_topic'],
+                                               next_topic="다음 주제", next_year=state['next_year'] + 1)
+                    state = module.extract_metadata(SimpleNamespace(metadata=metadata), state, slot)
+                    target, generate = state['day_count'], "generate_or_take_draft"
+                else:
+                    module.advance_state(state, "본문", {"plot_summary": "요약", "story_bible": state['스토리 바이블']}, slot)
+                    target, generate = state['day_count'] + 1, "publish_next_day"
+                module.save_state(state)
+
+                # 같은 칸의 재실행은 모델을 부르기 전에 건너뛰어야 합니다.
+                def must_not_generate(*args, **kwargs):
+                    raise AssertionError(f"{bot}: 중복 실행이 생성을 시작했습니다")
+                original = getattr(module, generate)
+                setattr(module, generate, must_not_generate)
+                output = io.StringIO()
+                try:
+                    with contextlib.redirect_stdout(output):
+                        module.main()
+                finally:
+                    setattr(module, generate, original)
+                assert "건너뜀" in output.getvalue() and "last_run_key" in output.getvalue(), (bot, output.getvalue())
+
+                # 다음 cron 칸의 실행은 중복이 아닙니다.
+                other = run_slot(module.MAX_RUNS_PER_DAY, datetime.now() + timedelta(hours=24 // module.MAX_RUNS_PER_DAY))
+                assert find_duplicate_run(module.POSTS_DIR, target, datetime.now().strftime('%Y-%m-%d'), [],
+                                          last_run_key=state['last_run_key'], slot=other) is None, bot
+            finally:
+                for name, value in saved.items():
+                    setattr(module, name, value)
+        print(f"✅ [{bot}] 같은 칸의 재실행을 건너뜁니다 ({state['last_run_key']})")
+    print("✅ run_guard self-test passed")
+
+
+if __name__ == "__main__":
+    if "--self-test" in sys.argv[1:]:
+        self_test()
@@ -0,0 +1,334 @@
+"""
+밀린 실행을 따라잡는 스케줄러.
+
+세 워크플로는 각자 cron 으로 돌면서 GEMINI_API_KEY 하나를 함께 씁니다. 실행이 빠지면 그날 포스트는 그냥 사라지고,
+동시에 돌면 같은 RPM/TPM 한도에 부딪힙니다. 이 스케줄러는
+
+1. 봇마다 마지막 포스트 날짜부터 오늘까지 하루 MAX_RUNS_PER_DAY 개 기준으로 빠진 실행을 계산하고
+2. 우선순위(PRIORITY)와 가장 오래 밀린 날짜 순으로, 봇 간에는 최대 --concurrency 개를 동시에, 한 봇 안에서는 순서대로 실행하며
+3. 모든 모델 호출을 모델별 RPM/TPM 토큰 버킷(common/rate_limit.py)에 통과시켜 429 가 연달아 나지 않게 하고
+4. 실행 기록을 scripts/run_data/scheduler_progress.json 에 저장합니다.
+
+따라잡기 실행은 모두 오늘 날짜의 포스트가 되므로 일일 실행 횟수 검사를 건너뜁니다(force).
+봇 워크플로와 겹치지 않도록 cron 사이 시간이나 같은 concurrency 그룹 안에서 실행하세요.
+
+usage: python -m common.scheduler [--dry-run] [--max-runs N] [--concurrency N] [bot ...] | --self-test
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import date, datetime, timedelta
+
+from common.bots import BOTS, load_bot
+from common.model_router import set_rate_limiter
+from common.posts import SHARED_RUN_DATA_DIR, list_posts
+from common.rate_limit import QuotaLimiter
+from common.state_store import atomic_write_text
+
+PROGRESS_PATH = os.path.join(SHARED_RUN_DATA_DIR, "scheduler_progress.json")
+# 값이 작을수록 먼저 실행합니다.
+PRIORITY = {"cs_history": 0, "ai_history": 1, "ghost_in_the_legacy": 2}
+MAX_CATCHUP_RUNS = int(os.environ.get("BOT_CATCHUP_MAX_RUNS", "6"))
+CONCURRENCY = int(os.environ.get("BOT_SCHEDULER_CONCURRENCY", "2"))
+MAX_RECENT_RUNS = 200
+
+
+def _post_dates(bot):
+    dates = []
+    for path in list_posts(bot):
+        try:
+            dates.append(date.fromisoformat(os.path.basename(path)[:10]))
+        except ValueError:
+            continue
+    return dates
+
+
+def owed_runs(bot, runs_per_day, today):
+    """마지막 포스트 날짜부터 오늘까지 채워지지 않은 실행 슬롯의 날짜 목록 (오래된 순)"""
+    dates = _post_dates(bot)
+    if not dates:
+        return [today] * runs_per_day
+    counts = {}
+    for d in dates:
+        counts[d] = counts.get(d, 0) + 1
+    owed = []
+    day = max(dates)
+    while day <= today:
+        owed.extend([day] * max(0, runs_per_day - counts.get(day, 0)))
+        day += timedelta(days=1)
+    return owed
+
+
+def build_plan(bots, today, max_runs=MAX_CATCHUP_RUNS):
+    plan = []
+    for bot in bots:
+        module = load_bot(bot)
+        state = module.load_state()
+        finished = hasattr(module, "is_finished") and module.is_finished(state)
+        owed = [] if finished else owed_runs(bot, getattr(module, "MAX_RUNS_PER_DAY", 1), today)
+        plan.append({
+            "bot": bot,
+            "priority": PRIORITY.get(bot, len(PRIORITY)),
+            "finished": finished,
+            "owed": len(owed),
+            "oldest": owed[0].isoformat() if owed else None,
+            "runs": min(len(owed), max_runs),
+        })
+    plan.sort(key=lambda p: (p["priority"], p["oldest"] or "9999"))
+    return plan
+
+
+class Progress:
+    def __init__(self, path=PROGRESS_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {"runs": []}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def save_plan(self, plan):
+        with self.lock:
+            self.data["plan"] = plan
+            self.data["updated"] = datetime.now().isoformat(timespec="seconds")
+            self._write()
+
+    def record(self, run):
+        with self.lock:
+            self.data["runs"] = (self.data.get("runs", []) + [run])[-MAX_RECENT_RUNS:]
+            self.data["updated"] = datetime.now().isoformat(timespec="seconds")
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=2))
+
+
+def run_bot_once(bot):
+    """봇을 한 번 실행하고 (발행 여부, 오류) 를 반환합니다."""
+    module = load_bot(bot)
+    before = module.load_state()["day_count"]
+    try:
+        module.main(force=True)
+    except BaseException as e:  # load_models 의 sys.exit 포함
+        traceback.print_exc()
+        return False, f"{type(e).__name__}: {e}"
+    return module.load_state()["day_count"] > before, None
+
+
+def run_plan(plan, progress, concurrency=CONCURRENCY):
+    pending = queue.Queue()
+    for entry in plan:
+        if entry["runs"]:
+            pending.put(entry)
+
+    def worker():
+        while True:
+            try:
+                entry = pending.get_nowait()
+            except queue.Empty:
+                return
+            bot = entry["bot"]
+            for n in range(entry["runs"]):
+                started = time.time()
+                print(f"⏩ [{bot}] 따라잡기 실행 {n + 1}/{entry['runs']} (밀린 실행 {entry['owed']}개)")
+                published, error = run_bot_once(bot)
+                progress.record({
+                    "bot": bot, "started": datetime.fromtimestamp(started).isoformat(timespec="seconds"),
+                    "seconds": round(time.time() - started, 1), "published": published, "error": error,
+                })
+                if error or not published:
+                    # 실패하거나 발행할 것이 없으면(연재 종료, 빈 응답) 이 봇은 다음 스케줄러 실행으로 넘깁니다.
+                    print(f"⏹️ [{bot}] 중단: {error or '발행된 포스트 없음'}")
+                    break
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+class _FakeBot:
+    """자체 검사용 봇: main() 마다 공용 제한을 거쳐 대역 모델을 한 번 부르고 day_count 를 올립니다."""
+    MAX_RUNS_PER_DAY = 2
+
+    def __init__(self, name, client, run_data_dir, tracker):
+        from common.model_router import ModelRouter, route
+        self.name = name
+        self.client = client
+        self.tracker = tracker
+        self.state = {"day_count": 0}
+        self.router = ModelRouter({"write": [route("fast")]}, run_data_dir)
+
+    def load_state(self):
+        return dict(self.state)
+
+    def main(self, force=False):
+        from common.fake_genai import FakeConfig
+        self.tracker.enter(self.name)
+        try:
+            self.router.generate(self.client, "write", f"{self.name} day {self.state['day_count'] + 1}",
+                                 FakeConfig(system_instruction="fake", tools=[]))
+            self.state["day_count"] += 1
+        finally:
+            self.tracker.exit(self.name)
+
+
+class _RunTracker:
+    """main() 의 시작 순서와 동시에 실행 중인 봇 수를 기록합니다."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.order = []
+        self.active = set()
+        self.max_active = 0
+        self.overlapped = []
+
+    def enter(self, name):
+        with self.lock:
+            if name in self.active:
+                self.overlapped.append(name)
+            self.order.append(name)
+            self.active.add(name)
+            self.max_active = max(self.max_active, len(self.active))
+
+    def exit(self, name):
+        with self.lock:
+            self.active.discard(name)
+
+
+def _self_test_plan():
+    """대역 봇 세 개로 우선순위 순서, 동시 실행 수 제한, 공용 rate limiter, 한 봇의 실패가 다른 봇을 막지 않는지 확인합니다."""
+    import contextlib
+    import io
+    import tempfile
+    from common import bots as bot_registry
+    from common.fake_genai import FakeAPIError, FakeClient
+    from common.model_router import TIERS
+
+    names = ["_fake_c", "_fake_b", "_fake_a"]
+    priority = {"_fake_a": 0, "_fake_b": 1, "_fake_c": 2}
+    model = TIERS["fast"]
+    # 여기 있는 봇의 다음 호출은 429 로 실패합니다. 같은 키를 쓰는 다른 봇도 retryDelay 동안 멈춰야 합니다.
+    rate_limited = set()
+
+    def respond(model, contents, config):
+        bot = contents.split()[0]
+        if bot in rate_limited:
+            rate_limited.discard(bot)
+            raise FakeAPIError("429 RESOURCE_EXHAUSTED retryDelay: '0.3s'")
+        return "ok"
+
+    saved_priority = dict(PRIORITY)
+    PRIORITY.update(priority)
+    try:
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()), \
+                contextlib.redirect_stderr(io.StringIO()):
+            client = FakeClient(respond, latency=0.05)
+
+            # 1) 동시 실행 1개: 우선순위 순서대로, 봇마다 밀린 실행(하루 2개)을 이어서 실행합니다.
+            tracker = _RunTracker()
+            bot_registry._modules.update({name: _FakeBot(name, client, tmp, tracker) for name in names})
+            plan = build_plan(names, date.today(), max_runs=2)
+            assert [entry["bot"] for entry in plan] == ["_fake_a", "_fake_b", "_fake_c"], plan
+            set_rate_limiter(QuotaLimiter({model: (1000, 1_000_000)}))
+            run_plan(plan, Progress(os.path.join(tmp, "progress1.json")), concurrency=1)
+            assert tracker.order == ["_fake_a", "_fake_a", "_fake_b", "_fake_b", "_fake_c", "_fake_c"], tracker.order
+            assert tracker.max_active == 1
+
+            # 2) 동시 실행 2개 + 공용 limiter: _fake_b 가 429 로 실패해도 나머지는 모두 발행하고, 429 의 멈춤은 함께 따릅니다.
+            rate_limited.add("_fake_b")
+            tracker = _RunTracker()
+            bots = {name: _FakeBot(name, client, tmp, tracker) for name in names}
+            bot_registry._modules.update(bots)
+            limiter = QuotaLimiter({model: (1000, 1_000_000)})
+            set_rate_limiter(limiter)
+            progress = Progress(os.path.join(tmp, "progress2.json"))
+            started = time.monotonic()
+            run_plan(build_plan(names, date.today(), max_runs=2), progress, concurrency=2)
+            elapsed = time.monotonic() - started
+    finally:
+        PRIORITY.clear()
+        PRIORITY.update(saved_priority)
+        set_rate_limiter(None)
+        for name in names:
+            bot_registry._modules.pop(name, None)
+
+    assert tracker.max_active == 2 and not tracker.overlapped, (tracker.max_active, tracker.overlapped)
+    # 먼저 우선순위가 높은 두 봇이 시작하고, _fake_c 는 자리가 난 뒤(_fake_b 가 실패로 멈춘 뒤)에 시작합니다.
+    assert set(tracker.order[:2]) == {"_fake_a", "_fake_b"} and "_fake_c" not in tracker.order[:2], tracker.order
+    runs = progress.data["runs"]
+    failed = [run for run in runs if run["error"]]
+    assert len(failed) == 1 and failed[0]["bot"] == "_fake_b" and "429" in failed[0]["error"], runs
+    assert bots["_fake_a"].state["day_count"] == 2 and bots["_fake_c"].state["day_count"] == 2
+    assert bots["_fake_b"].state["day_count"] == 0
+    stats = limiter.stats[model]
+    assert stats["calls"] == 5 and stats["throttled"] == 1, stats
+    # 429 이후의 호출은 retryDelay(0.3s, 지터 없음)가 끝날 때까지 기다렸습니다.
+    assert stats["waited"] >= 0.25 and elapsed >= 0.3, (stats, elapsed)
+    print(f"✅ 대역 봇: 순서 {' → '.join(tracker.order)}, 최대 동시 {tracker.max_active}, "
+          f"429 대기 {stats['waited']:.2f}s, 실패 격리 확인")
+
+
+def self_test():
+    """
+    대역 봇으로 run_plan 의 순서/동시 실행/공용 rate limiter/실패 격리를 확인하고,
+    스케줄러가 실제로 쓰는 경로(load_bot → run_bot_once → 봇 코드)로 각 봇의 load_models() 까지 닿는지 확인합니다.
+    """
+    import importlib.util
+    _self_test_plan()
+    has_pydantic = importlib.util.find_spec("pydantic") is not None
+    for bot in BOTS:
+        module = load_bot(bot)
+        if not hasattr(module, "load_models"):
+            continue
+        # 봇 폴더의 *_models 모듈이 스케줄러 프로세스에서도 보여야 합니다.
+        models = f"{BOTS[bot].removesuffix('_bot')}_models"
+        assert importlib.util.find_spec(models), f"{bot}: {models} 를 찾을 수 없습니다"
+        if not has_pydantic:
+            print(f"⏭️ [{bot}] pydantic 이 없어 load_models() 호출은 건너뜁니다 ({models} 확인됨)")
+            continue
+        loaded = []
+        original = module.main
+        module.main = lambda force=False: loaded.append(module.load_models())
+        try:
+            published, error = run_bot_once(bot)
+        finally:
+            module.main = original
+        assert error is None and loaded and not published, (bot, error)
+        print(f"✅ [{bot}] load_models() → {loaded[0].__name__}")
+    print("✅ scheduler self-test passed")
+
+
+def main(args):
+    if "--self-test" in args:
+        self_test()
+        return 0
+    dry_run = "--dry-run" in args
+    max_runs = int(args[args.index("--max-runs") + 1]) if "--max-runs" in args else MAX_CATCHUP_RUNS
+    concurrency = int(args[args.index("--concurrency") + 1]) if "--concurrency" in args else CONCURRENCY
+    bots = [a for a in args if a in BOTS] or list(BOTS)
+
+    plan = build_plan(bots, date.today(), max_runs)
+    for entry in plan:
+        status = "연재 종료" if entry["finished"] else f"밀린 실행 {entry['owed']}개 (가장 오래된 날 {entry['oldest']}), 이번에 {entry['runs']}개"
+        print(f"📋 [{entry['bot']}] 우선순위 {entry['priority']}: {status}")
+    if dry_run:
+        return 0
+
+    progress = Progress()
+    progress.save_plan(plan)
+    limiter = QuotaLimiter()
+    set_rate_limiter(limiter)
+    run_plan(plan, progress, concurrency)
+    limiter.report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,212 @@
+"""
+미리 만든(prebuilt) 검색 색인.
+
+search_full_content 설정에서는 방문자 브라우저가 모든 포스트의 전문을 내려받아 색인을 직접 만듭니다.
+여기서는 발행 단계에서 점수까지 계산한 역색인을 카테고리별 샤드(assets/js/lunr/prebuilt/<category>.json)로 저장하고,
+검색 페이지(assets/js/lunr/lunr-prebuilt.js)는 방문자가 처음 검색어를 입력할 때 샤드를 내려받아 점수를 더하기만 합니다.
+검색하지 않는 페이지 방문은 색인을 받지 않습니다.
+
+* 대상: 연재 포스트와, lunr.search_within_pages 처럼 제목이 있는 페이지(_pages/, 저장소 루트의 .md/.html, search: false 제외).
+  페이지는 'pages' 샤드에 들어갑니다.
+* 토큰화: 소문자화 후 WORD_CHARS 밖의 문자로 나누고, 한글 부분은 음절 bigram 으로만 색인합니다(한 음절 단어는 그대로).
+  조사가 붙은 '신경망은' 과 검색어 '신경망' 이 bigram 으로 만나고, 어절마다 생기는 희귀 토큰이 색인을 불리지 않습니다.
+  문자 범위(WORD_CHARS, HANGUL_CHARS)는 manifest.json 의 tokenizer 로 내보내 JS 가 같은 정의로 정규식을 만듭니다.
+* 형식: {"docs": [[제목, URL, 요약], ...], "terms": {단어: [문서 번호, 점수, 문서 번호, 점수, ...]}}.
+  점수는 필드별 BM25(k1=1.2, b=0.75, 제목 boost 10)의 합 × 100 을 반올림한 정수입니다.
+* 증분 갱신: 문서별 토큰 빈도를 scripts/run_data/search_index_cache.json 에 캐시하고,
+  새 문서만 토큰화한 뒤 그 문서가 속한 샤드만 캐시로부터 다시 만듭니다.
+
+usage: python -m common.search_index [--rebuild] [--report] [post.md ...]
+"""
+import glob
+import gzip
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+from collections import Counter
+
+from common.posts import (REPO_ROOT, SHARED_RUN_DATA_DIR, excerpt, list_posts, read_post, relative_path,
+                          split_front_matter, strip_citations)
+from common.state_store import atomic_write_text
+
+FORMAT_VERSION = 2
+SHARD_DIR = os.path.join(REPO_ROOT, "assets", "js", "lunr", "prebuilt")
+CACHE_PATH = os.path.join(SHARED_RUN_DATA_DIR, "search_index_cache.json")
+PAGES_CATEGORY = "pages"
+PAGE_GLOBS = ["_pages/*.md", "_pages/*.html", "*.md", "*.html"]
+FIELDS = ["title", "body"]
+FIELD_BOOST = {"title": 10, "body": 1}
+K1 = 1.2
+B = 0.75
+SCORE_SCALE = 100
+
+# 토큰을 이루는 문자 (소문자화 후). Python 과 JS 가 같은 뜻으로 읽도록 BMP 범위만 씁니다.
+WORD_CHARS = "0-9a-z_\u00c0-\u024f\u0370-\u03ff\u0400-\u04ff\u3040-\u30ff\u4e00-\u9fff\uac00-\ud7a3"
+HANGUL_CHARS = "\uac00-\ud7a3"
+
+_HANGUL_RUN = re.compile(f"[{HANGUL_CHARS}]+")
+_SPLIT = re.compile(f"[^{WORD_CHARS}]+")
+_MARKDOWN = re.compile(r"!?\[([^\]]*)\]\([^)]*\)|[#*_`>|]")
+_LIQUID = re.compile(r"{%.*?%}|{{.*?}}", re.DOTALL)
+_HTML_TAG = re.compile(r"<[^>]+>")
+
+
+def tokenize(text):
+    tokens = []
+    for word in _SPLIT.split(text.lower()):
+        word = word.strip("_")
+        if not word:
+            continue
+        rest = _HANGUL_RUN.sub(" ", word).split()
+        tokens.extend(part.strip("_") for part in rest if part.strip("_"))
+        for run in _HANGUL_RUN.findall(word):
+            if len(run) == 1:
+                tokens.append(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def list_pages():
+    """lunr-store.js 의 search_within_pages 처럼 제목이 있고 search: false 가 아닌 페이지"""
+    paths = set()
+    for pattern in PAGE_GLOBS:
+        paths.update(glob.glob(os.path.join(REPO_ROOT, pattern)))
+    pages = []
+    for path in sorted(paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            front, _ = split_front_matter(f.read())
+        if front.get("title") and str(front.get("search", "")).lower() != "false":
+            pages.append(path)
+    return pages
+
+
+def read_page(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        front, body = split_front_matter(f.read())
+    body = _HTML_TAG.sub(" ", _LIQUID.sub(" ", body))
+    slug = os.path.splitext(os.path.basename(path))[0]
+    return {"category": PAGES_CATEGORY, "title": front["title"], "body": body,
+            "url": front.get("permalink") or f"/{slug}/"}
+
+
+def _document_entry(doc, digest):
+    body = _MARKDOWN.sub(lambda m: m.group(1) or " ", strip_citations(doc["body"]))
+    fields = {"title": tokenize(doc["title"]), "body": tokenize(body)}
+    return {
+        "hash": digest,
+        "category": doc["category"],
+        "store": [doc["title"], doc["url"], excerpt(doc["body"], 160)],
+        "tf": {name: dict(Counter(tokens)) for name, tokens in fields.items()},
+        "length": {name: len(tokens) for name, tokens in fields.items()},
+    }
+
+
+def build_shard(entries):
+    """entries: 문서 번호 순서의 캐시 항목 목록 → {"docs", "terms"}"""
+    n_docs = len(entries)
+    doc_freq = Counter(term for entry in entries for term in set().union(*(entry["tf"][f] for f in FIELDS)))
+    idf = {term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+    average_length = {field: (sum(e["length"][field] for e in entries) / n_docs) if n_docs else 0 for field in FIELDS}
+
+    postings = {}
+    for number, entry in enumerate(entries):
+        scores = Counter()
+        for field in FIELDS:
+            length = entry["length"][field]
+            norm = (1 - B + B * length / average_length[field]) if average_length[field] else 1
+            for term, tf in entry["tf"][field].items():
+                scores[term] += idf[term] * (K1 + 1) * tf / (K1 * norm + tf) * FIELD_BOOST[field]
+        for term, score in scores.items():
+            postings.setdefault(term, []).extend([number, max(1, round(score * SCORE_SCALE))])
+    return {"docs": [entry["store"] for entry in entries], "terms": dict(sorted(postings.items()))}
+
+
+def load_cache():
+    if not os.path.exists(CACHE_PATH):
+        return {}
+    with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+        cache = json.load(f)
+    # 예전 형식(store 가 dict)의 캐시는 다시 만듭니다.
+    if any(not isinstance(entry.get("store"), list) for entry in cache.values()):
+        return {}
+    return cache
+
+
+def write_shard(category, cache):
+    paths = sorted(path for path, entry in cache.items() if entry["category"] == category)
+    target = os.path.join(SHARD_DIR, f"{category}.json")
+    if not paths:
+        if os.path.exists(target):
+            os.remove(target)
+        return 0
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    atomic_write_text(target, json.dumps(build_shard([cache[path] for path in paths]), ensure_ascii=False, separators=(",", ":")))
+    return len(paths)
+
+
+def write_manifest(cache):
+    counts = Counter(entry["category"] for entry in cache.values())
+    manifest = {
+        "version": FORMAT_VERSION,
+        "tokenizer": {"word": WORD_CHARS, "hangul": HANGUL_CHARS},
+        "shards": [{"category": c, "docs": n} for c, n in sorted(counts.items())],
+    }
+    atomic_write_text(os.path.join(SHARD_DIR, "manifest.json"), json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+def update(paths=None, rebuild=False):
+    """paths 의 문서를 색인에 반영하고 바뀐 샤드만 다시 씁니다. 갱신된 카테고리 목록을 반환합니다."""
+    cache = {} if rebuild else load_cache()
+    posts, pages = list_posts(), list_pages()
+    existing = {relative_path(p) for p in posts + pages}
+    page_refs = {relative_path(p) for p in pages}
+    dirty = set()
+
+    # 캐시를 새로 만들 때는 전체를, 아니면 주어진 포스트와 (작은) 페이지 목록을 봅니다.
+    for path in (posts + pages if not cache or paths is None else list(paths) + pages):
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        ref = relative_path(path)
+        if ref in cache and cache[ref]["hash"] == digest:
+            continue
+        doc = read_page(path) if ref in page_refs else read_post(path)
+        if ref in cache:
+            dirty.add(cache[ref]["category"])
+        cache[ref] = _document_entry(doc, digest)
+        dirty.add(doc["category"])
+
+    for ref in [ref for ref in cache if ref not in existing]:
+        dirty.add(cache.pop(ref)["category"])
+
+    for category in sorted(dirty):
+        write_shard(category, cache)
+    if dirty or rebuild:
+        write_manifest(cache)
+    os.makedirs(SHARED_RUN_DATA_DIR, exist_ok=True)
+    atomic_write_text(CACHE_PATH, json.dumps(cache, ensure_ascii=False, separators=(",", ":")))
+    return sorted(dirty)
+
+
+def report():
+    """샤드 크기(원본/gzip)를 검색 대상 원문 크기와 비교합니다."""
+    shard_raw = shard_gz = 0
+    for path in sorted(glob.glob(os.path.join(SHARD_DIR, "*.json"))):
+        with open(path, 'rb') as f:
+            data = f.read()
+        shard_raw, shard_gz = shard_raw + len(data), shard_gz + len(gzip.compress(data))
+        print(f"   {os.path.basename(path):<28} {len(data) / 1024:8.1f} KB  gzip {len(gzip.compress(data)) / 1024:7.1f} KB")
+    source = b"".join(open(p, 'rb').read() for p in list_posts() + list_pages())
+    print(f"🔎 샤드 합계 {shard_raw / 1024:.1f} KB (gzip {shard_gz / 1024:.1f} KB), "
+          f"원문 {len(source) / 1024:.1f} KB (gzip {len(gzip.compress(source)) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--report" in args:
+        report()
+        sys.exit(0)
+    shards = update([a for a in args if not a.startswith("--")] or None, rebuild="--rebuild" in args)
+    print(f"🔎 검색 색인 샤드 갱신: {', '.join(shards) if shards else '변경 없음'}")
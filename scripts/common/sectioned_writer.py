@@ -0,0 +1,232 @@
+"""
+역사 봇 작성 단계의 섹션 분할 모드.
+
+기본(single) 모드는 포스트 전체(제목/인사, 키워드, Deep Dive, 현대와의 연결, 예고)를 한 번의 긴 생성으로 받습니다.
+BOT_WRITER_MODE=sections 이면 같은 조사 노트를 공유하는 작은 생성 요청 여러 개(도입부 + REQUIRED_SECTIONS)를 동시에 보내고,
+템플릿 순서대로 이어 붙입니다. 조사 노트는 cache_prefix 로 보내므로 컨텍스트 캐시가 있으면 한 번만 올라갑니다.
+
+* 일관성: metadata 는 모델이 쓰지 않고 오늘 주제와 플래너 결정으로 채웁니다. 이어 붙인 content 는 단일 모드와 같은
+  enforce_template(validate_content: 제목, 섹션 순서/길이, 키워드 섹션의 주제와 연도) 을 거치며,
+  실패한 섹션만 다시 요청하고 깨진 섹션이 많으면 단일 모드로 다시 씁니다.
+* 벤치마크: 두 모드 모두 실행마다 작성 단계의 벽시계 시간과 토큰 수를 run_data/write_benchmark.jsonl 에 남깁니다.
+  --report 는 봇별/모드별로 비교하고, --self-test 는 출력 길이에 비례해 느려지는 대역 모델로 두 모드를 비교합니다.
+
+usage: python -m common.sectioned_writer [--report [bot ...]] [--self-test]
+"""
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from common.post_template import REQUIRED_SECTIONS, extract_section, fix_title, section_template, splice_section
+from common.state_store import append_jsonl
+from common.tracing import tracer
+
+WRITER_MODE = os.environ.get("BOT_WRITER_MODE", "single")
+SECTION_WORKERS = int(os.environ.get("BOT_SECTION_WORKERS", "5"))
+BENCHMARK_FILE = "write_benchmark.jsonl"
+# 작성 단계에 속하는 라우팅 작업 (벤치마크 토큰 합계)
+WRITE_TASKS = ("write", "write_part", "section")
+INTRO = "intro"
+PARTS = [INTRO] + [prefix for prefix, _, _ in REQUIRED_SECTIONS]
+
+_FENCE = re.compile(r"^```[a-z]*\s*$", re.MULTILINE)
+_HEADER = re.compile(r"^## ", re.MULTILINE)
+
+
+def part_prompt(part, day_count, today):
+    """part 하나만 쓰도록 하는 요청. 조사 노트/맥락은 cache_prefix 로 앞에 붙습니다."""
+    if part == INTRO:
+        what = (f"ONLY the title line `Day {day_count}: {{Title}}` followed by the Engaging Opening Greeting "
+                f"(as the bot, welcoming the reader to Day {day_count}). Do NOT write any `##` section.")
+    else:
+        what = (f"ONLY the section that starts with the header line `{section_template(part)}` (fill in the placeholders), "
+                f"following the Markdown template.")
+    return f"""
+    **Task:** You are writing one part of the blog post for Day {day_count} about {today}. Other parts are written separately.
+    Write {what}
+    Output just that part as Markdown in Korean. Do NOT output JSON or any other part.
+    """
+
+
+def write_parts(client, router, context, day_count, today, config, task="write_part", workers=SECTION_WORKERS):
+    """{part: 응답 텍스트 | None}. 실패한 part 는 None 이며, 이어 붙인 뒤 템플릿 검사에서 다시 요청됩니다."""
+    def write_part(part):
+        with tracer.span("write_part", part=part):
+            try:
+                response = router.generate(client, task, part_prompt(part, day_count, today), config, cache_prefix=context)
+            except Exception as e:
+                print(f"      (Sections: '{part}' failed: {str(e)[:200]})")
+                tracer.set(error=str(e)[:200])
+                return part, None
+            return part, response.text or ""
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(PARTS)))) as executor:
+        return dict(executor.map(tracer.bind(write_part), PARTS))
+
+
+def assemble(parts, day_count):
+    """part 응답들을 템플릿 순서로 이어 붙입니다. 응답에 섞인 코드 블록 표시와 다른 섹션은 버립니다."""
+    intro = _FENCE.sub("", parts.get(INTRO) or "").strip()
+    first_header = _HEADER.search(intro)
+    if first_header:
+        intro = intro[:first_header.start()].strip()
+    content = fix_title(intro, day_count) if intro else f"Day {day_count}:\n"
+    for prefix in PARTS[1:]:
+        section = extract_section(parts.get(prefix) or "", prefix)
+        if section:
+            content = splice_section(content, prefix, section)
+    return content
+
+
+# --- [Benchmark] ---
+def record_benchmark(run_data_dir, mode, day_count, seconds, decisions):
+    """작성 단계 하나의 기록. decisions 는 그 단계 동안 쌓인 라우팅 기록입니다."""
+    ok = [d for d in decisions if d["task"] in WRITE_TASKS and d["outcome"] == "ok"]
+    record = {
+        "ts": datetime.now().isoformat(timespec="seconds"), "mode": mode, "day": day_count, "seconds": round(seconds, 3),
+        "calls": sum(1 for d in decisions if d["task"] in WRITE_TASKS),
+        **{key: sum(d.get(key) or 0 for d in ok) for key in ("prompt_tokens", "output_tokens", "thinking_tokens", "cached_tokens")},
+    }
+    append_jsonl(os.path.join(run_data_dir, BENCHMARK_FILE), record)
+    print(f"      (Writer [{mode}]: {seconds:.1f}s, {record['calls']} calls, "
+          f"output={record['output_tokens']} thinking={record['thinking_tokens']})")
+    return record
+
+
+def load_benchmark(run_data_dir):
+    path = os.path.join(run_data_dir, BENCHMARK_FILE)
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _median(values):
+    values = sorted(values)
+    if not values:
+        return 0
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+
+def summarize(records):
+    """{mode: {"runs", "seconds" (중앙값), "calls", "prompt_tokens", "output_tokens", "thinking_tokens" (평균)}}"""
+    summary = {}
+    for mode in sorted({r["mode"] for r in records}):
+        rows = [r for r in records if r["mode"] == mode]
+        summary[mode] = {"runs": len(rows), "seconds": _median([r["seconds"] for r in rows])}
+        for key in ("calls", "prompt_tokens", "output_tokens", "thinking_tokens"):
+            summary[mode][key] = sum(r.get(key) or 0 for r in rows) / len(rows)
+    return summary
+
+
+def print_summary(label, summary):
+    print(f"🧪 {label}")
+    for mode, row in summary.items():
+        print(f"   {mode:<9} runs {row['runs']:>3}  median {row['seconds']:7.1f}s  calls {row['calls']:4.1f}  "
+              f"prompt {row['prompt_tokens']:8.0f}  output {row['output_tokens']:7.0f}  thinking {row['thinking_tokens']:7.0f}")
+    if "single" in summary and "sections" in summary and summary["single"]["seconds"]:
+        ratio = summary["sections"]["seconds"] / summary["single"]["seconds"]
+        print(f"   sections / single wall time: {ratio:.2f}x")
+
+
+def report(bots):
+    from common.bots import load_bot
+    for bot in bots:
+        records = load_benchmark(load_bot(bot).RUN_DATA_DIR)
+        if records:
+            print_summary(f"{bot} 작성 단계 ({len(records)}회)", summarize(records))
+        else:
+            print(f"🧪 {bot}: 기록 없음")
+
+
+def self_test():
+    """출력 토큰에 비례해 느려지는 대역 모델로 두 모드의 벽시계 시간과 토큰 수를 비교합니다."""
+    import tempfile
+    from common.context_cache import ContextCache
+    from common.fake_genai import FakeClient, FakeConfig, _get, count_tokens
+    from common.model_router import ModelRouter, route
+    from common.post_template import markdown_only, validate_content
+
+    seconds_per_token = 0.0004
+    bodies = {prefix: f"{section_template(prefix).replace('{Topic Name}', '퍼셉트론').replace('{Modern Analogy}', '딥러닝')}\n"
+                      + ("1958년 프랭크 로젠블랫의 퍼셉트론은 학습하는 기계였습니다. " * (min_chars // 20 + 2))
+              for prefix, _, min_chars in REQUIRED_SECTIONS}
+    intro = "Day 7: 퍼셉트론\n안녕하세요! AI 인공지능 역사 봇입니다. 7일차 여정에 오신 것을 환영합니다. 오늘은 퍼셉트론을 소개합니다."
+
+    writer_prompt = ("writer prompt " * 50 + "\n**Output Format:**\nYou MUST output a valid JSON object.\n\n"
+                     "**Markdown Template for 'content':**\nDay {day_count}: {Title}\n")
+
+    def system_instruction(config):
+        # 캐시를 쓰면 지시문은 요청이 아니라 캐시에 들어 있습니다.
+        name = _get(config, "cached_content")
+        return _get(client.caches.entries[name].config if name else config, "system_instruction") or ""
+
+    def respond(model, contents, config):
+        prompt = contents if isinstance(contents, str) else str(contents)
+        if "one part of the blog post" in prompt:
+            part = next((p for p in PARTS[1:] if p in prompt), INTRO)
+            text = intro if part == INTRO else bodies[part]
+            # 실제 모델처럼 지시문이 JSON 을 요구하면 JSON 으로 감쌉니다.
+            if "valid JSON object" in system_instruction(config):
+                text = json.dumps({"content": text}, ensure_ascii=False)
+        else:
+            content = "\n\n".join([intro] + [bodies[p] for p in PARTS[1:]])
+            text = json.dumps({"content": content}, ensure_ascii=False)
+        time.sleep(count_tokens(text) * seconds_per_token)
+        return text
+
+    with tempfile.TemporaryDirectory() as tmp:
+        routes = {"write": [route("deep")], "write_part": [route("standard")]}
+        client = FakeClient(respond, min_cache_tokens=0)
+        cache = ContextCache(os.path.join(tmp, "cache.json"), enabled=True)
+        config = FakeConfig(system_instruction=writer_prompt)
+        part_config = FakeConfig(system_instruction=markdown_only(writer_prompt))
+        context = "research notes " * 400
+
+        for mode in ("single", "sections", "single", "sections"):
+            router = ModelRouter(routes, tmp, context_cache=cache)
+            started = time.perf_counter()
+            if mode == "single":
+                content = json.loads(router.generate(client, "write", context + "write the post", config).text)["content"]
+            else:
+                content = assemble(write_parts(client, router, context, 7, "퍼셉트론 (1958)", part_config), 7)
+            record_benchmark(tmp, mode, 7, time.perf_counter() - started, router.decisions)
+            issues = validate_content(content, 7, {"current_year": 1958})
+            assert not issues, (mode, issues)
+        summary = summarize(load_benchmark(tmp))
+        print_summary("self-test (대역 모델)", summary)
+        assert summary["sections"]["calls"] == len(PARTS) and summary["single"]["calls"] == 1
+        assert summary["sections"]["seconds"] < summary["single"]["seconds"]
+        # 섹션 요청들은 조사 노트 캐시 하나를 같이 씁니다. 단일 모드의 짧은 지시문은 최소 크기 미달이라 캐시하지 않습니다.
+        assert sum(1 for call in client.calls if call[0] == "caches.create") == 1
+        assert cache.events["too_small"] == 2, cache.events
+
+        # 작성자 지시문을 그대로 쓰면 JSON 으로 감싼 응답에서 섹션을 찾지 못합니다.
+        router = ModelRouter(routes, tmp, context_cache=cache)
+        content = assemble(write_parts(client, router, context, 7, "퍼셉트론 (1958)", config), 7)
+        assert not any(prefix in content for prefix in PARTS[1:])
+
+        # 실패한 part 는 빠지고, 나머지는 템플릿 순서를 지킵니다.
+        parts = {INTRO: intro, PARTS[2]: bodies[PARTS[2]], PARTS[1]: "```markdown\n" + bodies[PARTS[1]] + "\n```", PARTS[3]: None}
+        content = assemble(parts, 7)
+        assert content.index(PARTS[1]) < content.index(PARTS[2]) and PARTS[3] not in content and "```" not in content
+    print("✅ sectioned_writer self-test passed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--self-test" in args:
+        self_test()
+    else:
+        report([a for a in args if not a.startswith("--")] or ["ai_history", "cs_history"])
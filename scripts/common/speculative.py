@@ -0,0 +1,75 @@
+"""
+다음 날 포스트 미리 생성(speculative pre-generation).
+
+플래너가 next_topic/next_year 를 하루 먼저 정하므로, 오늘 발행을 마친 뒤 내일(Day N+1)의 조사와 초안을
+drafts/day<N+1>.json 에 만들어 둘 수 있습니다. 초안에는 입력(상태, 프롬프트, 모델 라우팅)의 지문이 함께 저장되고,
+다음 cron 실행은 지문이 같으면 모델 호출 없이 곧바로 발행합니다. 입력이 바뀌었거나 초안이 오래되었으면 버리고 새로 생성합니다.
+
+BOT_SPECULATIVE=1 일 때만 미리 생성합니다. 저장된 초안의 사용 여부는 설정과 관계없이 지문으로 판단합니다.
+"""
+import hashlib
+import json
+import os
+import time
+
+from common.model_router import TIERS
+from common.state_store import atomic_write_text
+
+SPECULATIVE_ENABLED = os.environ.get("BOT_SPECULATIVE", "0") == "1"
+# 조사 결과가 너무 오래되지 않도록 (cron 간격 12시간 + 실패/지연 여유)
+DRAFT_MAX_AGE_SECONDS = int(os.environ.get("BOT_DRAFT_MAX_AGE_HOURS", "48")) * 3600
+DRAFT_DIR = "drafts"
+
+
+def fingerprint(state, prompts, routes):
+    """초안을 만든 입력의 지문. state 는 생성에 쓰이는 키만 넘깁니다."""
+    payload = {"state": state, "prompts": prompts, "routes": routes, "tiers": TIERS}
+    encoded = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class DraftStore:
+    def __init__(self, bot_dir, max_age=DRAFT_MAX_AGE_SECONDS):
+        self.directory = os.path.join(bot_dir, DRAFT_DIR)
+        self.max_age = max_age
+
+    def path_for(self, day):
+        return os.path.join(self.directory, f"day{day}.json")
+
+    def save(self, day, digest, result):
+        os.makedirs(self.directory, exist_ok=True)
+        draft = {"day": day, "fingerprint": digest, "created": time.time(), "result": result}
+        atomic_write_text(self.path_for(day), json.dumps(draft, ensure_ascii=False, separators=(",", ":")))
+
+    def take(self, day, digest):
+        """
+        지문이 맞는 초안이 있으면 결과를 돌려주고 초안 파일을 지웁니다.
+        맞지 않거나 오래된 초안도 지우고 None 을 돌려줍니다.
+        """
+        path = self.path_for(day)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                draft = json.load(f)
+        except (OSError, ValueError):
+            draft = {}
+        os.remove(path)
+
+        if draft.get("fingerprint") != digest:
+            print(f"♻️ [초안 폐기] Day {day} 초안의 입력이 바뀌었습니다 (지문 불일치). 새로 생성합니다.")
+            return None
+        age = time.time() - draft.get("created", 0)
+        if age > self.max_age:
+            print(f"♻️ [초안 폐기] Day {day} 초안이 {age / 3600:.0f}시간 전에 만들어졌습니다. 새로 생성합니다.")
+            return None
+        print(f"⚡ [초안 사용] Day {day} 초안이 유효합니다 ({age / 3600:.1f}시간 전 생성). 모델 호출 없이 발행합니다.")
+        return draft["result"]
+
+    def discard_except(self, day):
+        """day 이외의 남은 초안(이미 지나간 날짜)을 지웁니다."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and name != os.path.basename(self.path_for(day)):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,89 @@
+"""진입점 기동 비용 측정 (--profile-startup)"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+# 진입점 import + 상태 로드 + 종료 조건 검사까지 허용되는 시간 (ms)
+STARTUP_BUDGET_MS = float(os.environ.get("BOT_STARTUP_BUDGET_MS", "150"))
+
+_IMPORT_PROBE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+print((time.perf_counter() - t) * 1000)
+"""
+
+_ENTRY_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module} as bot
+state = bot.load_state()
+if hasattr(bot, "is_finished"):
+    bot.is_finished(state)
+elapsed = (time.perf_counter() - t) * 1000
+print(json.dumps({{"elapsed": elapsed, "loaded": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+
+def _run_probe(code, cwd):
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "error"
+    return result.stdout.strip().splitlines()[-1], None
+
+
+def measure_import(module, cwd):
+    """새 인터프리터에서 모듈 하나를 import 하는 데 걸린 시간(ms)을 측정합니다."""
+    out, err = _run_probe(_IMPORT_PROBE.format(module=module), cwd)
+    if err:
+        return None, err
+    return float(out), None
+
+
+def measure_entry(entry_module, heavy_modules, cwd):
+    """진입점 import, load_state(), is_finished() 까지의 시간, 그 사이에 로드된 무거운 모듈 목록을 반환합니다."""
+    out, err = _run_probe(_ENTRY_PROBE.format(module=entry_module, heavy=list(heavy_modules)), cwd)
+    if err:
+        return None, [], err
+    data = json.loads(out)
+    return data["elapsed"], data["loaded"], None
+
+
+def profile_startup(entry_module, heavy_modules, cwd, budget_ms=STARTUP_BUDGET_MS):
+    """
+    기동 비용 리포트를 출력합니다.
+    각 무거운 모듈은 독립된 프로세스에서 측정하므로 공유 의존성 비용은 모듈마다 중복 집계됩니다.
+    진입점 경로가 예산을 넘거나 무거운 모듈을 미리 로드하면 False 를 반환합니다.
+    """
+    started = time.perf_counter()
+    print(f"⏱️ Startup profile for '{entry_module}' (budget {budget_ms:.0f} ms)")
+
+    entry_ms, preloaded, err = measure_entry(entry_module, heavy_modules, cwd)
+    ok = True
+    if err:
+        print(f"   ❌ entry: {err}")
+        ok = False
+    else:
+        status = "OK" if entry_ms <= budget_ms else "OVER"
+        print(f"   entry + state check: {entry_ms:7.1f} ms  [{status}]")
+        if entry_ms > budget_ms:
+            ok = False
+        if preloaded:
+            print(f"   ❌ eagerly imported: {', '.join(preloaded)}")
+            ok = False
+
+    print("   lazy imports (paid only when a model call is needed):")
+    for module in heavy_modules:
+        cost, err = measure_import(module, cwd)
+        if err:
+            print(f"      {module:<24} unavailable ({err})")
+        else:
+            print(f"      {module:<24} {cost:8.1f} ms")
+
+    print(f"   (profiling took {(time.perf_counter() - started):.1f} s)")
+    return ok
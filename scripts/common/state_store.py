@@ -0,0 +1,177 @@
+"""
+bot_state.json 저장소.
+
+매 실행마다 전체 상태를 다시 쓰는 대신, 바뀐 키만 담은 델타를 bot_state.journal 에 한 줄씩 추가(fsync)합니다.
+현재 상태는 스냅샷(bot_state.json) 위에 저널을 재생해서 만듭니다.
+저널이 MAX_JOURNAL_BYTES 를 넘으면 스냅샷을 임시 파일 + rename 으로 원자적으로 교체하고 저널을 비웁니다.
+
+각 저널 항목은 자신이 적용될 스냅샷의 해시(base)를 기록하므로,
+스냅샷 교체 직후 저널을 비우기 전에 중단되더라도 이미 반영된 델타가 두 번 적용되지 않습니다.
+마지막 줄이 중간에 잘린 경우(쓰기 도중 중단)에는 그 줄만 버립니다.
+"""
+import copy
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+MAX_JOURNAL_BYTES = int(os.environ.get("BOT_STATE_MAX_JOURNAL_BYTES", str(256 * 1024)))
+# 실행 기록(routing_log.jsonl 등)은 이 크기를 넘으면 최근 절반만 남깁니다. 저장소에 커밋되므로 끝없이 자라지 않게 합니다.
+MAX_LOG_BYTES = int(os.environ.get("BOT_MAX_LOG_BYTES", str(512 * 1024)))
+
+
+def _fsync_dir(directory):
+    if sys.platform.startswith("win"):
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path, text):
+    """임시 파일에 쓰고 fsync 한 뒤 rename 으로 교체합니다."""
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_dir(directory)
+
+
+def append_jsonl(path, record, max_bytes=MAX_LOG_BYTES):
+    """JSONL 기록에 한 줄을 붙이고, 파일이 max_bytes 를 넘으면 최근 max_bytes / 2 안에 드는 줄만 남깁니다."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    if not max_bytes or os.path.getsize(path) <= max_bytes:
+        return
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    kept, size = [], 0
+    for line in reversed(lines):
+        if size + len(line) > max_bytes // 2:
+            break
+        kept.append(line)
+        size += len(line)
+    atomic_write_text(path, b"".join(reversed(kept)).decode('utf-8'))
+    print(f"🗜️ {os.path.basename(path)}: 오래된 기록 {len(lines) - len(kept)}줄을 지우고 {len(kept)}줄을 남깁니다.")
+
+
+def compute_delta(old, new):
+    """두 상태의 최상위 키 차이를 델타로 만듭니다. 리스트 뒤에 항목이 붙은 경우는 append 로 기록합니다."""
+    delta = {}
+    for key, value in new.items():
+        if key in old and old[key] == value:
+            continue
+        previous = old.get(key)
+        if isinstance(previous, list) and isinstance(value, list) and value[:len(previous)] == previous:
+            delta.setdefault("append", {})[key] = value[len(previous):]
+        else:
+            delta.setdefault("set", {})[key] = value
+    removed = [key for key in old if key not in new]
+    if removed:
+        delta["unset"] = removed
+    return delta
+
+
+def apply_delta(state, delta):
+    for key, value in delta.get("set", {}).items():
+        state[key] = value
+    for key, items in delta.get("append", {}).items():
+        state.setdefault(key, []).extend(items)
+    for key in delta.get("unset", []):
+        state.pop(key, None)
+    return state
+
+
+class StateStore:
+    def __init__(self, directory, default_state, snapshot_name="bot_state.json",
+                 journal_name="bot_state.journal", max_journal_bytes=MAX_JOURNAL_BYTES):
+        self.snapshot_path = os.path.join(directory, snapshot_name)
+        self.journal_path = os.path.join(directory, journal_name)
+        self.default_state = default_state
+        self.max_journal_bytes = max_journal_bytes
+        self._base = None
+        self._last_state = None
+        self._valid_journal_bytes = 0
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return copy.deepcopy(self.default_state), "default"
+        with open(self.snapshot_path, 'rb') as f:
+            raw = f.read()
+        return json.loads(raw.decode('utf-8')), hashlib.sha1(raw).hexdigest()[:12]
+
+    def _replay_journal(self, state):
+        self._valid_journal_bytes = 0
+        if not os.path.exists(self.journal_path):
+            return state
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    print("⚠️ 저널의 마지막 항목이 잘려 있어 무시합니다. (중단된 실행)")
+                    break
+                try:
+                    entry = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    print("⚠️ 손상된 저널 항목을 발견하여 이후 항목을 무시합니다.")
+                    break
+                self._valid_journal_bytes += len(line)
+                if entry.get("base") != self._base:
+                    # 이미 스냅샷에 반영된 (compaction 이전) 항목
+                    continue
+                apply_delta(state, entry)
+        return state
+
+    def load(self):
+        state, self._base = self._read_snapshot()
+        state = self._replay_journal(state)
+        self._last_state = copy.deepcopy(state)
+        return state
+
+    def save(self, state):
+        if self._last_state is None:
+            self.load()
+        delta = compute_delta(self._last_state, state)
+        if not delta:
+            return
+        entry = {"base": self._base, "ts": datetime.now().isoformat(timespec="seconds"), **delta}
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode('utf-8')
+
+        with open(self.journal_path, 'ab') as f:
+            # 이전 실행이 남긴 잘린 꼬리는 잘라내고 이어 씁니다.
+            if f.tell() != self._valid_journal_bytes:
+                f.truncate(self._valid_journal_bytes)
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._valid_journal_bytes += len(line)
+        self._last_state = copy.deepcopy(state)
+
+        if self._valid_journal_bytes > self.max_journal_bytes:
+            self.compact()
+
+    def compact(self):
+        """현재 상태를 새 스냅샷으로 쓰고 저널을 비웁니다."""
+        state = self._last_state if self._last_state is not None else self.load()
+        text = json.dumps(state, ensure_ascii=False, indent=2)
+        atomic_write_text(self.snapshot_path, text)
+        self._base = hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+        atomic_write_text(self.journal_path, "")
+        self._valid_journal_bytes = 0
+        print(f"🗜️ 상태 저널을 스냅샷으로 압축했습니다: {os.path.basename(self.snapshot_path)}")
+
+
+if __name__ == "__main__":
+    # python -m common.state_store <bot_dir> : 저널을 스냅샷으로 강제 압축
+    if len(sys.argv) != 2:
+        print("usage: python -m common.state_store <bot_dir>")
+        sys.exit(2)
+    store = StateStore(sys.argv[1], {})
+    store.load()
+    store.compact()
@@ -0,0 +1,91 @@
+"""
+릴레이 소설의 완결 판정 (표준 라이브러리만 사용, 모델 호출 없음).
+
+* 종료 문구: 작가 프롬프트는 마지막 분량 끝에 ENDING_SENTINEL 을 붙이도록 지시합니다.
+  최근 생성 단락의 끝부분에 (공백/문장부호를 무시하고) 이 문구가 있으면 완결입니다.
+* 시놉시스 진행도: 시놉시스의 '#### 발단 (...)' 같은 단계 제목으로 단계를 나누고, 누적 플롯 로그의 각 요약을
+  글자 bigram 이 가장 많이 겹치는 단계에 배정합니다. 2위 단계보다 PHASE_MARGIN 이상 앞설 때만 배정하고(애매한 요약은 건너뜀),
+  진행도는 뒤로 돌아가지 않습니다(지금까지 배정된 최대 단계).
+  최근 요약이 MAX_EPILOGUE_ENTRIES 개 넘게 연달아 마지막 단계로 배정됐는데도 종료 문구가 없으면
+  모델이 끝내지 못한 것으로 보고 완결 처리합니다. (한 번 우연히 마지막 단계와 겹친 요약만으로는 끝나지 않습니다)
+"""
+import os
+import re
+
+ENDING_SENTINEL = "지금까지 이 소설을 읽어주셔서 감사합니다"
+# 종료 문구를 찾는 최근 생성 단락의 끝부분 길이
+SENTINEL_WINDOW_CHARS = 200
+MAX_EPILOGUE_ENTRIES = int(os.environ.get("BOT_STORY_MAX_EPILOGUE", "3"))
+# 1위 단계의 겹침 비율이 2위보다 이만큼 커야 그 단계로 배정합니다.
+PHASE_MARGIN = float(os.environ.get("BOT_STORY_PHASE_MARGIN", "0.05"))
+
+_PHASE_HEADER = re.compile(r"^#{2,4}\s*(.+?)\s*$", re.MULTILINE)
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def _normalize(text):
+    return _NON_WORD.sub("", text or "")
+
+
+def has_ending_sentinel(text):
+    return _normalize(ENDING_SENTINEL) in _normalize((text or "")[-SENTINEL_WINDOW_CHARS:])
+
+
+def synopsis_phases(synopsis):
+    """[(단계 이름, 본문), ...] 제목 단계('제목: ...')는 제외합니다."""
+    headers = list(_PHASE_HEADER.finditer(synopsis or ""))
+    phases = []
+    for i, match in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(synopsis)
+        name = match.group(1)
+        if name.startswith("제목"):
+            continue
+        phases.append((name, synopsis[match.end():end]))
+    return phases
+
+
+def _bigrams(text):
+    text = _normalize(text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def phase_of(summary, phase_grams, margin=PHASE_MARGIN):
+    """요약과 글자 bigram 이 가장 많이 겹치는 단계의 번호. 2위와의 차이가 margin 보다 작으면 None"""
+    grams = _bigrams(summary)
+    scores = [len(grams & phase) / (len(grams) or 1) for phase in phase_grams]
+    ranked = sorted(range(len(scores)), key=lambda i: -scores[i])
+    if len(ranked) > 1 and scores[ranked[0]] - scores[ranked[1]] < margin:
+        return None
+    return ranked[0]
+
+
+def phase_progress(synopsis, plot_log):
+    """
+    {"phases": [이름, ...], "entries": [로그별 배정 단계 번호 | None], "current": 현재 단계 번호,
+     "in_last_phase": 끝에서부터 연달아 마지막 단계로 배정된 로그 수}
+    """
+    phases = synopsis_phases(synopsis)
+    if not phases:
+        return {"phases": [], "entries": [], "current": None, "in_last_phase": 0}
+    phase_grams = [_bigrams(text) for _, text in phases]
+    entries = [phase_of(summary, phase_grams) for summary in plot_log]
+    current = max([phase for phase in entries if phase is not None], default=0)
+    last, trailing = len(phases) - 1, 0
+    for phase in reversed(entries):
+        if phase != last:
+            break
+        trailing += 1
+    return {"phases": [name for name, _ in phases], "entries": entries, "current": current if entries else None,
+            "in_last_phase": trailing}
+
+
+def assess(synopsis, plot_log, recent_text):
+    """{"finished": bool, "reason": "sentinel" | "epilogue_overrun" | None, "phase": 현재 단계 이름, "progress": phase_progress}"""
+    progress = phase_progress(synopsis, plot_log)
+    phase = progress["phases"][progress["current"]] if progress["current"] is not None else None
+    reason = None
+    if has_ending_sentinel(recent_text):
+        reason = "sentinel"
+    elif progress["phases"] and progress["in_last_phase"] > MAX_EPILOGUE_ENTRIES:
+        reason = "epilogue_overrun"
+    return {"finished": reason is not None, "reason": reason, "phase": phase, "progress": progress}
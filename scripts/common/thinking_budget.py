@@ -0,0 +1,269 @@
+"""
+작업별 thinking 예산 자동 조절.
+
+라우팅 첫 단계의 thinking 예산(또는 thinking_level)을 작업마다 정한 사다리(floor ~ ceiling)에서 고릅니다.
+처음에는 맨 위(지금까지 쓰던 값)에서 시작하고, 품질이 유지되는 실행이 HOLD_RUNS 번 이어지면 한 칸 내리며,
+실패하면 바로 한 칸 올립니다. 대체(fallback) 단계의 설정은 바꾸지 않습니다.
+
+* 기록: 라우터가 작업별 호출 기록(thinking 토큰, 지연, 결과)을 넘기고, 봇은 품질 신호를 observe() 로 더합니다.
+  - 실패: 호출 오류(검증 실패 포함), retries > 0, grounding_chunks == 0, valid=False, repaired > 0,
+    실행이 그 작업에서 중단됨(commit(crashed=True) 의 마지막 작업)
+  - 중립: SLO 초과만 있었던 경우 (느린 것은 예산을 올릴 이유가 아니므로 칸을 바꾸지 않음)
+* 상태와 이력은 run_data/thinking_budget.json 에 저장됩니다. BOT_ADAPTIVE_THINKING=0 이면 설정값을 그대로 씁니다.
+* 보고: 값별 평균 thinking 토큰/지연과, 맨 위 칸 대비 아낀 토큰/시간을 출력합니다.
+
+usage: python -m common.thinking_budget [bot ...] | --self-test
+"""
+import json
+import os
+import sys
+from datetime import datetime
+
+from common.state_store import atomic_write_text
+
+ADAPTIVE_THINKING = os.environ.get("BOT_ADAPTIVE_THINKING", "1") == "1"
+# 한 칸 내리기 전에 연속으로 성공해야 하는 실행 수
+HOLD_RUNS = int(os.environ.get("BOT_THINKING_HOLD_RUNS", "3"))
+STATE_FILE = "thinking_budget.json"
+HISTORY_LIMIT = 300
+LEVELS = ["minimal", "low", "medium", "high"]
+MAX_BUDGET = 24576
+
+
+def budget_ladder(floor, ceiling):
+    """thinking_budget 사다리. floor 에서 두 배씩 올라가 ceiling 까지 (ceiling=-1 은 모델 재량, 맨 위 칸)."""
+    top = MAX_BUDGET if ceiling == -1 else ceiling
+    ladder, value = [floor], max(floor * 2, 512)
+    while value < top:
+        ladder.append(value)
+        value *= 2
+    if ladder[-1] != ceiling:
+        ladder.append(ceiling)
+    return ladder
+
+
+def level_ladder(floor, ceiling):
+    """thinking_level 사다리 (Gemini 3)"""
+    return LEVELS[LEVELS.index(floor):LEVELS.index(ceiling) + 1]
+
+
+def evaluate(records, signals, crashed=False):
+    """(결과 "ok" | "fail" | "neutral", 이유 목록)"""
+    reasons = []
+    if any(r["outcome"] == "error" for r in records):
+        reasons.append("error")
+    if signals.get("retries"):
+        reasons.append(f"retries={signals['retries']}")
+    if "grounding_chunks" in signals and not signals["grounding_chunks"]:
+        reasons.append("no grounding")
+    if signals.get("valid") is False:
+        reasons.append("invalid")
+    if signals.get("repaired"):
+        reasons.append(f"repaired={signals['repaired']}")
+    if crashed:
+        reasons.append("crashed")
+    if reasons:
+        return "fail", reasons
+    if any(r["outcome"] == "slo_exceeded" for r in records):
+        return "neutral", ["slo_exceeded"]
+    return "ok", []
+
+
+class ThinkingController:
+    def __init__(self, run_data_dir, policy, enabled=ADAPTIVE_THINKING, hold_runs=HOLD_RUNS):
+        """policy: {task: 사다리 (budget_ladder / level_ladder)}"""
+        self.path = os.path.join(run_data_dir, STATE_FILE)
+        self.policy = policy
+        self.enabled = enabled
+        self.hold_runs = hold_runs
+        self.data = self._load()
+        self.pending = {}
+        self._last_task = None
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {"tasks": {}, "history": []}
+
+    def _entry(self, task):
+        ladder = self.policy[task]
+        entry = self.data["tasks"].setdefault(task, {"rung": len(ladder) - 1, "streak": 0})
+        # 사다리가 바뀌었으면 범위 안으로 맞춥니다.
+        entry["rung"] = min(max(entry["rung"], 0), len(ladder) - 1)
+        return entry
+
+    def value(self, task):
+        return self.policy[task][self._entry(task)["rung"]]
+
+    def adjust(self, task, index, step):
+        """라우팅 단계 step 의 thinking 설정을 지금 칸의 값으로 바꾼 사본 (첫 단계만)"""
+        if not self.enabled or index != 0 or task not in self.policy:
+            return step
+        value = self.value(task)
+        if isinstance(value, str):
+            return dict(step, thinking_level=value, thinking_budget=None)
+        return dict(step, thinking_budget=value, thinking_level=None)
+
+    def record(self, task, record):
+        """라우터가 호출 기록마다 부릅니다."""
+        if task not in self.policy:
+            return
+        self.pending.setdefault(task, {"records": [], "signals": {}})["records"].append(record)
+        self._last_task = task
+
+    def observe(self, task, **signals):
+        if task in self.policy:
+            self.pending.setdefault(task, {"records": [], "signals": {}})["signals"].update(signals)
+
+    def commit(self, crashed=False):
+        """이번 실행(생성 한 번)의 결과로 칸을 옮기고 저장합니다. crashed 이면 마지막으로 호출한 작업을 실패로 봅니다."""
+        if not self.pending:
+            return
+        for task, pending in self.pending.items():
+            records = pending["records"]
+            if not records:
+                # 이번 실행에서 호출하지 않은 작업 (예: 섹션 분할 모드의 write)
+                continue
+            primary = [r for r in records if r.get("step") == 0]
+            result, reasons = evaluate(records, pending["signals"], crashed and task == self._last_task)
+            entry = self._entry(task)
+            value = self.policy[task][entry["rung"]]
+            if self.enabled:
+                if result == "fail":
+                    entry["rung"] = min(entry["rung"] + 1, len(self.policy[task]) - 1)
+                    entry["streak"] = 0
+                elif result == "ok":
+                    entry["streak"] += 1
+                    if entry["streak"] >= self.hold_runs and entry["rung"] > 0:
+                        entry["rung"] -= 1
+                        entry["streak"] = 0
+            ok_primary = [r for r in primary if r["outcome"] == "ok"]
+            self.data["history"].append({
+                "ts": datetime.now().isoformat(timespec="seconds"), "task": task, "value": value, "result": result,
+                "reasons": reasons, "thinking_tokens": sum(r.get("thinking_tokens") or 0 for r in ok_primary) if ok_primary else None,
+                "latency": round(sum(r["latency"] for r in records), 3), "calls": len(records),
+            })
+            if self.enabled and self.policy[task][entry["rung"]] != value:
+                print(f"      (Thinking: {task} {value} → {self.policy[task][entry['rung']]}, {result}{' ' + ', '.join(reasons) if reasons else ''})")
+        self.data["history"] = self.data["history"][-HISTORY_LIMIT:]
+        self.pending, self._last_task = {}, None
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write_text(self.path, json.dumps(self.data, ensure_ascii=False, indent=1))
+
+
+# --- [Report] ---
+def summarize(history, ladder):
+    """{값: {"runs", "fails", "thinking", "latency"}} 와 맨 위 칸 대비 절약량"""
+    by_value = {}
+    for entry in history:
+        row = by_value.setdefault(entry["value"], {"runs": 0, "fails": 0, "thinking": [], "latency": []})
+        row["runs"] += 1
+        row["fails"] += entry["result"] == "fail"
+        if entry["thinking_tokens"] is not None:
+            row["thinking"].append(entry["thinking_tokens"])
+        row["latency"].append(entry["latency"])
+    for row in by_value.values():
+        row["thinking"] = sum(row["thinking"]) / len(row["thinking"]) if row["thinking"] else None
+        row["latency"] = sum(row["latency"]) / len(row["latency"])
+    # 기준: 자료가 있는 가장 높은 칸
+    baseline = next((by_value[v] for v in reversed(ladder) if v in by_value), None)
+    saved = {"thinking_tokens": 0, "seconds": 0.0}
+    if baseline:
+        for entry in history:
+            if entry["value"] == ladder[-1] or by_value.get(entry["value"]) is baseline:
+                continue
+            if baseline["thinking"] is not None and entry["thinking_tokens"] is not None:
+                saved["thinking_tokens"] += baseline["thinking"] - entry["thinking_tokens"]
+            saved["seconds"] += baseline["latency"] - entry["latency"]
+    return by_value, saved
+
+
+def report(bots):
+    from common.bots import load_bot
+    for bot in bots:
+        module = load_bot(bot)
+        controller = ThinkingController(module.RUN_DATA_DIR, module.THINKING_POLICY)
+        print(f"🧠 {bot} thinking 예산")
+        for task, ladder in module.THINKING_POLICY.items():
+            history = [h for h in controller.data["history"] if h["task"] == task]
+            entry = controller._entry(task)
+            by_value, saved = summarize(history, ladder)
+            print(f"   {task:<16} 현재 {controller.value(task)!s:<8} (사다리 {ladder}, 연속 성공 {entry['streak']})")
+            for value in ladder:
+                row = by_value.get(value)
+                if row:
+                    thinking = f"{row['thinking']:8.0f}" if row['thinking'] is not None else "       -"
+                    print(f"      {value!s:>8}: runs {row['runs']:>3}  fail {row['fails']:>2}  thinking {thinking}  latency {row['latency']:6.1f}s")
+            if history:
+                print(f"      맨 위 칸 대비 절약: thinking {saved['thinking_tokens']:,.0f} tokens, {saved['seconds']:,.1f}s")
+
+
+def self_test():
+    import tempfile
+
+    assert budget_ladder(2048, 24576) == [2048, 4096, 8192, 16384, 24576]
+    assert budget_ladder(0, 4096) == [0, 512, 1024, 2048, 4096]
+    assert budget_ladder(4096, -1) == [4096, 8192, 16384, -1]
+    assert level_ladder("low", "high") == ["low", "medium", "high"]
+
+    def call(task, outcome="ok", thinking=1000, latency=10.0, step=0):
+        return {"task": task, "step": step, "outcome": outcome, "thinking_tokens": thinking, "latency": latency}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = {"research": budget_ladder(2048, 8192), "write": level_ladder("low", "high")}
+        controller = ThinkingController(tmp, policy, enabled=True, hold_runs=2)
+        step = {"tier": "standard", "slo": 60, "thinking_budget": 8192, "thinking_level": None}
+        assert controller.adjust("research", 0, step)["thinking_budget"] == 8192
+        assert controller.adjust("research", 1, step) is step
+
+        # 두 번 연속 성공하면 한 칸 내립니다.
+        for _ in range(2):
+            controller.record("research", call("research", thinking=6000, latency=30))
+            controller.observe("research", retries=0, grounding_chunks=5)
+            controller.commit()
+        assert controller.value("research") == 4096
+        # 검색 결과가 없으면 바로 한 칸 올립니다.
+        controller.record("research", call("research", thinking=2500, latency=15))
+        controller.observe("research", retries=1, grounding_chunks=0)
+        controller.commit()
+        assert controller.value("research") == 8192
+        # SLO 초과만 있었던 실행은 칸을 바꾸지 않습니다.
+        controller.record("research", call("research", outcome="slo_exceeded", thinking=None, latency=60))
+        controller.record("research", call("research", step=1, thinking=800, latency=5))
+        controller.commit()
+        assert controller.value("research") == 8192 and controller.data["tasks"]["research"]["streak"] == 0
+
+        # 중단된 실행은 마지막 작업만 실패로 봅니다.
+        controller.data["tasks"]["write"] = {"rung": 1, "streak": 0}
+        assert controller.adjust("write", 0, step)["thinking_level"] == "medium"
+        controller.record("research", call("research"))
+        controller.record("write", call("write"))
+        controller.commit(crashed=True)
+        assert controller.value("write") == "high" and controller.data["tasks"]["research"]["streak"] == 1
+
+        # 저장 후 다시 읽어도 같은 칸에서 시작합니다.
+        reloaded = ThinkingController(tmp, policy)
+        assert reloaded.value("research") == 8192 and reloaded.value("write") == "high"
+        by_value, saved = summarize([h for h in reloaded.data["history"] if h["task"] == "research"], policy["research"])
+        assert by_value[4096]["runs"] == 1 and saved["thinking_tokens"] > 0 and saved["seconds"] > 0
+
+        # 호출 없이 신호만 있는 작업은 건너뜁니다.
+        controller.observe("write", repaired=0)
+        controller.commit()
+        assert controller.data["tasks"]["write"]["streak"] == 0
+
+        disabled = ThinkingController(tmp, policy, enabled=False)
+        assert disabled.adjust("research", 0, step) is step
+    print("✅ thinking_budget self-test passed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--self-test" in args:
+        self_test()
+    else:
+        report([a for a in args if not a.startswith("--")] or ["ai_history", "cs_history", "ghost_in_the_legacy"])
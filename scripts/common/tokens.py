@@ -0,0 +1,239 @@
+"""
+오프라인 토큰 수 추정 (한국어/영어 혼합).
+
+count_tokens API 를 부르지 않고 프롬프트 크기를 재고, 예산에 맞게 입력을 줄이고, 보내기 전에 비용을 어림합니다.
+
+* 추정: 글자를 종류별(한글 음절, 라틴 문자, 숫자, 공백, 문장부호/기호, 그 밖의 문자)로 세고 종류별 가중치를 곱해 더합니다.
+  프롬프트에는 호출당 고정 비용(시스템 설정, 도구 정의)을 더합니다.
+* 보정: 라우터(common/model_router.py)는 성공한 호출마다 프롬프트/응답의 글자 종류별 개수를 실제 usage_metadata 와 함께
+  run_data/routing_log.jsonl 에 남깁니다. --calibrate 는 모든 봇의 기록으로 상대 오차 제곱합이 최소가 되는 가중치를 구해
+  scripts/run_data/token_calibration.json 에 저장합니다. 보정 파일이 없으면 DEFAULT_WEIGHTS 를 씁니다.
+* 정확도: --report 는 기록된 실제 토큰 수에 대한 평균/90분위 상대 오차를 (보정값, 기본값, 단순 글자수/2 어림) 별로 출력합니다.
+
+usage: python -m common.tokens [--calibrate] [--report] [text ...]
+"""
+import glob
+import json
+import os
+import re
+import sys
+
+from common.posts import REPO_ROOT, SHARED_RUN_DATA_DIR
+from common.state_store import atomic_write_text
+
+CALIBRATION_PATH = os.path.join(SHARED_RUN_DATA_DIR, "token_calibration.json")
+FEATURES = ["hangul", "latin", "digit", "space", "punct", "other", "call", "tools"]
+# 보정 전 기본값 (SentencePiece 계열: 영어 약 4글자/토큰, 한글 약 1.3음절/토큰)
+DEFAULT_WEIGHTS = {"hangul": 0.75, "latin": 0.25, "digit": 0.5, "space": 0.05, "punct": 0.6, "other": 1.0,
+                   "call": 5.0, "tools": 30.0}
+# 모델별 (입력, 출력) USD / 1M 토큰. thinking 토큰은 출력 가격으로 계산됩니다.
+PRICES = {
+    "gemini-3-flash-preview": (0.50, 3.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+MIN_CALIBRATION_SAMPLES = 20
+RIDGE = 1e-6
+
+_CLASSES = [
+    ("hangul", re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]")),
+    ("latin", re.compile(r"[A-Za-z]")),
+    ("digit", re.compile(r"[0-9]")),
+    ("space", re.compile(r"\s")),
+    ("punct", re.compile(r"[!-/:-@\[-`{-~·…“”‘’「」『』《》〈〉]")),
+]
+
+_weights = None
+
+
+def text_features(*texts, tools=0):
+    """글자 종류별 개수. 프롬프트 하나를 이루는 여러 부분(시스템 프롬프트, 앞부분, 본문)을 함께 셉니다."""
+    counts = dict.fromkeys(FEATURES, 0)
+    for text in texts:
+        if text is None:
+            continue
+        text = text if isinstance(text, str) else str(text)
+        total = len(text)
+        counted = 0
+        for name, pattern in _CLASSES:
+            n = len(pattern.findall(text))
+            counts[name] += n
+            counted += n
+        counts["other"] += total - counted
+    counts["call"] = 1
+    counts["tools"] = tools
+    return counts
+
+
+def load_weights():
+    global _weights
+    if _weights is None:
+        _weights = dict(DEFAULT_WEIGHTS)
+        if os.path.exists(CALIBRATION_PATH):
+            with open(CALIBRATION_PATH, 'r', encoding='utf-8') as f:
+                _weights.update(json.load(f).get("weights", {}))
+    return _weights
+
+
+def estimate_from_features(features, weights=None):
+    weights = weights or load_weights()
+    return max(1, round(sum(weights.get(name, 0.0) * features.get(name, 0) for name in FEATURES)))
+
+
+def estimate_tokens(*texts, tools=0):
+    """프롬프트 하나의 토큰 수 추정값"""
+    return estimate_from_features(text_features(*texts, tools=tools))
+
+
+def estimate_output_tokens(text):
+    """응답 본문의 토큰 수 추정값 (호출당 고정 비용 제외)"""
+    features = text_features(text)
+    features["call"] = 0
+    return estimate_from_features(features)
+
+
+def trim_to_budget(text, budget, keep="tail", marker="…"):
+    """text 가 budget 토큰을 넘으면 앞(keep="tail") 또는 뒤(keep="head")를 잘라 budget 안에 맞춥니다."""
+    if estimate_output_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        part = text[-mid:] if keep == "tail" else text[:mid]
+        if estimate_output_tokens(part) + 1 <= budget:
+            low = mid
+        else:
+            high = mid - 1
+    part = text[-low:] if keep == "tail" and low else text[:low]
+    return marker + part if keep == "tail" else part + marker
+
+
+def trim_items(items, budget, keep="tail"):
+    """목록(플롯 로그 등)을 앞(keep="tail") 또는 뒤 항목부터 빼서 합계가 budget 토큰 안에 들게 합니다."""
+    kept, total = [], 0
+    ordered = reversed(items) if keep == "tail" else iter(items)
+    for item in ordered:
+        cost = estimate_output_tokens(str(item))
+        if total + cost > budget:
+            break
+        kept.append(item)
+        total += cost
+    return list(reversed(kept)) if keep == "tail" else kept
+
+
+def predict_cost(model, prompt_tokens, output_tokens=0, thinking_tokens=0, cached_tokens=0, cached_discount=0.9):
+    """USD. 가격표에 없는 모델은 None."""
+    if model not in PRICES:
+        return None
+    input_price, output_price = PRICES[model]
+    billed_input = prompt_tokens - cached_tokens * cached_discount
+    return (billed_input * input_price + (output_tokens + thinking_tokens) * output_price) / 1_000_000
+
+
+# --- [Calibration] ---
+def load_samples(pattern=os.path.join(REPO_ROOT, "scripts", "*", "run_data", "routing_log.jsonl")):
+    """(특징, 실제 토큰 수) 목록. 프롬프트와 응답 모두 씁니다."""
+    samples = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("outcome") != "ok":
+                    continue
+                if record.get("prompt_features") and record.get("prompt_tokens"):
+                    samples.append((record["prompt_features"], record["prompt_tokens"]))
+                if record.get("output_features") and record.get("output_tokens"):
+                    samples.append((record["output_features"], record["output_tokens"]))
+    return samples
+
+
+def _solve(matrix, vector):
+    """가우스 소거 (작은 대칭 행렬용)"""
+    n = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if abs(rows[col][col]) < 1e-12:
+            continue
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [rows[i][n] / rows[i][i] if abs(rows[i][i]) > 1e-12 else 0.0 for i in range(n)]
+
+
+def fit(samples):
+    """상대 오차 제곱합을 최소화하는 음이 아닌 가중치. 음수가 된 특징은 0 으로 고정하고 다시 풉니다."""
+    active = list(FEATURES)
+    while True:
+        n = len(active)
+        xtx = [[RIDGE if i == j else 0.0 for j in range(n)] for i in range(n)]
+        xty = [0.0] * n
+        for features, actual in samples:
+            x = [features.get(name, 0) / actual for name in active]
+            for i in range(n):
+                xty[i] += x[i]
+                for j in range(n):
+                    xtx[i][j] += x[i] * x[j]
+        solution = dict(zip(active, _solve(xtx, xty)))
+        negative = [name for name, w in solution.items() if w < 0]
+        if not negative:
+            return {name: round(solution.get(name, 0.0), 5) for name in FEATURES}
+        active = [name for name in active if name not in negative]
+
+
+def accuracy(samples, estimator):
+    errors = sorted(abs(estimator(features) - actual) / actual for features, actual in samples)
+    if not errors:
+        return None
+    return {"mean": sum(errors) / len(errors), "p90": errors[min(len(errors) - 1, int(len(errors) * 0.9))]}
+
+
+def _rough(features):
+    # rate_limit.rough_token_count 와 같은 '글자 수 / 2' 어림
+    return max(1, sum(features.get(name, 0) for name in FEATURES[:6]) // 2)
+
+
+def report(samples, weights):
+    print(f"📏 토큰 추정 정확도 (표본 {len(samples)}개, 실제 usage_metadata 기준 상대 오차)")
+    for label, estimator in [("calibrated", lambda f: estimate_from_features(f, weights)),
+                             ("default", lambda f: estimate_from_features(f, DEFAULT_WEIGHTS)),
+                             ("chars/2", _rough)]:
+        result = accuracy(samples, estimator)
+        if result:
+            print(f"   {label:<11} mean {result['mean']:6.1%}  p90 {result['p90']:6.1%}")
+
+
+def calibrate(samples):
+    if len(samples) < MIN_CALIBRATION_SAMPLES:
+        print(f"⚠️ 보정 표본이 부족합니다 ({len(samples)} < {MIN_CALIBRATION_SAMPLES}). 기본값을 유지합니다.")
+        return None
+    # 검증용으로 다섯 개 중 하나를 빼 두고 맞춘 뒤, 저장은 전체 표본으로 맞춘 값으로 합니다.
+    train = [s for i, s in enumerate(samples) if i % 5]
+    held_out = [s for i, s in enumerate(samples) if not i % 5]
+    train_weights = fit(train)
+    held_out_accuracy = accuracy(held_out, lambda f: estimate_from_features(f, train_weights))
+    weights = fit(samples)
+    os.makedirs(SHARED_RUN_DATA_DIR, exist_ok=True)
+    atomic_write_text(CALIBRATION_PATH, json.dumps({
+        "weights": weights, "samples": len(samples), "held_out": held_out_accuracy,
+    }, ensure_ascii=False, indent=2))
+    print(f"🎯 보정 완료: {CALIBRATION_PATH}")
+    if held_out_accuracy:
+        print(f"   held-out mean {held_out_accuracy['mean']:.1%} p90 {held_out_accuracy['p90']:.1%}")
+    return weights
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--calibrate" in args or "--report" in args:
+        samples = load_samples()
+        weights = calibrate(samples) if "--calibrate" in args else None
+        report(samples, weights or load_weights())
+    else:
+        text = " ".join(args) if args else sys.stdin.read()
+        print(estimate_tokens(text))
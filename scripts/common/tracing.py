@@ -0,0 +1,351 @@
+"""
+실행 단위 추적(tracing).
+
+각 봇 실행을 중첩된 span(조사, 플래너, 인용 URL 확인, 작성, JSON 파싱, 발행 후처리, 모델 호출 ...)으로 기록해
+어느 단계가 시간을 썼는지 보여줍니다. span 에는 시작/끝 시각, 속성, 이벤트(재시도, 대체 경로, hedge ...)가 남습니다.
+
+* 실행이 끝나면 run_data/traces/<시각>.json 에 저장하고 텍스트 타임라인을 출력합니다 (최근 MAX_TRACE_FILES 개 유지).
+* BOT_TRACE=0 이면 기록하지 않습니다.
+* BOT_TRACE_PROFILE=<span 이름> 이면 그 span 동안 cProfile 과 tracemalloc 을 켜고 결과를 출력/저장합니다.
+* 실행마다 따로 Trace 를 만들고 contextvar 로 그 실행의 스레드에만 보이게 하므로, 스케줄러가 여러 봇을 동시에 돌려도
+  서로의 span 을 지우지 않습니다. 실행 안에서 작업 스레드를 만들 때는 tracer.bind(fn) 으로 감싸 같은 실행에 기록합니다.
+
+usage: python -m common.tracing <trace.json> [--html out.html] [--chrome out.json] | --self-test
+    --html    타임라인 HTML 파일
+    --chrome  chrome://tracing / Perfetto 에서 열 수 있는 trace event 형식
+"""
+import contextvars
+import glob
+import html
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from common.state_store import atomic_write_text
+
+TRACE_ENABLED = os.environ.get("BOT_TRACE", "1") == "1"
+PROFILE_SPAN = os.environ.get("BOT_TRACE_PROFILE", "")
+MAX_TRACE_FILES = 20
+TRACE_DIR = "traces"
+
+
+class Trace:
+    """실행 하나의 기록"""
+    def __init__(self, name, **attrs):
+        self._lock = threading.Lock()
+        self.name = name
+        self.attrs = attrs
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._open = []
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        """이 스레드의 현재 span. hedge/SLO 작업 스레드처럼 스택이 비어 있으면 가장 최근에 열린 span."""
+        stack = self._stack()
+        if stack:
+            return stack[-1]
+        with self._lock:
+            return self._open[-1] if self._open else None
+
+    def _now(self):
+        return round(time.perf_counter() - self._origin, 4)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        parent = self.current()
+        record = {"id": next(self._ids), "parent": parent["id"] if parent else None, "name": name,
+                  "start": self._now(), "end": None, "attrs": dict(attrs), "events": [],
+                  "thread": threading.current_thread().name}
+        with self._lock:
+            self.spans.append(record)
+            self._open.append(record)
+        self._stack().append(record)
+        profiler = _SpanProfiler(name) if PROFILE_SPAN and name == PROFILE_SPAN else None
+        try:
+            yield record
+        except BaseException as e:
+            record["attrs"]["error"] = f"{type(e).__name__}: {str(e)[:200]}"
+            raise
+        finally:
+            if profiler:
+                profiler.stop(record)
+            record["end"] = self._now()
+            self._stack().pop()
+            with self._lock:
+                self._open.remove(record)
+
+    def event(self, name, **attrs):
+        record = self.current()
+        if record is not None:
+            record["events"].append({"t": self._now(), "name": name, "attrs": attrs})
+
+    def set(self, **attrs):
+        record = self.current()
+        if record is not None:
+            record["attrs"].update(attrs)
+
+    def to_dict(self):
+        return {"name": self.name, "started": self.started_at, "attrs": self.attrs, "spans": self.spans}
+
+    def finish(self, run_data_dir):
+        """추적 파일을 저장하고 텍스트 타임라인을 출력합니다. 저장한 경로를 반환합니다."""
+        if not TRACE_ENABLED or not self.spans:
+            return None
+        directory = os.path.join(run_data_dir, TRACE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+        atomic_write_text(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=1))
+        for old in sorted(glob.glob(os.path.join(directory, "*.json")))[:-MAX_TRACE_FILES]:
+            os.remove(old)
+        print(render_text(self.to_dict()))
+        print(f"   [trace] {os.path.relpath(path)}")
+        return path
+
+
+class _SpanProfiler:
+    def __init__(self, name):
+        import cProfile
+        import tracemalloc
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.tracemalloc = tracemalloc
+        self.started_tracemalloc = not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        self.snapshot = tracemalloc.take_snapshot()
+        self.profile.enable()
+
+    def stop(self, record):
+        import io
+        import pstats
+        self.profile.disable()
+        after = self.tracemalloc.take_snapshot()
+        current, peak = self.tracemalloc.get_traced_memory()
+        if self.started_tracemalloc:
+            self.tracemalloc.stop()
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(15)
+        print(f"   [profile] span '{self.name}' (cProfile, 누적 시간 상위 15개)")
+        print(out.getvalue())
+        print(f"   [profile] span '{self.name}' 메모리 증가 상위 10개 (peak {peak / 1024:.0f} KiB)")
+        for stat in after.compare_to(self.snapshot, "lineno")[:10]:
+            print(f"      {stat}")
+        record["attrs"]["profile_peak_kib"] = round(peak / 1024)
+
+
+def _children(trace):
+    children = defaultdict(list)
+    for span in trace["spans"]:
+        children[span["parent"]].append(span)
+    for items in children.values():
+        items.sort(key=lambda s: s["start"])
+    return children
+
+
+def _duration(span, total):
+    return (span["end"] if span["end"] is not None else total) - span["start"]
+
+
+def _total(trace):
+    return max([s["end"] or s["start"] for s in trace["spans"]] or [0]) or 1e-9
+
+
+def render_text(trace, width=24):
+    total = _total(trace)
+    children = _children(trace)
+    lines = [f"🧭 Trace: {trace['name']} ({trace['started']}) total {total:.1f}s"]
+
+    def walk(span, depth):
+        duration = _duration(span, total)
+        bar = "█" * max(1, round(duration / total * width)) if duration > 0 else ""
+        attrs = " ".join(f"{k}={v}" for k, v in span["attrs"].items() if k in ("model", "outcome", "attempt", "error"))
+        lines.append(f"   {span['start']:7.1f}s {'  ' * depth}{span['name']:<{max(8, 28 - 2 * depth)}} "
+                     f"{duration:7.2f}s {duration / total:4.0%} {bar:<{width}} {attrs}".rstrip())
+        for event in span["events"]:
+            lines.append(f"   {event['t']:7.1f}s {'  ' * (depth + 1)}· {event['name']} "
+                         + " ".join(f"{k}={v}" for k, v in event["attrs"].items()))
+        for child in children[span["id"]]:
+            walk(child, depth + 1)
+
+    for root in children[None]:
+        walk(root, 0)
+
+    # flame 요약: 이름별 자기 시간(자식 span 시간을 뺀 시간)
+    self_time = defaultdict(float)
+    for span in trace["spans"]:
+        own = _duration(span, total) - sum(_duration(c, total) for c in children[span["id"]] if c["thread"] == span["thread"])
+        self_time[span["name"]] += max(0.0, own)
+    top = sorted(self_time.items(), key=lambda item: -item[1])[:8]
+    lines.append("   self time: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in top))
+    return "\n".join(lines)
+
+
+def render_html(trace):
+    total = _total(trace)
+    children = _children(trace)
+    rows = []
+
+    def walk(span, depth):
+        duration = _duration(span, total)
+        title = html.escape(f"{span['name']} {duration:.2f}s " + json.dumps(span["attrs"], ensure_ascii=False))
+        color = "#e57373" if "error" in span["attrs"] else "#64b5f6" if depth % 2 == 0 else "#81c784"
+        rows.append(f'<div class="span" title="{title}" style="top:{len(rows) * 22}px;'
+                    f'left:{span["start"] / total * 100:.3f}%;width:{max(duration / total * 100, 0.2):.3f}%;'
+                    f'background:{color}">{html.escape(span["name"])} {duration:.1f}s</div>')
+        for event in span["events"]:
+            rows.append(f'<div class="event" title="{html.escape(event["name"] + " " + json.dumps(event["attrs"], ensure_ascii=False))}" '
+                        f'style="top:{(len(rows) - 1) * 22}px;left:{event["t"] / total * 100:.3f}%"></div>')
+        for child in children[span["id"]]:
+            walk(child, depth + 1)
+
+    for root in children[None]:
+        walk(root, 0)
+    return f"""<!doctype html><meta charset="utf-8"><title>{html.escape(str(trace['name']))} trace</title>
+<style>body{{font:12px sans-serif}}#t{{position:relative;height:{len(rows) * 22 + 10}px}}
+.span{{position:absolute;height:20px;overflow:hidden;white-space:nowrap;border-radius:3px;padding:0 3px;box-sizing:border-box}}
+.event{{position:absolute;width:2px;height:20px;background:#000}}</style>
+<h3>{html.escape(str(trace['name']))} — {html.escape(str(trace['started']))} ({total:.1f}s)</h3><div id="t">{''.join(rows)}</div>
+"""
+
+
+def to_chrome_trace(trace):
+    events = []
+    for span in trace["spans"]:
+        end = span["end"] if span["end"] is not None else span["start"]
+        events.append({"name": span["name"], "ph": "X", "ts": span["start"] * 1e6, "dur": (end - span["start"]) * 1e6,
+                       "pid": 1, "tid": span["thread"], "args": span["attrs"]})
+        for event in span["events"]:
+            events.append({"name": event["name"], "ph": "i", "s": "t", "ts": event["t"] * 1e6,
+                           "pid": 1, "tid": span["thread"], "args": event["attrs"]})
+    return {"traceEvents": events}
+
+
+# 지금 스레드(와 bind 로 넘겨받은 작업 스레드)의 실행. 새 스레드는 빈 컨텍스트에서 시작하므로 실행끼리 섞이지 않습니다.
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Tracer:
+    """프로세스 전체의 진입점. 기록은 지금 컨텍스트의 Trace 에 남기고, 실행 중이 아니면 버립니다."""
+
+    def start(self, name, **attrs):
+        """새 실행을 시작해 이 컨텍스트에 연결하고 반환합니다."""
+        trace = Trace(name, **attrs)
+        _current.set(trace)
+        return trace
+
+    def run(self):
+        return _current.get()
+
+    def bind(self, fn):
+        """fn 을 다른 스레드에서 불러도 지금 실행에 기록되도록 감쌉니다."""
+        trace = _current.get()
+
+        def bound(*args, **kwargs):
+            token = _current.set(trace)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current.reset(token)
+        return bound
+
+    def current(self):
+        trace = _current.get()
+        return trace.current() if trace else None
+
+    @contextmanager
+    def span(self, name, **attrs):
+        trace = _current.get()
+        if trace is None:
+            yield {"name": name, "attrs": dict(attrs), "events": []}
+            return
+        with trace.span(name, **attrs) as record:
+            yield record
+
+    def event(self, name, **attrs):
+        trace = _current.get()
+        if trace:
+            trace.event(name, **attrs)
+
+    def set(self, **attrs):
+        trace = _current.get()
+        if trace:
+            trace.set(**attrs)
+
+    def finish(self, run_data_dir):
+        """지금 실행을 저장하고 연결을 끊습니다. 저장한 경로를 반환합니다."""
+        trace = _current.get()
+        _current.set(None)
+        return trace.finish(run_data_dir) if trace else None
+
+
+# 프로세스 전체에서 함께 쓰는 tracer
+tracer = Tracer()
+
+
+def self_test():
+    """두 실행을 스레드에서 겹쳐 돌려도 서로의 span 을 지우지 않는지, 작업 스레드 기록이 제 실행에 남는지 확인합니다."""
+    import tempfile
+    barrier = threading.Barrier(2)
+    traces, errors = {}, []
+
+    def run(name):
+        try:
+            traces[name] = tracer.start(name)
+            with tracer.span("generate"):
+                barrier.wait()
+                with tracer.span("research"):
+                    worker = threading.Thread(target=tracer.bind(lambda: tracer.event("retry", bot=name)))
+                    worker.start()
+                    worker.join()
+                    barrier.wait()
+            with tempfile.TemporaryDirectory() as tmp:
+                assert tracer.finish(tmp)
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+    for name, trace in traces.items():
+        assert [s["name"] for s in trace.spans] == ["generate", "research"], trace.spans
+        assert trace.spans[1]["events"][0]["attrs"] == {"bot": name}
+    # 실행 밖의 기록은 버립니다.
+    assert tracer.run() is None
+    with tracer.span("orphan") as record:
+        record["attrs"]["x"] = 1
+    print("✅ tracing self-test passed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--self-test" in args:
+        self_test()
+        sys.exit(0)
+    with open(args[0], 'r', encoding='utf-8') as f:
+        loaded = json.load(f)
+    print(render_text(loaded))
+    if "--html" in args:
+        output = args[args.index("--html") + 1]
+        atomic_write_text(output, render_html(loaded))
+        print(f"   [trace] HTML: {output}")
+    if "--chrome" in args:
+        output = args[args.index("--chrome") + 1]
+        atomic_write_text(output, json.dumps(to_chrome_trace(loaded)))
+        print(f"   [trace] Chrome trace: {output}")
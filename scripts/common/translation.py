@@ -0,0 +1,471 @@
+"""
+역사 봇 포스트의 영어판 (번역 메모리 + 용어집).
+
+포스트 전체를 모델에 보내면 매일 모델 비용이 두 배가 되므로, 포스트를 줄 단위 조각(segment)으로 나누고
+이미 번역한 조각은 번역 메모리(TM)에서 재사용해 처음 보는 조각만 묶어서(batch) 번역을 요청합니다.
+
+* 조각: 제목과 본문의 각 줄에서 마크다운 표시(`## `, ` * `, `1. `, `> `)와 고정 라벨(FIXED_LABELS: '원어:', '시기:', 섹션 헤더)을
+  떼어 낸 나머지입니다. 헤더, 면책 문구처럼 늘 같은 줄은 FIXED 로 번역이 정해져 있고, 한글이 없는 줄(인용 링크, 영어 원어)은 그대로 둡니다.
+* 번역 메모리: scripts/run_data/translation_memory.json 에 {조각 해시: 원문, 번역, 사용 횟수} 와 포스트별 원문 해시를 둡니다.
+  원문이 바뀌지 않았고 영어판이 있는 포스트는 다시 읽지 않습니다.
+* 용어집: 본문의 '인공지능(Artificial Intelligence)' 같은 한글(영어) 표기를 모아 scripts/run_data/translation_glossary.json 에
+  쌓고(GLOSSARY 가 우선), 요청마다 그 묶음에 나오는 용어만 함께 보냅니다.
+* 묶음: 처음 보는 조각을 BATCH_TOKEN_BUDGET 토큰(로컬 추정) 단위로 묶어 JSON {id: 번역} 으로 받습니다.
+  빠진 조각이 있는 포스트는 쓰지 않고 다음 실행에서 다시 시도합니다.
+* 출력: _posts/en/<연재>/<같은 파일명> (permalink /en/<연재>/<slug>/). 카테고리는 원래 연재와 다른 en_<연재> 이고 hidden: true 이므로
+  연재 보관함(site.categories.<연재>), 홈/연도별 목록에는 나오지 않습니다.
+* 보고: 실행마다 TM 적중률과, 포스트 전체를 번역했을 때(추정) 대비 아낀 토큰을 출력하고 scripts/run_data/translation_stats.jsonl 에 남깁니다.
+
+BOT_TRANSLATE=1 이면 발행 후처리 단계(common/publish.py)에서 새 포스트를 바로 번역합니다.
+
+usage: python -m common.translation [series ...] [--all] [--dry-run] [--report] [--self-test]
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+from datetime import datetime
+
+from common.model_router import ModelRouter, route
+from common.posts import DISCLAIMER, POSTS_ROOT, SHARED_RUN_DATA_DIR, list_posts, read_post, relative_path
+from common.state_store import append_jsonl, atomic_write_text
+from common.tokens import estimate_output_tokens, estimate_tokens
+
+TRANSLATED_SERIES = ["ai_history", "cs_history"]
+EN_POSTS_ROOT = os.path.join(POSTS_ROOT, "en")
+TM_PATH = os.path.join(SHARED_RUN_DATA_DIR, "translation_memory.json")
+GLOSSARY_PATH = os.path.join(SHARED_RUN_DATA_DIR, "translation_glossary.json")
+STATS_PATH = os.path.join(SHARED_RUN_DATA_DIR, "translation_stats.jsonl")
+TRANSLATE_ON_PUBLISH = os.environ.get("BOT_TRANSLATE", "0") == "1"
+BATCH_TOKEN_BUDGET = int(os.environ.get("BOT_TRANSLATE_BATCH_TOKENS", "4000"))
+MODEL_ROUTES = {
+    "translate": [route("standard", slo=180, thinking_budget=0), route("fast", thinking_budget=0)],
+}
+
+EN_DISCLAIMER = "*This content was generated by AI and may contain errors or inaccuracies.*"
+# 줄 전체(마크다운 표시 제외)가 이 문구이면 정해진 번역을 씁니다.
+FIXED = {
+    "⚡ 무엇이 혁명적이었나? (Deep Dive)": "⚡ What Made It Revolutionary? (Deep Dive)",
+    "📅 내일의 키워드 예고": "📅 Coming Up Tomorrow",
+    "📚 참고 문헌": "📚 References",
+    "🛑 긴 여정의 마침표": "🛑 The End of a Long Journey",
+    DISCLAIMER: EN_DISCLAIMER,
+}
+# 줄이 이 라벨로 시작하면 라벨은 정해진 번역을 쓰고 나머지만 번역합니다.
+FIXED_LABELS = [
+    ("🕰️ 오늘의 키워드:", "🕰️ Today's Keyword:"),
+    ("🔗 현대와의 연결:", "🔗 Connection to Today:"),
+    ("원어:", "Original name:"),
+    ("시기:", "Period:"),
+]
+# 자동 추출보다 우선하는 용어 (여러 단어로 된 한글 용어는 자동 추출이 어렵습니다)
+GLOSSARY = {
+    "인공지능": "Artificial Intelligence",
+    "인공 신경망": "Artificial Neural Network",
+    "신경망": "Neural Network",
+    "딥러닝": "Deep Learning",
+    "머신러닝": "Machine Learning",
+    "대규모 언어 모델": "Large Language Model",
+    "트랜스포머": "Transformer",
+    "퍼셉트론": "Perceptron",
+    "역사 봇": "History Bot",
+}
+
+TRANSLATOR_PROMPT = """
+You translate Korean technical-history blog posts into natural, accurate English.
+You receive JSON {"glossary": {korean: english}, "segments": [{"id": ..., "text": ...}]}.
+Each segment is one line (a sentence, a paragraph, a list item, or a heading without its Markdown marker).
+Rules:
+* Translate every segment independently and return JSON {"<id>": "<English translation>"} with every id.
+* Keep inline Markdown (**bold**, `code`, links) and emoji exactly where they are. Do not add Markdown markers or line breaks.
+* Use the glossary translations for those terms. When the text already gives the English in parentheses, do not repeat it.
+* The bot introduces itself (e.g. 'AI 인공지능 역사 봇'); translate it as 'AI History Bot' / 'CS History Bot'.
+"""
+
+_HANGUL = re.compile(r"[가-힣]")
+_MARKUP = re.compile(r"^(\s*(?:#{1,6}\s+|[*-]\s+|\d+\.\s+|>\s*)*)")
+_TITLE_DAY = re.compile(r"^(Day\s+\d+\s*:\s*)")
+# 자동 용어 추출: 괄호 바로 앞의 한글 한 단어와 괄호 안의 영어 (4단어 이하)
+_TERM = re.compile(r"([가-힣]{2,})\s?\(([A-Z][A-Za-z0-9.&'/-]*(?: [A-Za-z0-9.&'/-]+){0,3})\)")
+
+
+def segment_key(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def split_line(line, title=False):
+    """[("keep", 문자열) | ("unit", 번역할 조각)] — 이어 붙이면 원래 줄이 됩니다(unit 을 번역으로 바꾸면 영어 줄)."""
+    pieces = []
+    prefix_match = _TITLE_DAY.match(line) if title else _MARKUP.match(line)
+    prefix = prefix_match.group(1) if prefix_match else ""
+    if prefix:
+        pieces.append(("keep", prefix))
+    rest = line[len(prefix):]
+    stripped = rest.strip()
+    if not _HANGUL.search(rest):
+        return pieces + [("keep", rest)] if rest else pieces
+    if stripped in FIXED:
+        return pieces + [("keep", FIXED[stripped])]
+    for label, english in FIXED_LABELS:
+        if stripped.startswith(label):
+            remainder = stripped[len(label):].strip()
+            pieces.append(("keep", english + " "))
+            return pieces + ([("unit", remainder)] if _HANGUL.search(remainder) else [("keep", remainder)])
+    return pieces + [("unit", stripped)]
+
+
+def parse_post(path):
+    post = read_post(path)
+    lines = post['body'].splitlines()
+    return {
+        "path": path,
+        "post": post,
+        "source_hash": segment_key(post['title'] + "\n" + post['body']),
+        "title": split_line(post['title'], title=True),
+        "lines": [split_line(line) for line in lines],
+    }
+
+
+def units_of(parsed):
+    for pieces in [parsed['title']] + parsed['lines']:
+        for kind, text in pieces:
+            if kind == "unit":
+                yield text
+
+
+def extract_terms(text):
+    return {term: english for term, english in _TERM.findall(text)}
+
+
+def en_path(path):
+    series = os.path.basename(os.path.dirname(path))
+    return os.path.join(EN_POSTS_ROOT, series, os.path.basename(path))
+
+
+def render_en(parsed, translations):
+    def render(pieces):
+        return "".join(translations[text] if kind == "unit" else text for kind, text in pieces)
+
+    post = parsed['post']
+    title = render(parsed['title']).replace('"', '\\"')
+    body = "\n".join(render(pieces) for pieces in parsed['lines'])
+    header = f"""
+---
+title:  "{title}"
+categories:
+  - en_{post['category']}
+permalink: /en{post['url']}
+hidden: true
+locale: en-US
+original: {post['url']}
+toc: true
+toc_sticky: true
+comments: true
+---
+"""
+    note = f"*This is the English edition of [the original Korean post]({post['url']}).*"
+    return header.strip() + "\n\n" + note + "\n\n" + body.rstrip() + "\n"
+
+
+# --- [Memory] ---
+class TranslationMemory:
+    def __init__(self, path=TM_PATH, glossary_path=GLOSSARY_PATH):
+        self.path = path
+        self.glossary_path = glossary_path
+        data = self._read(path) or {}
+        self.segments = data.get("segments", {})
+        self.posts = data.get("posts", {})
+        self.auto_terms = self._read(glossary_path) or {}
+
+    @staticmethod
+    def _read(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def glossary(self):
+        return {**self.auto_terms, **GLOSSARY}
+
+    def lookup(self, text):
+        entry = self.segments.get(segment_key(text))
+        return entry['target'] if entry and entry['source'] == text else None
+
+    def use(self, text):
+        self.segments[segment_key(text)]['uses'] += 1
+
+    def add(self, text, target):
+        self.segments[segment_key(text)] = {"source": text, "target": target, "uses": 1,
+                                            "added": datetime.now().strftime('%Y-%m-%d')}
+
+    def learn_terms(self, text):
+        for term, english in extract_terms(text).items():
+            self.auto_terms.setdefault(term, english)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write_text(self.path, json.dumps({"segments": self.segments, "posts": self.posts},
+                                                ensure_ascii=False, indent=1, sort_keys=True))
+        atomic_write_text(self.glossary_path, json.dumps(self.auto_terms, ensure_ascii=False, indent=2, sort_keys=True))
+
+
+def batches(texts, budget=BATCH_TOKEN_BUDGET):
+    """조각 목록을 추정 토큰 합이 budget 을 넘지 않게 나눕니다 (조각 하나가 budget 보다 크면 혼자 한 묶음)."""
+    batch, total = [], 0
+    for text in texts:
+        cost = estimate_output_tokens(text)
+        if batch and total + cost > budget:
+            yield batch
+            batch, total = [], 0
+        batch.append(text)
+        total += cost
+    if batch:
+        yield batch
+
+
+def batch_glossary(texts, glossary):
+    joined = "\n".join(texts)
+    return {term: english for term, english in glossary.items() if term in joined}
+
+
+class GeminiTranslator:
+    """묶음 하나를 모델로 번역합니다. 반환값은 {id: 번역}."""
+
+    def __init__(self, run_data_dir=SHARED_RUN_DATA_DIR):
+        self.router = ModelRouter(MODEL_ROUTES, run_data_dir)
+        self.client = None
+
+    def __call__(self, segments, glossary):
+        from google import genai
+        from google.genai import types
+        if self.client is None:
+            self.client = genai.Client()
+        config = types.GenerateContentConfig(
+            system_instruction=TRANSLATOR_PROMPT,
+            temperature=0.2,
+            response_mime_type='application/json',
+        )
+        prompt = json.dumps({"glossary": glossary, "segments": [{"id": i, "text": t} for i, t in segments.items()]},
+                            ensure_ascii=False)
+
+        def parse(response):
+            result = json.loads(response.text)
+            if not isinstance(result, dict):
+                raise ValueError("translation response is not a JSON object")
+            return result
+
+        return self.router.generate(self.client, "translate", prompt, config, validate=parse)
+
+    def usage(self):
+        ok = [d for d in self.router.decisions if d["outcome"] == "ok"]
+        return sum((d.get("prompt_tokens") or d["estimated_prompt_tokens"]) + (d.get("output_tokens") or 0)
+                   + (d.get("thinking_tokens") or 0) for d in ok)
+
+
+# --- [Pipeline] ---
+def pending_posts(paths, memory, force=False):
+    """원문이 바뀌었거나 영어판이 없는 포스트"""
+    result = []
+    for path in paths:
+        parsed = parse_post(path)
+        if force or memory.posts.get(relative_path(path)) != parsed['source_hash'] or not os.path.exists(en_path(path)):
+            result.append(parsed)
+    return result
+
+
+def translate_posts(paths, translator=None, memory=None, force=False, dry_run=False):
+    """영어판을 쓰고 통계를 반환합니다. translator 는 ({id: 원문}, 용어집) -> {id: 번역} 입니다."""
+    memory = memory or TranslationMemory()
+    translator = translator or (None if dry_run else GeminiTranslator())
+    parsed_posts = pending_posts(paths, memory, force)
+    stats = {"ts": datetime.now().isoformat(timespec="seconds"), "posts": len(parsed_posts), "written": 0,
+             "segments": 0, "tm_hits": 0, "fixed": 0, "new_segments": 0, "batches": 0, "failed_segments": 0,
+             "model_tokens": 0, "baseline_tokens": 0}
+
+    unseen = []
+    for parsed in parsed_posts:
+        memory.learn_terms(parsed['post']['body'])
+        for pieces in [parsed['title']] + parsed['lines']:
+            stats['fixed'] += sum(1 for kind, text in pieces if kind == "keep" and text.strip() and _is_fixed(text))
+        for text in units_of(parsed):
+            stats['segments'] += 1
+            if memory.lookup(text) is not None:
+                stats['tm_hits'] += 1
+                memory.use(text)
+            elif text not in unseen:
+                unseen.append(text)
+    stats['new_segments'] = len(unseen)
+
+    if dry_run:
+        stats['batches'] = sum(1 for _ in batches(unseen))
+    else:
+        glossary = memory.glossary()
+        for batch in batches(unseen):
+            stats['batches'] += 1
+            ids = {str(i): text for i, text in enumerate(batch)}
+            try:
+                result = translator(ids, batch_glossary(batch, glossary))
+            except Exception as e:
+                print(f"⚠️ 번역 묶음 실패 ({len(batch)}개 조각): {str(e)[:200]}")
+                stats['failed_segments'] += len(batch)
+                continue
+            for i, text in ids.items():
+                target = result.get(i)
+                if isinstance(target, str) and target.strip():
+                    memory.add(text, target.strip())
+                else:
+                    stats['failed_segments'] += 1
+
+        for parsed in parsed_posts:
+            translations = {text: memory.lookup(text) for text in units_of(parsed)}
+            if any(target is None for target in translations.values()):
+                print(f"⏭️ 번역이 빠진 조각이 있어 건너뜁니다: {parsed['post']['path']}")
+                continue
+            output = render_en(parsed, translations)
+            target_path = en_path(parsed['path'])
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            atomic_write_text(target_path, output)
+            memory.posts[relative_path(parsed['path'])] = parsed['source_hash']
+            stats['written'] += 1
+            # 포스트 전체를 한 번에 번역했다면 들었을 토큰 (입력: 프롬프트 + 원문, 출력: 영어판)
+            source = parsed['post']['title'] + "\n" + parsed['post']['body']
+            stats['baseline_tokens'] += estimate_tokens(TRANSLATOR_PROMPT, source) + estimate_output_tokens(output)
+        memory.save()
+        stats['model_tokens'] = translator.usage() if hasattr(translator, "usage") else 0
+        _append_stats(stats)
+    print_stats(stats, dry_run)
+    return stats
+
+
+def _is_fixed(text):
+    text = text.strip()
+    return text in FIXED.values() or any(text == english for _, english in FIXED_LABELS)
+
+
+def _append_stats(stats):
+    append_jsonl(STATS_PATH, stats)
+
+
+def hit_rate(stats):
+    """모델 없이 채운 비율: (TM 적중 + 고정 번역) / (번역할 조각 + 고정 번역)"""
+    total = stats['segments'] + stats['fixed']
+    return (stats['tm_hits'] + stats['fixed']) / total if total else 0.0
+
+
+def print_stats(stats, dry_run=False):
+    print(f"🌐 영어판 {'(dry-run) ' if dry_run else ''}포스트 {stats['posts']}개 중 {stats['written']}개 작성")
+    print(f"   조각 {stats['segments']}개: TM 적중 {stats['tm_hits']}, 새 조각 {stats['new_segments']} "
+          f"({stats['batches']}개 묶음, 실패 {stats['failed_segments']}), 고정 번역 {stats['fixed']}")
+    print(f"   TM 적중률 {stats['tm_hits'] / stats['segments'] if stats['segments'] else 0:.1%}, "
+          f"모델 없이 채운 비율 {hit_rate(stats):.1%}")
+    if stats['baseline_tokens']:
+        saved = stats['baseline_tokens'] - stats['model_tokens']
+        print(f"   토큰: 사용 {stats['model_tokens']:,} / 전체 번역 시 (추정) {stats['baseline_tokens']:,} "
+              f"→ {saved:,} 절약 ({saved / stats['baseline_tokens']:.0%})")
+
+
+def report():
+    if not os.path.exists(STATS_PATH):
+        print("🌐 번역 기록이 없습니다.")
+        return
+    with open(STATS_PATH, 'r', encoding='utf-8') as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    totals = {key: sum(run.get(key, 0) for run in runs)
+              for key in ("posts", "written", "segments", "tm_hits", "fixed", "new_segments", "model_tokens", "baseline_tokens")}
+    memory = TranslationMemory()
+    print(f"🌐 번역 기록 {len(runs)}회, TM {len(memory.segments)}개 조각, 용어 {len(memory.glossary())}개")
+    print_stats({**totals, "batches": sum(run.get("batches", 0) for run in runs),
+                 "failed_segments": sum(run.get("failed_segments", 0) for run in runs)})
+
+
+def update(post_paths):
+    """발행 후처리 단계: BOT_TRANSLATE=1 일 때 새 역사 봇 포스트를 번역합니다."""
+    if not TRANSLATE_ON_PUBLISH:
+        return
+    paths = [p for p in post_paths if os.path.basename(os.path.dirname(os.path.abspath(p))) in TRANSLATED_SERIES]
+    if paths:
+        translate_posts(paths)
+
+
+def self_test():
+    import tempfile
+    global EN_POSTS_ROOT, STATS_PATH
+
+    day1 = """---
+title:  "Day 1: 퍼셉트론의 탄생"
+categories:
+  - ai_history
+---
+
+안녕하세요! AI 인공지능 역사 봇입니다.
+
+## 🕰️ 오늘의 키워드: 퍼셉트론
+ * 원어: Perceptron
+ * 시기: 1958년 (학습하는 기계)
+
+프랭크 로젠블랫은 인공 신경망(Artificial Neural Network)을 하드웨어로 만들었습니다.
+
+## ⚡ 무엇이 혁명적이었나? (Deep Dive)
+1.  **학습:** 가중치를 스스로 고쳤습니다.
+
+## 📚 참고 문헌
+* [example.com](https://example.com/a)
+
+
+{DISCLAIMER}""".replace("{DISCLAIMER}", DISCLAIMER)
+    day2 = day1.replace("Day 1: 퍼셉트론의 탄생", "Day 2: 다층 퍼셉트론").replace("1958년 (학습하는 기계)", "1969년 (한계의 발견)")
+
+    calls = []
+
+    def fake_translator(segments, glossary):
+        calls.append((dict(segments), dict(glossary)))
+        return {i: f"<en:{len(text)}>" for i, text in segments.items() if "가중치" not in text or len(calls) > 1}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = EN_POSTS_ROOT, STATS_PATH
+        EN_POSTS_ROOT, STATS_PATH = os.path.join(tmp, "en"), os.path.join(tmp, "stats.jsonl")
+        try:
+            paths = []
+            for name, text in (("2026-01-01-day1.md", day1), ("2026-01-02-day2.md", day2)):
+                path = os.path.join(tmp, "ai_history", name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                atomic_write_text(path, text)
+                paths.append(path)
+            memory = TranslationMemory(os.path.join(tmp, "tm.json"), os.path.join(tmp, "glossary.json"))
+
+            # 첫 실행: 두 포스트의 공통 줄은 한 번만 요청하고, '가중치' 조각이 빠져 포스트는 쓰이지 않습니다.
+            first = translate_posts(paths[:1], fake_translator, memory)
+            assert first['written'] == 0 and first['failed_segments'] == 1
+            assert calls[0][1].get("인공 신경망") == "Artificial Neural Network"
+            # 두 번째 실행: 빠졌던 조각만 다시 요청하고 day1 을 씁니다.
+            second = translate_posts(paths[:1], fake_translator, memory)
+            assert second['written'] == 1 and second['new_segments'] == 1 and len(calls[1][0]) == 1
+            # day2 는 제목과 '시기' 나머지만 새 조각입니다.
+            third = translate_posts(paths, fake_translator, memory)
+            assert third['posts'] == 1 and third['new_segments'] == 2, third
+            assert third['tm_hits'] == third['segments'] - 2
+            output = open(os.path.join(EN_POSTS_ROOT, "ai_history", "2026-01-02-day2.md"), encoding='utf-8').read()
+            assert "Day 2: <en:" in output and " * Original name: Perceptron" in output and " * Period: <en:" in output
+            assert "## ⚡ What Made It Revolutionary? (Deep Dive)" in output and EN_DISCLAIMER in output
+            assert "* [example.com](https://example.com/a)" in output and "1.  **" not in output and "1.  <en:" in output
+            assert "  - en_ai_history\n" in output and "  - ai_history\n" not in output and "hidden: true" in output
+            assert "permalink: /en/ai_history/day2/" in output and "original: /ai_history/day2/" in output
+            assert not _HANGUL.search(output.split("---", 2)[2])
+            # 바뀌지 않은 포스트는 다시 읽지 않습니다.
+            assert translate_posts(paths, fake_translator, memory)['posts'] == 0
+        finally:
+            EN_POSTS_ROOT, STATS_PATH = saved
+    print("✅ translation self-test passed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--self-test" in args:
+        self_test()
+    elif "--report" in args:
+        report()
+    else:
+        series = [a for a in args if not a.startswith("--")] or TRANSLATED_SERIES
+        all_paths = [path for name in series for path in list_posts(name)]
+        translate_posts(all_paths, force="--all" in args, dry_run="--dry-run" in args)
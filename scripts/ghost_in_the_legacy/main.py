@@ -1,16 +1,46 @@
 import os
-from google import genai
-from google.genai import types
-import httpx
-import asyncio
+import re
 import json
 from datetime import datetime
 import traceback
 import sys
 import time
 
-MODEL_NAME = "gemini-2.5-flash"
+# google.genai / httpx / asyncio 는 실제로 모델을 호출할 때만 import 합니다.
+sys.path.append(os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+from common.artifacts import ArtifactStore, citation_entries, new_artifact
+from common.posts import DISCLAIMER, read_post
+from common.publish import run_publish_stages
+from common.state_store import StateStore
+from common.run_guard import RunLock, find_duplicate_run, run_key, run_slot
+from common.context_cache import ContextCache
+from common.model_router import ModelRouter, route
+from common.thinking_budget import ThinkingController, budget_ladder
+from common.tracing import tracer
+from common.story_completion import assess
+from common.tokens import trim_items
+
+# 소설 작성과 JSON 정리(상태 요약)는 서로 다른 등급/thinking 예산을 씁니다. 오류나 SLO 초과 시 다음 단계로 넘어갑니다.
+# 마지막 단계는 SLO 없이 기다리므로 thinking 예산을 고정합니다 (-1 은 무제한).
+MODEL_ROUTES = {
+    "write": [route("standard", slo=300, thinking_budget=-1), route("fast", thinking_budget=8192)],
+    "summarize_state": [route("fast", slo=90, thinking_budget=2048), route("standard", thinking_budget=4096)],
+}
+# 작업별 첫 단계 thinking 설정의 범위. 재시도 없이 통과하면 낮추고 실패하면 올립니다. (common/thinking_budget.py)
+THINKING_POLICY = {
+    "write": budget_ladder(2048, -1),
+    "summarize_state": budget_ladder(0, 2048),
+}
 STATE_FILE = "bot_state.json"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RUN_DATA_DIR = os.path.join(SCRIPT_DIR, "run_data")
+POSTS_DIR = os.path.normpath(os.path.join(SCRIPT_DIR, "..", "..", "_posts", "ghost_in_the_legacy"))
+# 워크플로 cron 이 하루 두 번이므로, 그 이상의 (수동) 실행은 중복으로 봅니다. --force 로 무시할 수 있습니다.
+MAX_RUNS_PER_DAY = 2
+HEAVY_IMPORTS = ["google.genai", "httpx", "asyncio"]
+# 작가 프롬프트에 넣는 누적 플롯 로그의 최대 토큰 수 (로컬 추정, common/tokens.py). 기본 0 은 전체 로그를 넣습니다.
+# 값을 주면 오래된 요약부터 빼고, 뺀 단락 수와 범위를 로그 맨 앞에 한 줄로 남깁니다.
+PLOT_LOG_TOKEN_BUDGET = int(os.environ.get("BOT_PLOT_LOG_TOKEN_BUDGET", "0"))
 
 DEFAULT_STATE = {
     "day_count": 0,
@@ -94,19 +124,73 @@ DEFAULT_STATE = {
     "최근 생성 단락": ""
 }
 
+# 상태는 스냅샷(bot_state.json) + 추가 전용 저널(bot_state.journal)로 저장됩니다.
+state_store = StateStore(SCRIPT_DIR, DEFAULT_STATE, snapshot_name=STATE_FILE)
+
 def load_state():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    state_path = os.path.join(script_dir, STATE_FILE)
-    if not os.path.exists(state_path):
-        return DEFAULT_STATE
-    with open(state_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    return state_store.load()
 
 def save_state(state):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    state_path = os.path.join(script_dir, STATE_FILE)
-    with open(state_path, 'w', encoding='utf-8') as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+    state_store.save(state)
+
+# 생성 결과와 인용(사용/미사용, 웹/맵)은 artifacts/ 에 저장되고, 마크다운은 render_post 로 만듭니다.
+artifact_store = ArtifactStore(SCRIPT_DIR)
+CITATION_SECTIONS = [
+    ("used_web", "웹 검색 (사용됨)"),
+    ("unused_web", "웹 검색 (미사용됨)"),
+    ("used_map", "맵 검색 (사용됨)"),
+    ("unused_map", "맵 검색 (미사용됨)"),
+]
+
+def render_post(artifact):
+    header = f"""
+---
+title:  "{artifact['title']}"
+categories:
+  - ghost_in_the_legacy
+toc: true
+toc_sticky: true
+comments: true
+---
+"""
+
+    body = f"""
+## 본문
+{artifact['text']}
+"""
+
+    citations = artifact['citations']
+    if any(citations.get(bucket) for bucket, _ in CITATION_SECTIONS):
+        body += "\n\n---\n\n"
+        for bucket, section in CITATION_SECTIONS:
+            citation = "".join(f"* [{c['title']}]({c['url']})\n" for c in citations.get(bucket, []))
+            if citation:
+                body += f"\n\n ## {section}\n" + citation
+
+    body += f"\n\n---\n\n{DISCLAIMER}"
+    return header.strip() + "\n\n" + body
+
+def artifact_from_post(path):
+    """아티팩트가 없던 시절의 포스트를 아티팩트로 변환합니다."""
+    post = read_post(path)
+    body = post['body'][len("## 본문\n"):] if post['body'].startswith("## 본문\n") else post['body']
+    text, _, rest = body.partition("\n\n\n---\n\n")
+    citations = {bucket: [] for bucket, _ in CITATION_SECTIONS}
+    sections = dict((name, bucket) for bucket, name in CITATION_SECTIONS)
+    current = None
+    for line in rest.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            current = sections.get(line[3:])
+            continue
+        match = re.match(r"^\* \[(.*)\]\((.*)\)$", line)
+        if match and current:
+            citations[current].append({"title": match.group(1), "url": match.group(2)})
+    day = int(re.search(r"day(\d+)\.md$", path).group(1))
+    artifact = new_artifact(path, day, citations, [], title=post['title'], text=text, plot_summary=None)
+    artifact['source'] = "backfill"
+    artifact['created'] = post['date']
+    return artifact
 
 async def _get_final_url_httpx(initial_url, client):
     try:
@@ -116,6 +200,8 @@ async def _get_final_url_httpx(initial_url, client):
         return initial_url
 
 async def resolve_all_urls_async(urls_to_fetch):
+    import httpx
+    import asyncio
     async with httpx.AsyncClient() as client:
         tasks = [_get_final_url_httpx(uri, client) for uri in urls_to_fetch]
         resolved_urls = await asyncio.gather(*tasks)
@@ -124,8 +210,10 @@ async def resolve_all_urls_async(urls_to_fetch):
 def change_chunk_url_to_real_url(chunks):
     if not chunks:
         return {}
+    import asyncio
     urls_to_fetch = list(chunks.keys())
-    resolved_urls = asyncio.run(resolve_all_urls_async(urls_to_fetch))
+    with tracer.span("resolve_urls", urls=len(urls_to_fetch)):
+        resolved_urls = asyncio.run(resolve_all_urls_async(urls_to_fetch))
     ret = {}
     for i, initial_uri in enumerate(urls_to_fetch):
         title = chunks[initial_uri]
@@ -165,7 +253,16 @@ def get_grounding_citations(response):
 
     return change_chunk_url_to_real_url(unique_used_web_chunks), change_chunk_url_to_real_url(unique_unused_web_chunks), change_chunk_url_to_real_url(unique_used_map_chunks), change_chunk_url_to_real_url(unique_unused_map_chunks)
 
-def get_llm_call_result(system_message, human_message, temperature, top_p, use_tools = True, return_json = False):
+# 고정된 시스템 메시지(+도구)와 시놉시스는 TTL 안에서 다시 쓰일 때만 컨텍스트 캐시로 참조합니다.
+# 실행당 작성 호출이 한 번이라 보통은 그대로 보냅니다. (common/context_cache.py)
+context_cache = ContextCache()
+thinking = ThinkingController(RUN_DATA_DIR, THINKING_POLICY)
+router = ModelRouter(MODEL_ROUTES, RUN_DATA_DIR, context_cache=context_cache, thinking=thinking)
+
+def get_llm_call_result(system_message, human_message, temperature, top_p, use_tools = True, return_json = False, task = "write", cache_prefix = None):
+    from google import genai
+    from google.genai import types
+
     client = genai.Client()
 
     tools = []
@@ -185,24 +282,20 @@ def get_llm_call_result(system_message, human_message, temperature, top_p, use_t
         temperature=temperature,
         top_p=top_p,
         max_output_tokens=65536,
-        thinking_config=types.ThinkingConfig(thinking_budget=-1)
     )
     if return_json:
         config.response_mime_type = 'application/json'
 
     for attempt in range(3):
         try:
-            response = client.models.generate_content(
-                model=MODEL_NAME,
-                contents=human_message,
-                config=config,
-            )
+            response = router.generate(client, task, human_message, config, cache_prefix=cache_prefix)
             break
         except Exception as e:
             print(f"Attempt {attempt + 1} failed: {e}")
             time.sleep(60*(2**attempt))
             if attempt == 2:
                 raise
+    thinking.observe(task, retries=attempt)
 
     unique_used_web_chunks, unique_unused_web_chunks, unique_used_map_chunks, unique_unused_map_chunks = get_grounding_citations(response)
 
@@ -226,17 +319,19 @@ def generate_next_story(synopsys, story_bible, recent_context, recent_plot_log):
 * 지금 생성하는 분량이 스토리의 최종 끝이라면 마지막에 '지금까지 이 소설을 읽어주셔서 감사합니다'를 붙여주세요.
 * 만약 주어진 '최근 생성 단락' 부분을 보았을 때 이미 스토리가 끝났다고 판단된다면 (예: 마지막 줄이 '지금까지 이 소설을 읽어주셔서 감사합니다' 라면) 빈 문자열을 리턴하세요.
 """
-    human_message = f"""
+    # 시놉시스는 매일 같으므로 캐시할 수 있는 앞부분으로 분리합니다. (캐시를 못 쓰면 이어 붙여 보냅니다)
+    synopsys_message = f"""
 ===시놉시스===
 {synopsys}
-===스토리 바이블===
+"""
+    human_message = f"""===스토리 바이블===
 {story_bible}
 ===최근 생성 단락===
 {recent_context}
 ===누적 플롯 로그===
 {recent_plot_log}
 """
-    return get_llm_call_result(system_message, human_message, temperature=0.8, top_p=0.9)
+    return get_llm_call_result(system_message, human_message, temperature=0.8, top_p=0.9, cache_prefix=synopsys_message)
 
 def generate_next_state(generated_text, story_bible):
     system_message = """
@@ -263,90 +358,140 @@ def generate_next_state(generated_text, story_bible):
 {story_bible}
 """
 
-    return get_llm_call_result(system_message, human_message, temperature=0, top_p=None, use_tools=False, return_json=True)
+    return get_llm_call_result(system_message, human_message, temperature=0, top_p=None, use_tools=False, return_json=True, task="summarize_state")
+
+# --- [Completion] ---
+# 소설이 끝났는지는 모델 없이 판단합니다 (종료 문구, 시놉시스 단계 진행도: common/story_completion.py).
+# 완결되면 state['완결'] 에 기록하고, 이후 실행은 main() 첫머리에서 바로 끝납니다.
+def assess_completion(state):
+    return assess(state['시놉시스'], state['누적 플롯 로그'], state['최근 생성 단락'])
+
+def is_finished(state):
+    return bool(state.get('완결')) or assess_completion(state)['finished']
 
-def main():
-    state = load_state()
+def mark_finished(state, reason, phase):
+    state['완결'] = {"reason": reason, "day": state['day_count'], "phase": phase,
+                   "date": datetime.now().strftime('%Y-%m-%d')}
+    print(f"🏁 소설 완결 처리: Day {state['day_count']} ({reason}, {phase})")
+
+def advance_state(state, text, updated_metadata_dict, slot):
+    state['최근 생성 단락'] = text
+    state['누적 플롯 로그'].append(updated_metadata_dict['plot_summary'])
+    state['스토리 바이블'] = updated_metadata_dict['story_bible']
+    state['day_count'] = state['day_count'] + 1
+    # 같은 실행 칸에서 다시 실행되면 만들게 될 대상(day_count + 1)의 키를 남겨, 그 실행이 중복으로 건너뛰게 합니다.
+    state['last_run_key'] = run_key(slot, state['day_count'] + 1)
+
+def plot_log_for_prompt(plot_log, budget=PLOT_LOG_TOKEN_BUDGET):
+    """작가 프롬프트용 누적 플롯 로그. budget 을 넘으면 오래된 요약을 빼고 빠진 부분을 알리는 항목을 앞에 둡니다."""
+    if not budget:
+        return plot_log
+    kept = trim_items(plot_log, budget)
+    dropped = plot_log[:len(plot_log) - len(kept)]
+    if not dropped:
+        return plot_log
+    print(f"✂️ 누적 플롯 로그 {len(plot_log)}개 중 앞의 {len(dropped)}개를 프롬프트에서 뺍니다. (BOT_PLOT_LOG_TOKEN_BUDGET={budget})")
+    note = (f"(1~{len(dropped)}번째 단락의 요약 {len(dropped)}개는 길이 제한으로 생략했습니다. "
+            f"처음: {dropped[0]} / 마지막: {dropped[-1]})")
+    return [note] + kept
+
+def publish_next_day(state, today, slot):
     synopsys = json.dumps(state['시놉시스'])
     story_bible = json.dumps(state['스토리 바이블'])
     recent_context = str(state['최근 생성 단락'])
-    recent_plot_log = state['누적 플롯 로그']
+    recent_plot_log = plot_log_for_prompt(state['누적 플롯 로그'])
     day_count = state['day_count']
-    text, unique_used_web_chunks, unique_unused_web_chunks, unique_used_map_chunks, unique_unused_map_chunks = generate_next_story(synopsys, story_bible, recent_context, recent_plot_log)
+    with tracer.span("write_story"):
+        text, unique_used_web_chunks, unique_unused_web_chunks, unique_used_map_chunks, unique_unused_map_chunks = generate_next_story(synopsys, story_bible, recent_context, recent_plot_log)
     print(text)
     print(unique_used_web_chunks)
     print(unique_unused_web_chunks)
     print(unique_used_map_chunks)
     print(unique_unused_map_chunks)
     if not text:
+        # 작가 프롬프트는 이미 끝난 이야기에 빈 문자열을 돌려주도록 지시합니다.
+        mark_finished(state, "empty_response", assess_completion(state)['phase'])
+        save_state(state)
         return
-    updated_metadata, _, _, _, _ = generate_next_state(text, story_bible)
+    with tracer.span("summarize_state"):
+        updated_metadata, _, _, _, _ = generate_next_state(text, story_bible)
     print(updated_metadata)
+    router.report()
+    context_cache.report(router.decisions)
     updated_metadata_dict = json.loads(updated_metadata)
-    state['최근 생성 단락'] = text
-    state['누적 플롯 로그'].append(updated_metadata_dict['plot_summary'])
-    state['스토리 바이블'] = updated_metadata_dict['story_bible']
-    state['day_count'] = state['day_count'] + 1
-
-    title = f"Ghost in the Legacy - Day {day_count}"
-
-    header = f"""
----
-title:  "{title}"
-categories:
-  - ghost_in_the_legacy
-toc: true
-toc_sticky: true
-comments: true
----
-"""
-
-    body = f"""
-## 본문
-{text}
-"""
-
-    if unique_used_web_chunks or unique_unused_web_chunks or unique_used_map_chunks or unique_unused_map_chunks:
-        body += "\n\n---\n\n"
-        used_web_citation = ""
-        for url, title in unique_used_web_chunks.items():
-            used_web_citation += f"* [{title}]({url})\n"
-        if used_web_citation:
-            body += "\n\n ## 웹 검색 (사용됨)\n" + used_web_citation
-
-        unused_web_citation = ""
-        for url, title in unique_unused_web_chunks.items():
-            unused_web_citation += f"* [{title}]({url})\n"
-        if unused_web_citation:
-            body += "\n\n ## 웹 검색 (미사용됨)\n" + unused_web_citation
-
-        used_map_citation = ""
-        for url, title in unique_used_map_chunks.items():
-            used_map_citation += f"* [{title}]({url})\n"
-        if used_map_citation:
-            body += "\n\n ## 맵 검색 (사용됨)\n" + used_map_citation
-
-        unused_web_citation = ""
-        for url, title in unique_unused_map_chunks.items():
-            unused_web_citation += f"* [{title}]({url})\n"
-        if unused_web_citation:
-            body += "\n\n ## 맵 검색 (미사용됨)\n" + unused_web_citation
-
-    body += "\n\n---\n\n*이 콘텐츠는 AI에 의해 생성되었으며, 오류나 부정확한 정보를 포함할 수 있습니다.*"
-
-    filename = f"{datetime.now().strftime('%Y-%m-%d')}-day{state['day_count']}.md"
-
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    target_dir = os.path.normpath(os.path.join(script_dir, "..", "..", "_posts", "ghost_in_the_legacy"))
-    os.makedirs(target_dir, exist_ok=True)
-    with open(os.path.join(target_dir, filename), 'w', encoding='utf-8') as f:
-        f.write(header.strip() + "\n\n" + body)
-
+    thinking.observe("summarize_state", valid=True)
+    advance_state(state, text, updated_metadata_dict, slot)
+
+    filename = f"{today}-day{state['day_count']}.md"
+    post_path = os.path.join(POSTS_DIR, filename)
+    citations = {
+        "used_web": citation_entries(unique_used_web_chunks),
+        "unused_web": citation_entries(unique_unused_web_chunks),
+        "used_map": citation_entries(unique_used_map_chunks),
+        "unused_map": citation_entries(unique_unused_map_chunks),
+    }
+    artifact = new_artifact(post_path, state['day_count'], citations, router.decisions,
+                            title=f"Ghost in the Legacy - Day {day_count}", text=text,
+                            plot_summary=updated_metadata_dict['plot_summary'])
+    with tracer.span("save"):
+        artifact_store.save(post_path, artifact)
+        target_dir = POSTS_DIR
+        os.makedirs(target_dir, exist_ok=True)
+        with open(post_path, 'w', encoding='utf-8') as f:
+            f.write(render_post(artifact))
+
+    completion = assess_completion(state)
+    if completion['finished']:
+        mark_finished(state, completion['reason'], completion['phase'])
     save_state(state)
+    run_publish_stages(post_path)
+
+def main(force=False):
+    # 완결 여부는 lock 이나 모델 클라이언트, 무거운 import 전에 확인합니다.
+    if load_state().get('완결'):
+        print("🛑 [알림] Ghost in the Legacy 연재가 완결되었습니다.")
+        return
+    with RunLock(SCRIPT_DIR) as acquired:
+        if not acquired:
+            return
+        # lock 을 잡기 전에 다른 실행이 상태를 바꿨을 수 있으므로 다시 읽고, 종료/중복 검사도 그 상태로 다시 합니다.
+        state = load_state()
+        if state.get('완결'):
+            print("🛑 [알림] 다른 실행이 연재를 완결했습니다.")
+            return
+        completion = assess_completion(state)
+        if completion['finished']:
+            mark_finished(state, completion['reason'], completion['phase'])
+            save_state(state)
+            return
+        today, slot = datetime.now().strftime('%Y-%m-%d'), run_slot(MAX_RUNS_PER_DAY)
+        # 포스트 파일명은 증가된 day_count 를 사용하므로 이번 실행의 대상은 day_count + 1 입니다.
+        duplicate = None if force else find_duplicate_run(
+            POSTS_DIR, state['day_count'] + 1, today,
+            [state_store.snapshot_path, state_store.journal_path], MAX_RUNS_PER_DAY,
+            last_run_key=state.get('last_run_key'), slot=slot
+        )
+        if duplicate:
+            print(f"⏭️ [건너뜀] {duplicate}")
+            return
+        tracer.start("ghost_in_the_legacy", day=state['day_count'] + 1)
+        try:
+            publish_next_day(state, today, slot)
+        except BaseException:
+            thinking.commit(crashed=True)
+            raise
+        else:
+            thinking.commit()
+        finally:
+            tracer.finish(RUN_DATA_DIR)
 
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv[1:]:
+        from common.startup import profile_startup
+        ok = profile_startup("main", HEAVY_IMPORTS, SCRIPT_DIR)
+        sys.exit(0 if ok else 1)
     try:
-        main()
+        main(force="--force" in sys.argv[1:])
     except Exception as e:
         traceback.print_exc()
         sys.exit(1)